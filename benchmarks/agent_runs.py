@@ -0,0 +1,139 @@
+"""Background agent runs (`api.chat.runs.AgentRunner`): fairness and time to accept.
+
+A burst scenario on the real graph with fake models: one heavy user submits
+`--heavy-runs` messages (in separate chats), then `--light-users` users submit
+one message each. The same burst runs through the runner's fair queue and
+through a FIFO queue, with `--workers` workers. The report gives each group's
+time from submission to answer, and how long a submission takes to be accepted
+compared with a blocking `send_message`.
+
+    python benchmarks/agent_runs.py --workers 4 --heavy-runs 40 --light-users 10 --llm-latency-ms 200
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import deque
+
+from common import emit, summarize
+
+
+def fifo_queue():
+    from api.chat.runs import FairQueue
+
+    class FifoQueue(FairQueue):
+        """Arrival order, ignoring users and priority."""
+
+        def __init__(self):
+            super().__init__()
+            self._runs = deque()
+
+        def __len__(self):
+            return len(self._runs)
+
+        def push(self, priority, user_id, run_id):
+            self._runs.append(run_id)
+
+        def pop(self):
+            return self._runs.popleft() if self._runs else None
+
+        def drain(self):
+            runs, self._runs = list(self._runs), deque()
+            return runs
+
+    return FifoQueue()
+
+
+async def burst(args, queue_name: str, users: dict, chats: dict) -> dict:
+    from sqlmodel import Session
+
+    from api.chat.routing import chat_service
+    from api.chat.runs import PRIORITIES, AgentRunner
+    from api.db import engine
+    from api.models import AgentRun
+
+    runner = AgentRunner(chat_service, workers=args.workers, mode="local")
+    if queue_name == "fifo":
+        runner._queue = fifo_queue()
+    runner.start()
+    submitted, accept = {}, []
+    with Session(engine) as session:
+        for username, user in users.items():
+            for chat in chats[username]:
+                start = time.perf_counter()
+                run = runner.submit(session, chat, user, "Please research how much a 6 month old should sleep",
+                                    PRIORITIES["normal"])
+                accept.append(time.perf_counter() - start)
+                submitted[run.id] = ("heavy" if username.endswith("heavy") else "light", time.perf_counter())
+        waits = {"heavy": [], "light": []}
+        finished = {}
+
+        async def wait(run_id):
+            run = await runner.wait(session.get(AgentRun, run_id), timeout=600)
+            group, start = submitted[run_id]
+            waits[group].append(time.perf_counter() - start)
+            finished[run_id] = run.status
+
+        await asyncio.gather(*(wait(run_id) for run_id in submitted))
+    await runner.close()
+    return {
+        "accept": summarize(accept),
+        "heavy_user": summarize(waits["heavy"]),
+        "light_users": summarize(waits["light"]),
+        "failed": sum(status != "done" for status in finished.values()),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--heavy-runs", type=int, default=40)
+    parser.add_argument("--light-users", type=int, default=10)
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--tool-latency-ms", type=float, default=150)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["FAKE_TOOL_LATENCY_MS"] = str(args.tool_latency_ms)
+    os.environ["AGENT_RUN_POLL_SECONDS"] = "0.2"
+    import fake_app  # noqa: F401
+    from sqlmodel import Session
+
+    from api.chat.routing import chat_service
+    from api.db import engine, init_db
+    from api.models import User
+
+    init_db()
+    await chat_service._ensure_initialized()
+    results = {}
+    with Session(engine) as session:
+        for queue_name in ("fifo", "fair"):
+            prefix = f"bench-runs-{os.getpid()}-{queue_name}"
+            users = {f"{prefix}-heavy": User(username=f"{prefix}-heavy")}
+            users.update({f"{prefix}-light-{u}": User(username=f"{prefix}-light-{u}") for u in range(args.light_users)})
+            session.add_all(users.values())
+            session.commit()
+            chats = {
+                username: [
+                    chat_service.create_chat(session, user, f"bench {i}")
+                    for i in range(args.heavy_runs if username.endswith("heavy") else 1)
+                ]
+                for username, user in users.items()
+            }
+            results[queue_name] = await burst(args, queue_name, users, chats)
+
+        user = users[f"{prefix}-heavy"]
+        chat = chats[f"{prefix}-heavy"][0]
+        blocking = []
+        for _ in range(5):
+            start = time.perf_counter()
+            await chat_service.send_message(session, chat, "Please research how much a 6 month old should sleep", user)
+            blocking.append(time.perf_counter() - start)
+        results["blocking_send_message"] = summarize(blocking)
+
+    emit({"config": vars(args), "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""Load test: login throughput versus gunicorn worker count.
+
+Login is dominated by bcrypt, which is CPU-bound and runs on the event loop, so a
+single worker saturates one core. This starts the production server (see
+`src/gunicorn.conf.py`) once per worker count, hammers `POST /api/auth/login`
+and reports requests/sec plus the scaling efficiency relative to one worker.
+
+    python benchmarks/auth_scaling.py --workers 1 2 4 --concurrency 64 --duration 15
+
+The server reads its environment (.env) exactly as in production. Add
+`--offline` to serve `fake_app:app` instead (fake providers, shared SQLite file).
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from common import summarize
+
+BENCH_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCH_DIR.parent / "src"
+
+
+def start_server(workers: int, port: int, app: str, offline: bool) -> subprocess.Popen:
+    env = {**os.environ, "WEB_CONCURRENCY": str(workers), "PORT": str(port)}
+    command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}"]
+    if offline:
+        # Every worker must see the same users, so share one database file
+        db_path = Path(tempfile.gettempdir()) / f"rosy-auth-scaling-{workers}.db"
+        db_path.unlink(missing_ok=True)
+        env.setdefault("BENCH_DATABASE_URL", f"sqlite:///{db_path}")
+        command += ["--pythonpath", str(BENCH_DIR), "fake_app:app"]
+    else:
+        command.append(app)
+    return subprocess.Popen(
+        command,
+        cwd=SRC_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError("Server did not become ready")
+
+
+async def run_load(client: httpx.AsyncClient, concurrency: int, duration: float, username: str, password: str) -> dict:
+    latencies = []
+    errors = 0
+    stop_at = time.monotonic() + duration
+
+    async def user_loop():
+        nonlocal errors
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            response = await client.post("/api/auth/login", data={"username": username, "password": password})
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.monotonic()
+    await asyncio.gather(*(user_loop() for _ in range(concurrency)))
+    return summarize(latencies, time.monotonic() - start, errors)
+
+
+async def bench_workers(workers: int, args) -> dict:
+    server = start_server(workers, args.port, args.app, args.offline)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60) as client:
+            await wait_ready(client, args.startup_timeout)
+            # Registering twice returns 400, which is fine: the user exists either way
+            await client.post("/api/auth/register", json={"username": args.username, "password": args.password})
+            # Warm every worker before measuring
+            await run_load(client, args.concurrency, 2, args.username, args.password)
+            return {"workers": workers, **await run_load(client, args.concurrency, args.duration, args.username, args.password)}
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--app", default="main:app", help="ASGI app import path, relative to src/")
+    parser.add_argument("--offline", action="store_true", help="Serve fake_app:app with fake providers")
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--username", default="bench-auth-user")
+    parser.add_argument("--password", default="bench-auth-password")
+    args = parser.parse_args()
+
+    results = []
+    for workers in args.workers:
+        result = await bench_workers(workers, args)
+        results.append(result)
+        print(
+            f"workers={workers}: {result['throughput_rps']} req/s, p50={result['p50_ms']}ms, p95={result['p95_ms']}ms",
+            file=sys.stderr,
+        )
+
+    baseline = results[0]["throughput_rps"] / results[0]["workers"]
+    for result in results:
+        result["scaling_efficiency"] = round(result["throughput_rps"] / (baseline * result["workers"]), 2) if baseline else None
+    print(json.dumps({"endpoint": "POST /api/auth/login", "cpu_count": os.cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
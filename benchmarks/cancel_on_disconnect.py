@@ -0,0 +1,112 @@
+"""What a closed tab costs: turns whose client disconnects mid-request.
+
+Serves the app (fake models and tools, see `fake_app.py`) with uvicorn on a
+local port. Then it sends `--turns` complete `send_message` requests, and
+`--turns` more whose client gives up after `--abort-ms`, the way a closed tab
+would. It reports the LLM calls and tokens per complete and per aborted turn,
+the cancellation counters from `ai.metrics`, and whether every thread is still
+consistent afterwards: no user message left without an answer, and nothing
+pending in the checkpoint.
+
+    python benchmarks/cancel_on_disconnect.py --turns 20 --abort-ms 600 --llm-latency-ms 300
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from common import emit, summarize
+
+
+async def run_turns(client, headers: dict, chat_ids: list, turns: int, timeout: float) -> dict:
+    import httpx
+
+    latencies, aborted = [], 0
+    for turn in range(turns):
+        start = time.perf_counter()
+        try:
+            await client.post(
+                "/api/chats/send_message",
+                params={"chat_id": chat_ids[turn % len(chat_ids)]},
+                json={"content": f"Please research how much a 6 month old should sleep ({turn})"},
+                headers=headers,
+                timeout=timeout,
+            )
+            latencies.append(time.perf_counter() - start)
+        except httpx.TimeoutException:
+            aborted += 1
+    return {"completed": summarize(latencies), "aborted": aborted}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--chats", type=int, default=4)
+    parser.add_argument("--abort-ms", type=float, default=600)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    import fake_app
+    import httpx
+    import uvicorn
+
+    from ai import metrics
+    from api.chat.routing import chat_service
+    from api.usage import usage_ledger
+
+    server = uvicorn.Server(uvicorn.Config(fake_app.app, host="127.0.0.1", port=args.port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    results = {}
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=60) as client:
+            await client.post("/api/auth/register", json={"username": "bench-cancel", "password": "bench"})
+            token = (await client.post("/api/auth/login", data={"username": "bench-cancel", "password": "bench"})).json()
+            headers = {"Authorization": f"Bearer {token['access_token']}"}
+            chats = [
+                (await client.post("/api/chats/create_chat", json={"title": f"bench {i}"}, headers=headers)).json()
+                for i in range(args.chats)
+            ]
+            chat_ids = [chat["id"] for chat in chats]
+
+            for phase, timeout in (("complete", 60), ("aborted", args.abort_ms / 1000)):
+                calls, tokens = usage_ledger.stats["calls"], metrics.mean_turn_tokens() * metrics._turns["count"]
+                before = metrics.metrics()
+                results[phase] = await run_turns(client, headers, chat_ids, args.turns, timeout)
+                # Let cancelled turns finish cleaning up
+                await asyncio.sleep(1 + args.abort_ms / 1000)
+                after = metrics.metrics()
+                results[phase]["llm_calls_per_turn"] = round((usage_ledger.stats["calls"] - calls) / args.turns, 2)
+                results[phase]["metrics"] = {
+                    name: round(after.get(name, 0) - before.get(name, 0), 1)
+                    for name in ("runs_cancelled", "cancelled_tokens_used", "cancelled_tokens_saved_estimate",
+                                 "turns_completed")
+                }
+                if phase == "complete":
+                    results[phase]["tokens_per_turn"] = round(
+                        (metrics.mean_turn_tokens() * metrics._turns["count"] - tokens) / args.turns
+                    )
+
+        unanswered, pending = 0, 0
+        for chat in chats:
+            state = await chat_service.agent.aget_state({"configurable": {"thread_id": chat["thread_id"]}})
+            messages = state.values.get("messages", [])
+            unanswered += sum(
+                1 for i, m in enumerate(messages) if m.type == "human" and (i + 1 == len(messages) or messages[i + 1].type != "ai")
+            )
+            pending += bool(state.next)
+        results["threads"] = {"unanswered_user_messages": unanswered, "threads_with_pending_nodes": pending}
+    finally:
+        server.should_exit = True
+        await serving
+
+    emit({"config": vars(args), "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,177 @@
+"""Latency of `GET /api/chats/search` and of indexing new messages, at scale.
+
+Loads `--messages` synthetic chat messages spread over users and chats, then
+times `search_messages` for common words, rare names and two-word queries from
+random users, and `index_messages` for new exchanges (the write added to every
+`send_message`). The production path needs Postgres (tsvector + GIN); point
+BENCH_DATABASE_URL at a scratch database:
+
+    BENCH_DATABASE_URL=postgresql://localhost/rosy_bench python benchmarks/chat_search.py --messages 10000000
+
+Without it a temporary SQLite file is used, which exercises the LIKE fallback
+(keep `--messages` small there). Rows are appended on every run; pass
+`--skip-load` to search the data left by an earlier run.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from common import emit, summarize
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+WORDS = (
+    "baby sleep feeding nap bottle milk formula night bedtime routine crying teeth teething fever rash "
+    "cough cold doctor pediatrician vaccine shots weight growth solids puree spoon diaper bath swaddle "
+    "crawling walking talking words daycare work mother father grandma toddler tantrum potty training "
+    "allergy eczema colic reflux gas burping pacifier thumb car seat stroller carrier playtime tummy time"
+).split()
+SYLLABLES = ["zo", "va", "rex", "pel", "mi", "cort", "lu", "dran", "ti", "nex", "so", "fen", "qua", "bril"]
+
+
+def make_content(rng: random.Random, names: list, words: int = 24) -> str:
+    picked = rng.choices(WORDS, weights=[1 / (i + 1) for i in range(len(WORDS))], k=words)
+    if rng.random() < 0.05:
+        picked[rng.randrange(words)] = rng.choice(names)
+    return " ".join(picked).capitalize() + "."
+
+
+def load(engine, args, rng: random.Random, names: list) -> dict:
+    from sqlalchemy import insert, text
+
+    from api.models import Chat, ChatMessage, User
+
+    users = max(1, args.messages // args.messages_per_user)
+    chats_per_user = max(1, args.messages_per_user // args.messages_per_chat)
+    suffix = f"{int(time.time())}-{rng.randrange(10 ** 6)}"
+    postgres = engine.dialect.name == "postgresql"
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        user_ids = [
+            row.id for row in connection.execute(
+                insert(User).returning(User.id),
+                [{"username": f"bench-search-{suffix}-{u}", "auth_provider": "local"} for u in range(users)],
+            )
+        ]
+        chat_ids = {}
+        for user_id in user_ids:
+            chat_ids[user_id] = [
+                row.id for row in connection.execute(
+                    insert(Chat).returning(Chat.id),
+                    [{"user_id": user_id, "thread_id": f"bench-{suffix}-{user_id}-{c}", "title": f"Chat {c}"}
+                     for c in range(chats_per_user)],
+                )
+            ]
+        if postgres:
+            # Bulk loads are much faster with the GIN index built afterwards
+            connection.execute(text("DROP INDEX IF EXISTS ix_chatmessage_search_vector"))
+
+    def rows():
+        for n in range(args.messages):
+            user_id = user_ids[n % len(user_ids)]
+            yield (rng.choice(chat_ids[user_id]), user_id, "user" if n % 2 == 0 else "ai", make_content(rng, names))
+
+    if postgres:
+        raw = engine.raw_connection()
+        try:
+            with raw.cursor() as cursor:
+                with cursor.copy("COPY chatmessage (chat_id, user_id, role, content, created_at) FROM STDIN") as copy:
+                    for row in rows():
+                        copy.write_row((*row, "now"))
+            raw.commit()
+        finally:
+            raw.close()
+        loaded = time.perf_counter() - start
+        with engine.begin() as connection:
+            connection.execute(text("CREATE INDEX ix_chatmessage_search_vector ON chatmessage USING GIN (search_vector)"))
+            connection.execute(text("ANALYZE chatmessage"))
+    else:
+        with engine.begin() as connection:
+            batch = []
+            for row in rows():
+                batch.append(dict(zip(("chat_id", "user_id", "role", "content"), row)))
+                if len(batch) >= 10000:
+                    connection.execute(insert(ChatMessage), batch)
+                    batch = []
+            if batch:
+                connection.execute(insert(ChatMessage), batch)
+        loaded = time.perf_counter() - start
+    return {
+        "users": users,
+        "chats": users * chats_per_user,
+        "load_seconds": round(loaded, 1),
+        "index_build_seconds": round(time.perf_counter() - start - loaded, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--messages-per-user", type=int, default=500)
+    parser.add_argument("--messages-per-chat", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200, help="Searches per query kind")
+    parser.add_argument("--writes", type=int, default=200, help="Exchanges indexed to time the write path")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    db_path = Path(tempfile.gettempdir()) / f"rosy-chat-search-{os.getpid()}.db"
+    os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL") or f"sqlite:///{db_path}"
+    from sqlmodel import Session, select
+
+    from api.chat.search import index_messages, search_messages
+    from api.db import engine, init_db
+    from api.models import Chat, ChatMessage, User
+
+    rng = random.Random(0)
+    names = sorted({"".join(rng.choice(SYLLABLES) for _ in range(3)) for _ in range(2000)})
+    init_db()
+    setup = {} if args.skip_load else load(engine, args, rng, names)
+
+    with Session(engine) as session:
+        user_ids = session.exec(
+            select(ChatMessage.user_id).distinct().limit(1000)
+        ).all()
+        users = [session.get(User, user_id) for user_id in user_ids]
+        kinds = {
+            "common_word": lambda: rng.choice(WORDS[:5]),
+            "rare_name": lambda: rng.choice(names),
+            "two_words": lambda: " ".join(rng.sample(WORDS[:20], 2)),
+        }
+        results = {}
+        for kind, make_query in kinds.items():
+            latencies = []
+            hits = 0
+            for _ in range(args.queries):
+                user = rng.choice(users)
+                start = time.perf_counter()
+                found = search_messages(session, user, make_query(), args.page_size + 1, 0)
+                latencies.append(time.perf_counter() - start)
+                hits += len(found)
+            results[kind] = {**summarize(latencies), "mean_hits": round(hits / args.queries, 1)}
+
+        chats = session.exec(select(Chat).where(Chat.user_id.in_(user_ids[:50]))).all()
+        latencies = []
+        for _ in range(args.writes):
+            chat = rng.choice(chats)
+            start = time.perf_counter()
+            index_messages(session, chat, [("user", make_content(rng, names)), ("ai", make_content(rng, names, 80))])
+            latencies.append(time.perf_counter() - start)
+        results["index_exchange"] = summarize(latencies)
+
+    emit({
+        "config": vars(args),
+        "database": engine.dialect.name,
+        "setup": setup,
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Throughput and memory of the NDJSON chat export and import (`api.chat.transfer`).
+
+Seeds one user with `--chats` chats of `--messages-per-chat` messages, streams
+the export to a temporary file exactly as `GET /api/chats/export` would, then
+imports that file into a second user. The process RSS is sampled while each
+runs; it should stay flat (growth well below the export size).
+
+    python benchmarks/chat_transfer.py --chats 2000 --messages-per-chat 100 --message-chars 1000
+
+The in-memory checkpointer holds the seeded and imported chats itself, so with
+it the import's RSS grows by about the export size; for a 1 GB export,
+use BENCH_CHECKPOINTER=postgres and BENCH_DATABASE_URL pointing at a scratch
+database with e.g. `--chats 10000`.
+"""
+import argparse
+import asyncio
+import os
+import resource
+import tempfile
+import time
+
+from common import emit
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+async def measure(run) -> dict:
+    """Run `run()` while sampling RSS."""
+    samples = [rss_mb()]
+
+    async def sample():
+        while True:
+            samples.append(rss_mb())
+            await asyncio.sleep(0.05)
+
+    sampler = asyncio.create_task(sample())
+    start = time.perf_counter()
+    try:
+        result = await run()
+    finally:
+        sampler.cancel()
+    seconds = time.perf_counter() - start
+    samples.append(rss_mb())
+    return {
+        "seconds": round(seconds, 2),
+        "rss_start_mb": round(samples[0], 1),
+        "rss_peak_growth_mb": round(max(samples) - samples[0], 1),
+        "rss_end_growth_mb": round(samples[-1] - samples[0], 1),
+        **(result or {}),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=2000)
+    parser.add_argument("--messages-per-chat", type=int, default=100)
+    parser.add_argument("--message-chars", type=int, default=1000)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    import fake_app  # noqa: F401
+    from langchain_core.messages import AIMessage, HumanMessage
+    from sqlmodel import Session
+
+    from ai.graph import get_agent
+    from api.chat.transfer import export_chats, import_chats
+    from api.db import engine, init_db
+    from api.models import Chat, User
+
+    init_db()
+    agent = await get_agent()
+    suffix = f"{os.getpid()}-{int(time.time())}"
+    text = ("Babies grow quickly and every child develops at their own pace. " * 40)[:args.message_chars]
+
+    start = time.perf_counter()
+    with Session(engine) as session:
+        source = User(username=f"bench-export-{suffix}")
+        target = User(username=f"bench-import-{suffix}")
+        session.add_all([source, target])
+        session.commit()
+        source_id, target_id = source.id, target.id
+        chats = [Chat(user_id=source_id, thread_id=f"bench-export-{suffix}-{i}", title=f"Chat {i}") for i in range(args.chats)]
+        session.add_all(chats)
+        session.commit()
+        thread_ids = [chat.thread_id for chat in chats]
+    for thread_id in thread_ids:
+        messages = [
+            (HumanMessage if m % 2 == 0 else AIMessage)(content=f"{m} {text}") for m in range(args.messages_per_chat)
+        ]
+        await agent.aupdate_state({"configurable": {"thread_id": thread_id}}, {"messages": messages}, as_node="memory")
+    seed_seconds = time.perf_counter() - start
+
+    path = os.path.join(tempfile.mkdtemp(prefix="chat-transfer-"), "export.ndjson")
+
+    async def run_export():
+        written = 0
+        with open(path, "wb") as file:
+            async for chunk in export_chats(source_id, agent.checkpointer):
+                file.write(chunk)
+                written += len(chunk)
+        return {"bytes": written}
+
+    async def run_import():
+        async def read():
+            with open(path, "rb") as file:
+                while chunk := file.read(64 * 1024):
+                    yield chunk
+
+        with Session(engine) as session:
+            return await import_chats(session, session.get(User, target_id), agent, read())
+
+    export = await measure(run_export)
+    export["mb_per_second"] = round(export["bytes"] / 2 ** 20 / export["seconds"], 1)
+    imported = await measure(run_import)
+    imported["mb_per_second"] = round(export["bytes"] / 2 ** 20 / imported["seconds"], 1)
+    os.remove(path)
+
+    emit({
+        "config": vars(args),
+        "checkpointer": os.environ.get("CHECKPOINTER"),
+        "seed_seconds": round(seed_seconds, 1),
+        "export_mb": round(export["bytes"] / 2 ** 20, 1),
+        "export": export,
+        "import": imported,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
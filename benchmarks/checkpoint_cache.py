@@ -0,0 +1,167 @@
+"""Read latency with and without the hot-thread checkpoint cache (`ai.checkpoint_cache`).
+
+Replays chat turns the way `ChatService.send_message` drives the checkpointer:
+read the thread, run a one-node graph that appends a reply, and read again.
+Most turns hit a small set of active threads. Each run is repeated without the
+cache, and with it in front of the same saver on `--workers` simulated workers
+that share the store and take turns at random. That exercises the cross-worker
+version check; every read is checked against the number of messages the
+thread should have.
+
+Offline, the store is a `MemorySaver` (real serialization) with `--rtt-ms`
+added to every call to model a database round trip. With
+BENCH_CHECKPOINTER=postgres, BENCH_DATABASE_URL is used instead.
+
+    python benchmarks/checkpoint_cache.py --threads 200 --turns 2000 --history 200 --cache-mb 16
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+from common import emit, summarize
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+
+def slow_memory_saver(rtt: float, serde):
+    from langgraph.checkpoint.memory import MemorySaver
+
+    class SlowSaver(MemorySaver):
+        async def aget_tuple(self, config):
+            await asyncio.sleep(rtt)
+            return await super().aget_tuple(config)
+
+        async def aput(self, *args, **kwargs):
+            await asyncio.sleep(rtt)
+            return await super().aput(*args, **kwargs)
+
+        async def aput_writes(self, *args, **kwargs):
+            await asyncio.sleep(rtt)
+            return await super().aput_writes(*args, **kwargs)
+
+    return SlowSaver(serde=serde)
+
+
+def worker_cache(saver, max_bytes: int, rtt: float):
+    from ai.checkpoint_cache import CachedCheckpointer
+
+    class WorkerCache(CachedCheckpointer):
+        async def _latest_version(self, thread_id):
+            if not hasattr(self.saver, "storage"):
+                return await super()._latest_version(thread_id)
+            # The same lookup as the Postgres query, against the shared MemorySaver
+            await asyncio.sleep(rtt)
+            checkpoints = self.saver.storage.get(thread_id, {}).get("", {})
+            if not checkpoints:
+                return ("", 0)
+            latest = max(checkpoints)
+            return latest, len(self.saver.writes.get((thread_id, "", latest), {}))
+
+    return WorkerCache(saver, max_bytes=max_bytes)
+
+
+def build_graph(checkpointer):
+    from langchain_core.messages import AIMessage
+    from langgraph.graph import END, START, StateGraph
+
+    from ai.schemas import AgentState
+
+    async def reply(state: AgentState):
+        return {"messages": [AIMessage(content="Here is a thoughtful answer. " * 20)]}
+
+    graph = StateGraph(AgentState)
+    graph.add_node("agent", reply)
+    graph.add_edge(START, "agent")
+    graph.add_edge("agent", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+async def run(args, saver, workers: list, label: str, expected: dict, rng: random.Random) -> dict:
+    from langchain_core.messages import HumanMessage
+
+    graphs = [build_graph(checkpointer) for checkpointer in workers]
+    reads, turns = [], []
+    mismatches = 0
+    hot = max(1, int(args.threads * args.hot_fraction))
+    for _ in range(args.turns):
+        thread = rng.randrange(hot) if rng.random() < 0.9 else rng.randrange(args.threads)
+        worker = rng.randrange(len(workers))
+        config = {"configurable": {"thread_id": f"{label}-{thread}"}}
+        start = time.perf_counter()
+        before = await workers[worker].aget_tuple(config)
+        reads.append(time.perf_counter() - start)
+        await graphs[worker].ainvoke({"messages": [HumanMessage(content="And what about naps?")]}, config)
+        expected[thread] += 2
+        start = time.perf_counter()
+        after = await workers[worker].aget_tuple(config)
+        reads.append(time.perf_counter() - start)
+        turns.append(time.perf_counter() - start)
+        mismatches += len(after.checkpoint["channel_values"]["messages"]) != expected[thread]
+        mismatches += len(before.checkpoint["channel_values"]["messages"]) != expected[thread] - 2
+    result = {"reads": summarize(reads), "mismatched_reads": mismatches}
+    caches = [w for w in workers if w is not saver]
+    if caches:
+        result["cache"] = {
+            **{key: sum(c.stats[key] for c in caches) for key in caches[0].stats},
+            "bytes_per_worker": max(c.bytes for c in caches),
+            "max_bytes": caches[0].max_bytes,
+        }
+    return result
+
+
+async def seed(graph, label: str, args) -> dict:
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    history = []
+    for m in range(args.history):
+        content = f"{m} " + "Babies grow quickly and every child develops at their own pace. " * 8
+        history.append(HumanMessage(content=content) if m % 2 == 0 else AIMessage(content=content))
+    for thread in range(args.threads):
+        await graph.aupdate_state({"configurable": {"thread_id": f"{label}-{thread}"}}, {"messages": history})
+    return {thread: args.history for thread in range(args.threads)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=200)
+    parser.add_argument("--hot-fraction", type=float, default=0.1, help="Share of threads getting 90%% of turns")
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--history", type=int, default=200, help="Messages already in each thread")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--cache-mb", type=float, default=16)
+    parser.add_argument("--rtt-ms", type=float, default=2.0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    from ai.serde import get_serde
+
+    rtt = args.rtt_ms / 1000
+    if os.environ.get("BENCH_CHECKPOINTER") == "postgres":
+        from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+        context = AsyncPostgresSaver.from_conn_string(os.environ["BENCH_DATABASE_URL"], serde=get_serde())
+        saver = await context.__aenter__()
+        await saver.setup()
+    else:
+        saver = slow_memory_saver(rtt, get_serde())
+
+    max_bytes = int(args.cache_mb * 2 ** 20)
+    label = f"cache-bench-{os.getpid()}"
+    results = {}
+    for name, workers in {
+        "uncached": [saver],
+        "cached": [worker_cache(saver, max_bytes, rtt) for _ in range(args.workers)],
+    }.items():
+        expected = await seed(build_graph(saver), f"{label}-{name}", args)
+        results[name] = await run(args, saver, workers, f"{label}-{name}", expected, random.Random(0))
+
+    results["read_p50_speedup"] = round(results["uncached"]["reads"]["p50_ms"] / results["cached"]["reads"]["p50_ms"], 2)
+    emit({"config": vars(args), "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+"""Bytes per checkpoint and encode/decode speed of the checkpoint serializers.
+
+Builds synthetic threads shaped like real ones: each user turn is followed by
+supervisor handoffs, tool calls with search results and a final answer. Each
+serializer then encodes and decodes the thread's `messages` channel, which is
+the blob the checkpointer writes on every turn. The serializers are the
+default `JsonPlusSerializer` and `ai.serde.CompressedSerializer` with each
+codec. The report also checks that the compressed serializer still reads
+values written by the default one.
+
+    python benchmarks/checkpoint_serde.py --messages 500 --threads 20
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+from common import emit, summarize
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+WORDS = (
+    "baby babies sleep feeding nap bottle milk formula night bedtime routine crying teeth teething fever rash "
+    "cough cold doctor pediatrician vaccine weight growth solids puree spoon diaper bath swaddle crawling "
+    "walking talking daycare mother father toddler tantrum potty allergy eczema colic reflux burping pacifier "
+    "the a and to of in is for your with it can be may when should at their this that often most some every "
+    "first week month year hours minutes day signs help keep try offer watch check call usually normal"
+).split()
+SYLLABLES = ["zo", "va", "rex", "pel", "mi", "cort", "lu", "dran", "ti", "nex", "so", "fen", "qua", "bril"]
+
+
+def text(rng: random.Random, chars: int) -> str:
+    """Sentences of common words mixed with rarer made-up terms, as in search results."""
+    words = []
+    while sum(len(w) + 1 for w in words) < chars:
+        if rng.random() < 0.15:
+            words.append("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+        elif rng.random() < 0.05:
+            words.append(f"{rng.randint(1, 500)}{rng.choice(['ml', 'mg', '%', ''])}")
+        else:
+            words.append(rng.choice(WORDS))
+        if rng.random() < 0.08:
+            words[-1] += "."
+    return " ".join(words)[:chars]
+
+
+def make_thread(rng: random.Random, messages: int) -> list:
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+    thread = []
+    turn = 0
+    while len(thread) < messages:
+        turn += 1
+        call_id = f"call_{turn}"
+        search_id = f"search_{turn}"
+        thread += [
+            HumanMessage(content=text(rng, rng.randint(40, 300))),
+            AIMessage(content="", name="supervisor", tool_calls=[
+                {"name": "transfer_to_research_expert", "args": {}, "id": call_id}
+            ]),
+            ToolMessage(content="Successfully transferred to research_expert", tool_call_id=call_id),
+            AIMessage(content="", name="research_expert", tool_calls=[
+                {"name": "web_search", "args": {"query": text(rng, 60)}, "id": search_id}
+            ]),
+            ToolMessage(content=text(rng, rng.randint(1500, 4000)), name="web_search", tool_call_id=search_id),
+            AIMessage(content=text(rng, rng.randint(300, 1200)), name="supervisor",
+                      response_metadata={"model_name": "gpt-4o", "finish_reason": "stop"},
+                      usage_metadata={"input_tokens": 2400, "output_tokens": 250, "total_tokens": 2650}),
+        ]
+    return thread[:messages]
+
+
+def bench(serde, threads: list) -> dict:
+    encode, decode, sizes = [], [], []
+    for thread in threads:
+        start = time.perf_counter()
+        blob = serde.dumps_typed(thread)
+        encode.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        restored = serde.loads_typed(blob)
+        decode.append(time.perf_counter() - start)
+        assert [m.content for m in restored] == [m.content for m in thread]
+        sizes.append(len(blob[1]))
+    return {
+        "type_tag": blob[0],
+        "bytes_per_checkpoint": round(sum(sizes) / len(sizes)),
+        "encode": summarize(encode),
+        "decode": summarize(decode),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=20)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+    from ai.serde import CompressedSerializer
+
+    rng = random.Random(0)
+    threads = [make_thread(rng, args.messages) for _ in range(args.threads)]
+    default = JsonPlusSerializer()
+    serializers = {
+        "default": default,
+        "zstd-1": CompressedSerializer("zstd", level=1),
+        "zstd-3": CompressedSerializer("zstd", level=3),
+        "zstd-9": CompressedSerializer("zstd", level=9),
+        "zlib-6": CompressedSerializer("zlib", level=6),
+    }
+    results = {name: bench(serde, threads) for name, serde in serializers.items()}
+    raw = results["default"]["bytes_per_checkpoint"]
+    for name, result in results.items():
+        result["compression_ratio"] = round(raw / result["bytes_per_checkpoint"], 2)
+        result["encode_mb_per_second"] = round(raw / 2 ** 20 / (result["encode"]["mean_ms"] / 1000), 1)
+        result["decode_mb_per_second"] = round(raw / 2 ** 20 / (result["decode"]["mean_ms"] / 1000), 1)
+
+    legacy = default.dumps_typed(threads[0])
+    reads_legacy = [m.content for m in serializers["zstd-3"].loads_typed(legacy)] == [m.content for m in threads[0]]
+    emit({"config": vars(args), "reads_uncompressed_checkpoints": reads_legacy, "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Helpers shared by the benchmark scripts."""
+import json
+import statistics
+import sys
+
+
+def percentile(sorted_values: list, p: float):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, round(p / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: list, elapsed: float = None, errors: int = 0) -> dict:
+    """Count, throughput and latency percentiles (milliseconds) for one series."""
+    values = sorted(latencies)
+    ms = lambda v: round(v * 1000, 2) if v is not None else None  # noqa: E731
+    summary = {
+        "count": len(values),
+        "errors": errors,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "mean_ms": ms(statistics.fmean(values)) if values else None,
+        "max_ms": ms(values[-1]) if values else None,
+    }
+    if elapsed:
+        summary["throughput_rps"] = round(len(values) / elapsed, 2)
+    return summary
+
+
+def emit(report: dict, output: str = None):
+    """Print the JSON report to stdout, or write it to `output`."""
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+        print(f"Report written to {output}", file=sys.stderr)
+    else:
+        print(text)
@@ -0,0 +1,157 @@
+"""Tail latency with and without provider failover when the primary degrades.
+
+The primary fake provider fails a share of calls outright and hangs on another
+share until the client timeout, mimicking an OpenAI incident. The same load is
+sent to the primary alone and to a `FailoverChatModel` chain (primary -> healthy
+fallback) guarded by circuit breakers. Reports latency percentiles, errors and
+how many calls each provider served, and fails if a call through the chain
+errored or took longer than one timed-out attempt plus the fallback's latency.
+
+It also checks that tool kwargs bound to the chain (`parallel_tool_calls=False`,
+as the supervisor binds them) survive `create_react_agent` and reach every
+model the chain tries.
+
+    python benchmarks/failover.py --requests 300 --error-rate 0.3 --hang-rate 0.2
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+from langchain_core.tools import tool  # noqa: E402
+from langgraph.prebuilt import create_react_agent  # noqa: E402
+
+from ai import failover  # noqa: E402
+from common import emit, summarize  # noqa: E402
+from fakes import FakeChatModel  # noqa: E402
+
+
+class FlakyChatModel(FakeChatModel):
+    """Fake provider that errors on `error_rate` and hangs on `hang_rate` of calls."""
+
+    error_rate: float = 0.0
+    hang_rate: float = 0.0
+    client_timeout: float = 5.0
+    seed: int = 0
+    served: int = 0
+    last_kwargs: dict = {}
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.last_kwargs = kwargs
+        roll = random.Random(self.seed + self.served + len(messages)).random()
+        self.served += 1
+        if roll < self.error_rate:
+            await asyncio.sleep(self.latency)
+            raise RuntimeError("503 Service Unavailable")
+        if roll < self.error_rate + self.hang_rate:
+            await asyncio.sleep(self.client_timeout)
+            raise TimeoutError("Request timed out")
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+async def drive(model, requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await model.ainvoke([HumanMessage(content=f"question {i}")])
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors += 1
+                latencies.append(time.perf_counter() - start)
+
+    start = time.monotonic()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return summarize(latencies, time.monotonic() - start, errors)
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up."""
+    return f"Notes about {query}"
+
+
+async def bound_kwargs_check(latency: float) -> dict:
+    """Tool kwargs each model in the chain received from a react agent, primary failing."""
+    primary = FlakyChatModel(model="primary", latency=latency, error_rate=1.0, tool_script=["lookup"])
+    fallback = FlakyChatModel(model="fallback", latency=latency, tool_script=["lookup"])
+    chain = failover.FailoverChatModel(models=[primary, fallback], names=["check:primary", "check:fallback"])
+    agent = create_react_agent(chain.bind_tools([lookup], parallel_tool_calls=False), tools=[lookup])
+    await agent.ainvoke({"messages": [HumanMessage(content="question")]})
+    received = {
+        name: {
+            "parallel_tool_calls": model.last_kwargs.get("parallel_tool_calls"),
+            "tools": [t["function"]["name"] for t in model.last_kwargs.get("tools", [])],
+        }
+        for name, model in (("primary", primary), ("fallback", fallback))
+    }
+    for name, kwargs in received.items():
+        assert kwargs == {"parallel_tool_calls": False, "tools": ["lookup"]}, f"{name} got {kwargs}"
+    return received
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.3)
+    parser.add_argument("--hang-rate", type=float, default=0.2)
+    parser.add_argument("--client-timeout", type=float, default=5.0, help="Seconds a hung call takes to time out")
+    parser.add_argument("--attempt-timeout", type=float, default=1.0)
+    parser.add_argument("--open-seconds", type=float, default=2.0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    failover.breaker_settings.update({"window": 20, "min_calls": 5, "failure_rate": 0.5, "open_seconds": args.open_seconds})
+
+    def make_primary():
+        return FlakyChatModel(
+            model="primary",
+            latency=args.latency_ms / 1000,
+            error_rate=args.error_rate,
+            hang_rate=args.hang_rate,
+            client_timeout=args.client_timeout,
+        )
+
+    primary_only = make_primary()
+    baseline = await drive(primary_only, args.requests, args.concurrency)
+
+    primary = make_primary()
+    fallback = FlakyChatModel(model="fallback", latency=args.latency_ms * 1.5 / 1000)
+    chain = failover.FailoverChatModel(
+        models=[primary, fallback],
+        names=["fake:primary", "fake:fallback"],
+        attempt_timeout=args.attempt_timeout,
+    )
+    with_failover = await drive(chain, args.requests, args.concurrency)
+    bound_ms = (args.attempt_timeout + fallback.latency) * 1000 + 250
+
+    emit({
+        "config": vars(args),
+        "primary_only": baseline,
+        "failover": {
+            **with_failover,
+            "primary_calls": primary.served,
+            "fallback_calls": fallback.served,
+            "breakers": failover.breaker_states(),
+            "max_ms_bound": bound_ms,
+        },
+        "bound_kwargs": await bound_kwargs_check(args.latency_ms / 1000),
+    }, args.output)
+    assert with_failover["errors"] == 0, f"{with_failover['errors']} call(s) failed despite the fallback"
+    assert with_failover["max_ms"] <= bound_ms, f"slowest call took {with_failover['max_ms']}ms, over {bound_ms}ms"
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,49 @@
+"""The FastAPI app wired to fake providers, for offline benchmarks.
+
+Importing this module configures a hermetic environment (dummy API keys, a
+throwaway SQLite database and the in-memory checkpointer unless overridden),
+installs the fakes from `benchmarks.fakes` and then imports `main.app`.
+
+    BENCH_DATABASE_URL   database for users/chats (default: SQLite file in a temp dir)
+    BENCH_CHECKPOINTER   `memory` (default) or `postgres` (uses BENCH_DATABASE_URL)
+
+It can also be served directly, e.g. by the worker-scaling load test:
+
+    gunicorn -c gunicorn.conf.py --pythonpath ../benchmarks fake_app:app
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "src"))
+sys.path.insert(0, str(ROOT_DIR / "benchmarks"))
+
+_db_path = Path(tempfile.gettempdir()) / f"rosy-bench-{os.getpid()}.db"
+os.environ.update({
+    "DATABASE_URL": os.environ.get("BENCH_DATABASE_URL") or f"sqlite:///{_db_path}",
+    "CHECKPOINTER": os.environ.get("BENCH_CHECKPOINTER", "memory"),
+    "OPENAI_API_KEY": "bench",
+    "ANTHROPIC_API_KEY": "bench",
+    "MEM0_API_KEY": "bench",
+    "TAVILY_API_KEY": "bench",
+    "PINECONE_API_KEY": "bench",
+    "PINECONE_INDEX_NAME": "bench",
+    "EMBEDDING_MODEL": "bench",
+    "JWT_SECRET_KEY": "bench-secret",
+    "JWT_ALGORITHM": "HS256",
+    "JWT_ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "AUTH_TYPE": "password",
+})
+
+# main.py loads .env with override=True; keep a developer's real keys out of the benchmark
+import dotenv  # noqa: E402
+
+dotenv.load_dotenv = lambda *args, **kwargs: False
+
+import fakes  # noqa: E402
+
+fakes.install()
+
+from main import app  # noqa: E402,F401
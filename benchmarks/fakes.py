@@ -0,0 +1,391 @@
+"""Deterministic stand-ins for the LLM providers and tool backends.
+
+Each fake replaces the third-party class the app constructs at import time, so
+the real `ai.llms`, `ai.tools` and `ai.graph` code paths run unchanged. Latency
+is configurable through environment variables so a benchmark can model slow
+providers without any network access:
+
+    FAKE_LLM_LATENCY_MS       time to first token of every chat completion (default 200)
+    FAKE_LLM_TOKEN_MS         extra delay per streamed chunk (default 5)
+    FAKE_LLM_STREAM_CHUNKS    chunks a streamed answer is split into (default 8)
+    FAKE_LLM_TOOL_SCRIPT      comma-separated tools a model calls once per turn when bound
+                              (default: transfer_to_research_agent,web_search,search_pinecone)
+    FAKE_TOOL_LATENCY_MS      latency of Tavily, Pinecone and Mem0 calls (default 150)
+    FAKE_EMBED_LATENCY_MS     latency of an embedding request, whatever its batch size (default 100)
+    FAKE_LLM_PREFIX_CACHE     report `cache_read` tokens like OpenAI's prefix cache (default 1)
+"""
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+import zlib
+from collections import deque
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_core.vectorstores import InMemoryVectorStore
+from pydantic import Field
+
+
+def _env_ms(name: str, default: float) -> float:
+    return float(os.environ.get(name, default)) / 1000
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+# Recent prompts seen by any fake model, to simulate provider prefix caching
+_recent_prompts = deque(maxlen=64)
+
+
+def _cached_prefix_tokens(prompt: str) -> int:
+    """Tokens a provider would read from cache: the longest prefix shared with a
+    recent prompt, in 128-token steps, for prompts of at least 1024 tokens."""
+    if os.environ.get("FAKE_LLM_PREFIX_CACHE", "1") == "0" or _estimate_tokens(prompt) < 1024:
+        _recent_prompts.append(prompt)
+        return 0
+    shared = max((len(os.path.commonprefix([prompt, seen])) for seen in _recent_prompts), default=0)
+    _recent_prompts.append(prompt)
+    tokens = shared // 4
+    return tokens // 128 * 128 if tokens >= 1024 else 0
+
+
+def _content_text(message: BaseMessage) -> str:
+    return message.content if isinstance(message.content, str) else json.dumps(message.content)
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that follows a fixed tool script and answers with canned text.
+
+    After the latest human message the model calls, one round at a time, every
+    script tool it has been bound to and that has not answered yet (one per
+    round when bound with `parallel_tool_calls=False`, like the supervisor).
+    Once the script is exhausted it answers. Token usage is estimated from
+    message lengths.
+    """
+
+    model_name: str = Field(default="fake-model", alias="model")
+    latency: float = Field(default_factory=lambda: _env_ms("FAKE_LLM_LATENCY_MS", 200))
+    token_latency: float = Field(default_factory=lambda: _env_ms("FAKE_LLM_TOKEN_MS", 5))
+    stream_chunks: int = Field(default_factory=lambda: int(os.environ.get("FAKE_LLM_STREAM_CHUNKS", 8)))
+    tool_script: List[str] = Field(
+        default_factory=lambda: os.environ.get(
+            "FAKE_LLM_TOOL_SCRIPT", "transfer_to_research_agent,web_search,search_pinecone"
+        ).split(",")
+    )
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def root_async_client(self):
+        return _FakeProviderClient()
+
+    @property
+    def _async_client(self):
+        return _FakeProviderClient()
+
+    def bind_tools(self, tools, *, tool_choice=None, parallel_tool_calls: Optional[bool] = None, **kwargs):
+        if tool_choice is not None:
+            kwargs["tool_choice"] = tool_choice
+        if parallel_tool_calls is not None:
+            kwargs["parallel_tool_calls"] = parallel_tool_calls
+        formatted = [convert_to_openai_tool(t) for t in tools]
+        return self.bind(tools=formatted, **kwargs)
+
+    def _respond(
+        self, messages: List[BaseMessage], tools: Optional[list], parallel_tool_calls: Optional[bool] = None
+    ) -> AIMessage:
+        last_human = next((i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)), 0)
+        query = _content_text(messages[last_human]) if messages else ""
+        answered = {m.name for m in messages[last_human:] if isinstance(m, ToolMessage)}
+        bound = [t["function"]["name"] for t in tools or []]
+        pending = [name for name in self.tool_script if name in bound and name not in answered]
+        calls = pending[:1] if parallel_tool_calls is False else pending
+
+        input_tokens = sum(_estimate_tokens(_content_text(m)) for m in messages)
+        prompt = json.dumps(tools or []) + "".join(f"{m.type}: {_content_text(m)}\n" for m in messages)
+        cache_read = min(_cached_prefix_tokens(prompt), input_tokens)
+        if calls:
+            tool_calls = [
+                {
+                    "name": name,
+                    "args": {} if name.startswith("transfer_to_") else {"query": query},
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "tool_call",
+                }
+                for name in calls
+            ]
+            message = AIMessage(content="", tool_calls=tool_calls)
+        else:
+            message = AIMessage(content=f"Here is a thoughtful answer about: {query[:200]}")
+        output_tokens = _estimate_tokens(_content_text(message)) + 10 * len(calls)
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "input_token_details": {"cache_read": cache_read},
+        }
+        message.response_metadata = {"model_name": self.model_name}
+        return message
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        tools: Optional[list] = None,
+        parallel_tool_calls: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, tools, parallel_tool_calls))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        tools: Optional[list] = None,
+        parallel_tool_calls: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, tools, parallel_tool_calls))])
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        tools: Optional[list] = None,
+        parallel_tool_calls: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        message = self._respond(messages, tools, parallel_tool_calls)
+        if message.tool_calls:
+            chunks = [
+                AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                        for i, c in enumerate(message.tool_calls)
+                    ],
+                )
+            ]
+        else:
+            text = message.content
+            size = max(1, -(-len(text) // self.stream_chunks))
+            chunks = [AIMessageChunk(content=text[i:i + size]) for i in range(0, len(text), size)]
+        chunks[-1].usage_metadata = message.usage_metadata
+        chunks[-1].response_metadata = message.response_metadata
+        for chunk in chunks:
+            await asyncio.sleep(self.token_latency)
+            if run_manager and chunk.content:
+                await run_manager.on_llm_new_token(chunk.content)
+            yield ChatGenerationChunk(message=chunk)
+
+
+class _FakeModels:
+    async def list(self, **kwargs):
+        return []
+
+
+class _FakeProviderClient:
+    """Mimics the `models.list()` call the warmup uses to prime provider pools."""
+
+    models = _FakeModels()
+
+
+class FakeTavilySearch(BaseTool):
+    """Replacement for `langchain_tavily.TavilySearch`."""
+
+    name: str = "tavily_search"
+    description: str = "Fake Tavily search"
+    api_key: Optional[str] = None
+    latency: float = Field(default_factory=lambda: _env_ms("FAKE_TOOL_LATENCY_MS", 150))
+
+    def _results(self, query: str) -> dict:
+        return {
+            "query": query,
+            "results": [
+                {
+                    "title": f"Result {i} for {query[:40]}",
+                    "url": f"https://example.com/{i}",
+                    "content": f"Evidence-based guidance #{i} about {query}. " * 20,
+                }
+                for i in range(5)
+            ],
+        }
+
+    def _run(self, query: str, **kwargs) -> dict:
+        time.sleep(self.latency)
+        return self._results(query)
+
+    async def _arun(self, query: str, **kwargs) -> dict:
+        await asyncio.sleep(self.latency)
+        return self._results(query)
+
+
+class FakeEmbeddings(DeterministicFakeEmbedding):
+    """Replacement for `langchain_openai.OpenAIEmbeddings`; counts async requests."""
+
+    latency: float = Field(default_factory=lambda: _env_ms("FAKE_EMBED_LATENCY_MS", 100))
+    requests: int = 0
+
+    def __init__(self, model: Optional[str] = None, **kwargs):
+        super().__init__(size=64)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return self.embed_query(text)
+
+
+class HashingEmbeddings(Embeddings):
+    """Bag-of-words feature hashing into a small dense vector.
+
+    Shares words with the query means similar vectors, but with few dimensions
+    rare exact terms collide with common ones, much like they blur in real
+    embedding models. Used by the retrieval evaluation.
+    """
+
+    def __init__(self, size: int = 64):
+        self.size = size
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            vector[zlib.crc32(word.encode()) % self.size] += 1.0
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class FakeIndex:
+    """The slice of the Pinecone index API the app uses, backed by the in-memory store."""
+
+    def __init__(self, store: Optional[dict] = None):
+        self.store = store if store is not None else {}
+
+    def describe_index_stats(self):
+        return {"total_vector_count": len(self.store)}
+
+    def upsert(self, vectors: list, namespace: Optional[str] = None):
+        for record in vectors:
+            metadata = dict(record.get("metadata") or {})
+            self.store[record["id"]] = {
+                "id": record["id"],
+                "vector": record["values"],
+                "text": metadata.pop("text", ""),
+                "metadata": metadata,
+            }
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids: list, namespace: Optional[str] = None):
+        for record_id in ids:
+            self.store.pop(record_id, None)
+
+    def fetch(self, ids: list, namespace: Optional[str] = None):
+        return SimpleNamespace(vectors={
+            record_id: SimpleNamespace(
+                id=record_id, metadata={**self.store[record_id]["metadata"], "text": self.store[record_id]["text"]}
+            )
+            for record_id in ids
+            if record_id in self.store
+        })
+
+
+class FakeVectorStore(InMemoryVectorStore):
+    """Replacement for `langchain_pinecone.PineconeVectorStore`, seeded with a small corpus."""
+
+    def __init__(self, index_name: Optional[str] = None, embedding=None, pinecone_api_key: Optional[str] = None, **kwargs):
+        super().__init__(embedding=embedding or FakeEmbeddings())
+        self.latency = _env_ms("FAKE_TOOL_LATENCY_MS", 150)
+        self.index = FakeIndex(self.store)
+        topics = ["sleep regression", "starting solids", "teething", "tummy time", "postpartum recovery"]
+        self.add_documents([
+            Document(page_content=f"Chapter {i} on {topic}. " + f"Practical advice about {topic}. " * 30)
+            for i, topic in enumerate(topics * 4)
+        ])
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> List[Document]:
+        time.sleep(self.latency)
+        return super().similarity_search(query, k=k, **kwargs)
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs) -> List[Document]:
+        await asyncio.sleep(self.latency)
+        return await super().asimilarity_search(query, k=k, **kwargs)
+
+    async def asimilarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs) -> List[Document]:
+        await asyncio.sleep(self.latency)
+        return self.similarity_search_by_vector(embedding, k=k, **kwargs)
+
+
+class FakeMemoryClient:
+    """Replacement for `mem0.AsyncMemoryClient`."""
+
+    def __init__(self, api_key: Optional[str] = None, **kwargs):
+        self.latency = _env_ms("FAKE_TOOL_LATENCY_MS", 150)
+        self.memories = {}
+        self.async_client = _FakeHttpClient()
+
+    async def add(self, messages, user_id=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        user_memories = self.memories.setdefault(user_id, [])
+        user_memories.extend(m["content"] for m in messages if m.get("role") == "user")
+        del user_memories[:-50]
+        return {"results": []}
+
+    async def search(self, query, user_id=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return [{"memory": m, "score": 0.5} for m in self.memories.get(user_id, [])[-5:]]
+
+
+class _FakeResponse:
+    def raise_for_status(self):
+        pass
+
+
+class _FakeHttpClient:
+    async def get(self, *args, **kwargs):
+        return _FakeResponse()
+
+
+def install():
+    """Swap the provider classes before any `ai.*` module is imported."""
+    import langchain_anthropic
+    import langchain_openai
+    import langchain_pinecone
+    import langchain_tavily
+    import mem0
+
+    langchain_openai.ChatOpenAI = FakeChatModel
+    langchain_anthropic.ChatAnthropic = FakeChatModel
+    langchain_openai.OpenAIEmbeddings = FakeEmbeddings
+    langchain_pinecone.PineconeVectorStore = FakeVectorStore
+    langchain_tavily.TavilySearch = FakeTavilySearch
+    mem0.AsyncMemoryClient = FakeMemoryClient
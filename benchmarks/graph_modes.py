@@ -0,0 +1,76 @@
+"""End-to-end turn latency: sequential supervisor handoffs vs parallel fan-out.
+
+Runs the same research-and-memory questions through `ai.graph.get_agent` in
+`handoff` and `parallel` mode with fake LLMs and tools, and reports per-turn
+latency percentiles and the number of LLM calls per turn.
+
+    python benchmarks/graph_modes.py --turns 30 --llm-latency-ms 400 --tool-latency-ms 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import HumanMessage
+
+from common import emit, summarize
+
+QUESTIONS = [
+    "What are good ways to soothe teething pain?",
+    "How much should a six month old sleep during the day?",
+    "Do you remember what I said about daycare? Any tips for the first week?",
+    "Which foods are best when starting solids?",
+]
+
+
+class LLMCallCounter(AsyncCallbackHandler):
+    def __init__(self):
+        self.calls = 0
+
+    async def on_chat_model_start(self, *args, **kwargs):
+        self.calls += 1
+
+
+async def bench_mode(mode: str, turns: int) -> dict:
+    from ai.graph import get_agent
+
+    agent = await get_agent(mode=mode)
+    latencies = []
+    llm_calls = []
+    for i in range(turns):
+        counter = LLMCallCounter()
+        config = {"configurable": {"thread_id": str(uuid.uuid4()), "user_id": 1}, "callbacks": [counter]}
+        start = time.perf_counter()
+        await agent.ainvoke({"messages": [HumanMessage(content=QUESTIONS[i % len(QUESTIONS)])]}, config)
+        latencies.append(time.perf_counter() - start)
+        llm_calls.append(counter.calls)
+    return {**summarize(latencies), "llm_calls_per_turn": statistics.fmean(llm_calls)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--llm-latency-ms", type=float, default=400)
+    parser.add_argument("--tool-latency-ms", type=float, default=200)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    os.environ.update({
+        "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "FAKE_TOOL_LATENCY_MS": str(args.tool_latency_ms),
+        # The handoff supervisor consults both sub-agents, as it does for these questions
+        "FAKE_LLM_TOOL_SCRIPT": "transfer_to_research_agent,transfer_to_relevant_memory_agent,"
+                                "web_search,search_pinecone,get_from_memory",
+    })
+    import fake_app  # noqa: F401
+
+    results = {mode: await bench_mode(mode, args.turns) for mode in ("handoff", "parallel")}
+    results["speedup_p50"] = round(results["handoff"]["p50_ms"] / results["parallel"]["p50_ms"], 2)
+    emit({"config": vars(args), "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+"""Throughput and memory of `ai.ingest` as the corpus grows.
+
+For each corpus size, a fresh process generates markdown and JSONL files,
+ingests them into the fake Pinecone index and BM25 index, then ingests again to
+check that unchanged files are skipped, then ingests a third time into an
+empty BM25 index to check it is rebuilt without embedding. Embedding
+requests take `--embed-latency-ms`, and a share of them fail with HTTP 429 to
+exercise backoff. Reports chunks/sec and peak RSS per size. The BM25 index is
+written to disk batch by batch; RSS still grows with the corpus because the
+fake Pinecone index keeps every vector in memory.
+
+    python benchmarks/ingest.py --sizes 1000,4000,16000 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from common import emit
+
+PARAGRAPH = (
+    "Babies grow quickly in the first year and every child develops at their own pace. "
+    "Keep a simple routine for feeding, naps and bedtime, and adjust it as needs change. "
+)
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+def write_corpus(directory: Path, chunks: int, chunk_size: int):
+    """Roughly `chunks` chunks, split over markdown files and one JSONL file."""
+    per_file = 50
+    text = PARAGRAPH * (chunk_size // len(PARAGRAPH) + 1)
+    for f in range(chunks // 2 // per_file):
+        with open(directory / f"guide-{f}.md", "w", encoding="utf-8") as file:
+            for c in range(per_file):
+                file.write(f"# Section {f}-{c}\n\n{text[:chunk_size - 40]}\n\n")
+    with open(directory / "articles.jsonl", "w", encoding="utf-8") as file:
+        for c in range(chunks - chunks // 2 // per_file * per_file):
+            file.write(json.dumps({"id": f"article-{c}", "text": f"Article {c}. {text[:chunk_size - 40]}"}) + "\n")
+
+
+async def run_single(args) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="ingest-bench-"))
+    corpus = workdir / "corpus"
+    corpus.mkdir()
+    write_corpus(corpus, args.single, args.chunk_size)
+    os.environ.update({
+        "FAKE_EMBED_LATENCY_MS": str(args.embed_latency_ms),
+        "BM25_INDEX_PATH": str(workdir / "bm25_index.sqlite"),
+    })
+    import fake_app  # noqa: F401
+    from ai import ingest
+    from ai.tools.bm25_index import BM25Index
+    from ai.tools.pinecone import vectorstore
+
+    embeddings = vectorstore.embeddings
+    original = embeddings.aembed_documents
+    rng = random.Random(0)
+
+    async def flaky_embed(texts):
+        if rng.random() < args.rate_limit_rate:
+            await asyncio.sleep(0.01)
+            raise RateLimitError("429 Too Many Requests")
+        return await original(texts)
+
+    object.__setattr__(embeddings, "aembed_documents", flaky_embed)
+
+    argv = [
+        str(corpus), "--state", str(workdir / "state.sqlite"), "--chunk-size", str(args.chunk_size),
+        "--chunk-overlap", "0", "--batch-size", str(args.batch_size), "--concurrency", str(args.concurrency),
+        "--progress-every", "1000000",
+    ]
+    first = await ingest.Ingestor(ingest.parse_args(argv)).run()
+    rerun = await ingest.Ingestor(ingest.parse_args(argv)).run()
+    bm25_documents = len(ingest.bm25_index)
+    ingest.bm25_index = BM25Index(str(workdir / "rebuilt_bm25_index.sqlite"))
+    rebuild = await ingest.Ingestor(ingest.parse_args(argv)).run()
+    return {
+        "first_run": first,
+        "rerun": rerun,
+        "rebuild": rebuild,
+        "stored_vectors": len(vectorstore.store),
+        "bm25_documents": bm25_documents,
+        "bm25_documents_rebuilt": len(ingest.bm25_index),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,4000,16000", help="Comma-separated corpus sizes in chunks")
+    parser.add_argument("--chunk-size", type=int, default=800)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--embed-latency-ms", type=float, default=100)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.05)
+    parser.add_argument("--single", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        print(json.dumps(asyncio.run(run_single(args))))
+        return
+
+    results = {}
+    for size in [int(s) for s in args.sizes.split(",")]:
+        command = [sys.executable, __file__, "--single", str(size)] + [
+            f"--{name.replace('_', '-')}={value}" for name, value in vars(args).items()
+            if name not in ("sizes", "single", "output")
+        ]
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        report = json.loads(output.strip().splitlines()[-1])
+        first = report["first_run"]
+        results[size] = {
+            "chunks": first["chunks"],
+            "chunks_per_second": first["chunks_per_second"],
+            "max_rss_mb": first["max_rss_mb"],
+            "seconds": first["seconds"],
+            "rerun_chunks": report["rerun"]["chunks"],
+            "rerun_files_skipped": report["rerun"]["files_skipped"],
+            "stored_vectors": report["stored_vectors"],
+            "bm25_documents": report["bm25_documents"],
+            "rebuild_chunks_embedded": report["rebuild"]["chunks"],
+            "rebuild_chunks_reindexed": report["rebuild"]["chunks_reindexed"],
+            "bm25_documents_rebuilt": report["bm25_documents_rebuilt"],
+        }
+    emit({"config": vars(args), "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
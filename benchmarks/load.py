@@ -0,0 +1,184 @@
+"""Offline load test of the chat API.
+
+Boots the app in-process with fake LLM/tool backends (see `fake_app.py`) and
+drives virtual users through register -> login -> create_chat followed by a
+weighted mix of chat operations. Reports throughput and p50/p95/p99 per
+endpoint as JSON.
+
+    python benchmarks/load.py --users 20 --duration 30 --llm-latency-ms 300
+    python benchmarks/load.py --mix send_message=6,get_chat_messages=3,list_chats=1 --output report.json
+
+Pass `--base-url` to drive an already running server instead (no fakes then).
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+from common import emit, summarize
+
+DEFAULT_MIX = "send_message=5,get_chat_messages=3,list_chats=1,create_chat=1"
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+class Recorder:
+    """Collects latencies and errors per endpoint."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, name: str, request):
+        start = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            return None
+        if response.status_code >= 400:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - start)
+        return response
+
+
+async def virtual_user(client: httpx.AsyncClient, recorder: Recorder, mix: dict, stop_at: float, rng: random.Random):
+    username = f"bench-{uuid.uuid4().hex[:12]}"
+    password = "bench-password"
+    await recorder.call("register", client.post("/api/auth/register", json={"username": username, "password": password}))
+    response = await recorder.call("login", client.post("/api/auth/login", data={"username": username, "password": password}))
+    if response is None:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    chat_ids = []
+
+    async def create_chat():
+        response = await recorder.call(
+            "create_chat", client.post("/api/chats/create_chat", json={"title": "Bench chat"}, headers=headers)
+        )
+        if response is not None:
+            chat_ids.append(response.json()["id"])
+
+    await create_chat()
+    operations = list(mix)
+    weights = [mix[name] for name in operations]
+    while time.monotonic() < stop_at and chat_ids:
+        operation = rng.choices(operations, weights)[0]
+        chat_id = rng.choice(chat_ids)
+        if operation == "create_chat":
+            await create_chat()
+        elif operation == "list_chats":
+            await recorder.call(operation, client.get("/api/chats/list_chats", headers=headers))
+        elif operation == "get_chat_messages":
+            await recorder.call(
+                operation, client.get("/api/chats/get_chat_messages", params={"chat_id": chat_id}, headers=headers)
+            )
+        elif operation == "send_message":
+            content = rng.choice([
+                "Hi Rosy!",
+                "My baby won't sleep through the night, what can I try?",
+                "I'm feeling overwhelmed with feedings and work.",
+                "When should we start solids?",
+                "Do you remember what I told you about daycare?",
+            ])
+            await recorder.call(
+                operation,
+                client.post("/api/chats/send_message", params={"chat_id": chat_id}, json={"content": content}, headers=headers),
+            )
+
+
+async def wait_ready(app, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while not getattr(app.state, "ready", False):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"App did not become ready: {app.state.warmup}")
+        await asyncio.sleep(0.05)
+
+
+async def run(args) -> dict:
+    recorder = Recorder()
+    mix = parse_mix(args.mix)
+
+    async def drive(client):
+        stop_at = time.monotonic() + args.duration
+        start = time.monotonic()
+        await asyncio.gather(*(
+            virtual_user(client, recorder, mix, stop_at, random.Random(args.seed + i)) for i in range(args.users)
+        ))
+        return time.monotonic() - start
+
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+            elapsed = await drive(client)
+    else:
+        os.environ.update({
+            "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+            "FAKE_LLM_STREAM_CHUNKS": str(args.stream_chunks),
+            "FAKE_TOOL_LATENCY_MS": str(args.tool_latency_ms),
+        })
+        if args.tool_script is not None:
+            os.environ["FAKE_LLM_TOOL_SCRIPT"] = args.tool_script
+        from fake_app import app
+
+        async with app.router.lifespan_context(app):
+            await wait_ready(app)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout) as client:
+                elapsed = await drive(client)
+
+    endpoints = {
+        name: summarize(recorder.latencies[name], elapsed, recorder.errors[name])
+        for name in sorted(set(recorder.latencies) | set(recorder.errors))
+    }
+    total = sum(len(v) for v in recorder.latencies.values())
+    return {
+        "config": {
+            "users": args.users,
+            "duration_s": args.duration,
+            "mix": mix,
+            "target": args.base_url or "in-process fake backends",
+            "llm_latency_ms": args.llm_latency_ms,
+            "tool_latency_ms": args.tool_latency_ms,
+        },
+        "elapsed_s": round(elapsed, 2),
+        "total_requests": total,
+        "throughput_rps": round(total / elapsed, 2),
+        "endpoints": endpoints,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds each user keeps issuing requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted operation mix, e.g. send_message=5,list_chats=1")
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--tool-latency-ms", type=float, default=150)
+    parser.add_argument("--stream-chunks", type=int, default=8)
+    parser.add_argument("--tool-script", default=None, help="Override FAKE_LLM_TOOL_SCRIPT")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--base-url", default=None)
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    emit(report, args.output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
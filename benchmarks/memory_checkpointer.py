@@ -0,0 +1,112 @@
+"""Memory held by the in-memory checkpointer: `MemorySaver` vs `BoundedMemorySaver`.
+
+Runs `--threads` chat threads for `--turns` turns each through a small graph
+(the app's `ConversationState`, a node answering with `--reply-chars`
+characters), with the app's checkpoint serde. Each thread has its turns one
+after another, like a conversation, so older threads go cold first. For each
+saver it reports the memory allocated by the saver (tracemalloc), the saver's
+own estimate, the threads and checkpoints it keeps, and how long reading a
+thread's latest checkpoint takes.
+
+    python benchmarks/memory_checkpointer.py --threads 2000 --turns 10 --max-threads 500 --max-mb 64 --keep 5
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from common import emit, summarize
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+
+def build_graph(saver, reply_chars: int):
+    from langchain_core.messages import AIMessage
+    from langgraph.graph import END, START, StateGraph
+
+    from ai.schemas import ConversationState
+
+    rng = random.Random(0)
+    words = ["sleep", "nap", "routine", "bedtime", "feeding", "baby", "night", "wake", "calm", "story"]
+
+    def answer(state: ConversationState):
+        text = " ".join(rng.choice(words) for _ in range(reply_chars // 6))
+        return {"messages": [AIMessage(content=text)]}
+
+    graph = StateGraph(ConversationState)
+    graph.add_node("agent", answer)
+    graph.add_edge(START, "agent")
+    graph.add_edge("agent", END)
+    return graph.compile(checkpointer=saver)
+
+
+async def run(saver, args) -> dict:
+    from langchain_core.messages import HumanMessage
+
+    agent = build_graph(saver, args.reply_chars)
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    for thread in range(args.threads):
+        for turn in range(args.turns):
+            config = {"configurable": {"thread_id": f"thread-{thread}"}}
+            await agent.ainvoke({"messages": [HumanMessage(content=f"Question {turn} about sleep")]}, config)
+    elapsed = time.perf_counter() - start
+    held = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    reads, kept_threads, messages = [], 0, []
+    for thread in range(args.threads):
+        config = {"configurable": {"thread_id": f"thread-{thread}"}}
+        read_start = time.perf_counter()
+        checkpoint_tuple = await saver.aget_tuple(config)
+        reads.append(time.perf_counter() - read_start)
+        if checkpoint_tuple is not None:
+            kept_threads += 1
+            messages.append(len(checkpoint_tuple.checkpoint["channel_values"]["messages"]))
+    checkpoints = sum(len(checkpoints) for namespaces in saver.storage.values() for checkpoints in namespaces.values())
+    return {
+        "turns_per_second": round(args.threads * args.turns / elapsed, 1),
+        "held_mb": round(held / 2 ** 20, 2),
+        "estimated_mb": round(saver.bytes / 2 ** 20, 2) if hasattr(saver, "bytes") else None,
+        "threads_kept": kept_threads,
+        "checkpoints_kept": checkpoints,
+        "messages_per_kept_thread": round(sum(messages) / len(messages), 1) if messages else 0,
+        "read_latest": summarize(reads),
+        "stats": saver.usage() if hasattr(saver, "usage") else None,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--reply-chars", type=int, default=1200)
+    parser.add_argument("--max-threads", type=int, default=500)
+    parser.add_argument("--max-mb", type=float, default=64)
+    parser.add_argument("--keep", type=int, default=5)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    from langgraph.checkpoint.memory import MemorySaver
+
+    from ai.memory_checkpointer import BoundedMemorySaver
+    from ai.serde import get_serde
+
+    results = {
+        "memory_saver": await run(MemorySaver(serde=get_serde()), args),
+        "bounded": await run(BoundedMemorySaver(
+            serde=get_serde(),
+            max_threads=args.max_threads,
+            max_bytes=int(args.max_mb * 2 ** 20),
+            keep_checkpoints=args.keep,
+        ), args),
+    }
+    emit({"config": vars(args), "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
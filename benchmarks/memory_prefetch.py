@@ -0,0 +1,85 @@
+"""Handoff-mode turns with and without the Mem0 prefetch.
+
+Without the prefetch the supervisor hands off to the memory agent, which makes
+its own LLM calls to search Mem0. With it, the search starts as the turn begins
+and its hits go to a supervisor without the memory agent. Reports per-turn
+latency percentiles and LLM calls per turn for both.
+
+    python benchmarks/memory_prefetch.py --turns 30 --llm-latency-ms 400 --tool-latency-ms 150
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+from langchain_core.messages import HumanMessage
+
+from common import emit, summarize
+
+QUESTIONS = [
+    "Do you remember what I said about daycare? Any tips for the first week?",
+    "What did I tell you about her sleep schedule? Is it still normal?",
+    "How should I handle the teething we talked about last time?",
+]
+
+SEEDED_MEMORIES = [
+    "Baby Maya is seven months old",
+    "Maya starts daycare next month",
+    "Maya naps twice a day, about an hour each",
+]
+
+
+async def bench(prefetch: bool, turns: int) -> dict:
+    from ai import graph
+    from ai.callbacks import LLMCallCounter
+    from ai.tools.memory import client
+
+    graph.prefetch_config["enabled"] = prefetch
+    agent = await graph.get_agent(mode="handoff")
+    latencies = []
+    llm_calls = []
+    for i in range(turns):
+        user_id = 1000 + i
+        client.memories[user_id] = list(SEEDED_MEMORIES)
+        counter = LLMCallCounter()
+        config = {"configurable": {"thread_id": str(uuid.uuid4()), "user_id": user_id}, "callbacks": [counter]}
+        start = time.perf_counter()
+        await agent.ainvoke({"messages": [HumanMessage(content=QUESTIONS[i % len(QUESTIONS)])]}, config)
+        latencies.append(time.perf_counter() - start)
+        llm_calls.append(counter.calls)
+    return {**summarize(latencies), "llm_calls_per_turn": statistics.fmean(llm_calls)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--llm-latency-ms", type=float, default=400)
+    parser.add_argument("--tool-latency-ms", type=float, default=150)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    os.environ.update({
+        "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "FAKE_TOOL_LATENCY_MS": str(args.tool_latency_ms),
+        # The supervisor consults the memory agent whenever it is available
+        "FAKE_LLM_TOOL_SCRIPT": "transfer_to_relevant_memory_agent,get_from_memory",
+    })
+    import fake_app  # noqa: F401
+
+    without = await bench(False, args.turns)
+    with_prefetch = await bench(True, args.turns)
+    emit({
+        "config": vars(args),
+        "results": {
+            "without_prefetch": without,
+            "with_prefetch": with_prefetch,
+            "llm_calls_saved_per_turn": round(without["llm_calls_per_turn"] - with_prefetch["llm_calls_per_turn"], 2),
+            "p50_saved_ms": round(without["p50_ms"] - with_prefetch["p50_ms"], 1),
+        },
+    }, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+"""Prompt cache hit ratio over long conversations.
+
+Replays multi-turn conversations through `ai.graph.get_agent` the way
+`ChatService.send_message` does and reports, per turn index, the share of input
+tokens the (fake) provider served from its prefix cache. The fake models cache
+like OpenAI: prompts of 1024+ tokens reuse the longest prefix shared with a
+recent prompt, in 128-token steps (see `FAKE_LLM_PREFIX_CACHE` in fakes.py).
+
+Each conversation starts from `--history-turns` earlier exchanges with answers
+of realistic length, since provider caches only apply past 1024 tokens.
+
+    python benchmarks/prompt_cache.py --conversations 5 --turns 8 --history-turns 4
+"""
+import argparse
+import asyncio
+import os
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from common import emit
+
+QUESTIONS = [
+    "What are good ways to soothe teething pain?",
+    "How much should a six month old sleep during the day?",
+    "Which foods are best when starting solids?",
+    "How do I know if she is getting enough milk?",
+    "Any tips for the first week of daycare?",
+    "Is it normal for him to wake up every two hours?",
+]
+
+# Roughly 300 tokens, the length of a typical supervisor answer
+EARLIER_ANSWER = (
+    "That sounds like a lot to handle, and you're doing your best. Babies at this age often go "
+    "through changes in sleep, feeding and mood at the same time, so it helps to look at the "
+    "whole day rather than a single night. "
+) * 6
+
+
+def earlier_exchanges(count: int) -> list:
+    messages = []
+    for i in range(count):
+        messages.append(HumanMessage(content=f"Earlier question {i}: {QUESTIONS[i % len(QUESTIONS)]}"))
+        messages.append(AIMessage(content=EARLIER_ANSWER))
+    return messages
+
+
+async def bench_mode(mode: str, conversations: int, turns: int, history_turns: int) -> dict:
+    from ai.callbacks import PromptCacheTracker
+    from ai.graph import get_agent
+
+    agent = await get_agent(mode=mode)
+    by_turn = [{"input_tokens": 0, "cache_read": 0} for _ in range(turns)]
+    for c in range(conversations):
+        config = {"configurable": {"thread_id": str(uuid.uuid4()), "user_id": c}}
+        messages = earlier_exchanges(history_turns)
+        for t in range(turns):
+            tracker = PromptCacheTracker()
+            messages = messages + [HumanMessage(content=QUESTIONS[(c + t) % len(QUESTIONS)])]
+            result = await agent.ainvoke({"messages": messages}, {**config, "callbacks": [tracker]})
+            messages = result["messages"]
+            by_turn[t]["input_tokens"] += tracker.input_tokens
+            by_turn[t]["cache_read"] += tracker.cache_read
+
+    total_input = sum(t["input_tokens"] for t in by_turn)
+    total_cached = sum(t["cache_read"] for t in by_turn)
+    return {
+        "hit_ratio": round(total_cached / total_input, 3) if total_input else 0.0,
+        "hit_ratio_by_turn": [round(t["cache_read"] / t["input_tokens"], 3) if t["input_tokens"] else 0.0 for t in by_turn],
+        "input_tokens_per_turn": [t["input_tokens"] // conversations for t in by_turn],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--history-turns", type=int, default=4)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    os.environ.update({"FAKE_LLM_LATENCY_MS": "0", "FAKE_TOOL_LATENCY_MS": "0"})
+    import fake_app  # noqa: F401
+    from ai.callbacks import prompt_cache_stats
+    from ai.prompt_registry import prompt_versions
+
+    results = {mode: await bench_mode(mode, args.conversations, args.turns, args.history_turns) for mode in ("handoff", "parallel")}
+    emit({
+        "config": vars(args),
+        "results": results,
+        "by_model": prompt_cache_stats(),
+        "prompt_versions": prompt_versions(),
+    }, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+"""Serialization time and bytes on the wire for large chat histories.
+
+For chats of each size in `--messages`, serves the same `ChatHistory` two ways
+from a throwaway FastAPI app, over ASGI with no network:
+
+    default     `response_model=ChatHistory`, returning validated SimpleMessage
+                objects (the previous `get_chat_messages` path)
+    optimized   plain dicts through `api.responses.json_response` (orjson, no
+                re-validation), uncompressed, gzip and brotli
+
+It also times a revalidation with `If-None-Match`, which skips the body. The
+server time covers building the payload and encoding it, not reading the
+checkpoint.
+
+    python benchmarks/response_encoding.py --messages 100,1000,5000 --repeat 30
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+from common import emit, summarize
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from checkpoint_serde import text  # noqa: E402
+
+
+def make_messages(rng: random.Random, count: int) -> list:
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    return [
+        HumanMessage(content=text(rng, rng.randint(40, 300))) if i % 2 == 0
+        else AIMessage(content=text(rng, rng.randint(300, 1500)))
+        for i in range(count)
+    ]
+
+
+def build_app(chats: dict):
+    from fastapi import FastAPI, Request
+
+    from api.models import ChatHistory, SimpleMessage
+    from api.responses import etag_matches, json_response, not_modified
+
+    app = FastAPI()
+    app.state.server_seconds = []
+
+    @app.get("/default/{size}", response_model=ChatHistory)
+    async def default(size: int):
+        messages = [SimpleMessage(content=m.content, type=m.type) for m in chats[size]]
+        return ChatHistory(messages=messages, title="Bench chat", thread_id="bench")
+
+    @app.get("/optimized/{size}")
+    async def optimized(size: int, request: Request):
+        start = time.perf_counter()
+        etag = f'"bench-{size}"'
+        if etag_matches(request, etag):
+            response = not_modified(etag)
+        else:
+            payload = {
+                "messages": [{"content": m.content, "type": m.type} for m in chats[size]],
+                "title": "Bench chat",
+                "thread_id": "bench",
+            }
+            response = await json_response(request, payload, etag=etag)
+        app.state.server_seconds.append(time.perf_counter() - start)
+        return response
+
+    return app
+
+
+async def measure(client, url: str, headers: dict, repeat: int) -> dict:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code in (200, 304), response.status_code
+    return {
+        "status": response.status_code,
+        "content_encoding": response.headers.get("content-encoding"),
+        "bytes": len(response.content) if response.status_code == 304 else int(response.headers["content-length"]),
+        "request": summarize(latencies),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", default="100,1000,5000")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    import httpx
+
+    from api import responses
+
+    rng = random.Random(0)
+    sizes = [int(size) for size in args.messages.split(",")]
+    chats = {size: make_messages(rng, size) for size in sizes}
+    app = build_app(chats)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for size in sizes:
+            runs = {"default": await measure(client, f"/default/{size}", {"Accept-Encoding": "identity"}, args.repeat)}
+            variants = {
+                "optimized": {"Accept-Encoding": "identity"},
+                "optimized_gzip": {"Accept-Encoding": "gzip"},
+                "optimized_br": {"Accept-Encoding": "br, gzip"},
+                "revalidated_304": {"If-None-Match": f'"bench-{size}"'},
+            }
+            for name, headers in variants.items():
+                app.state.server_seconds = []
+                runs[name] = await measure(client, f"/optimized/{size}", headers, args.repeat)
+                runs[name]["server"] = summarize(app.state.server_seconds)
+            results[size] = runs
+
+    emit({
+        "config": vars(args),
+        "orjson": responses.orjson is not None,
+        "brotli": responses.brotli is not None,
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+"""Recall@k and latency of vector, BM25 and hybrid retrieval for `search_pinecone`.
+
+By default builds a synthetic corpus in which every chunk carries one exact
+term (an infant medicine or product name) amid generic parenting text, and asks
+for each term by name: the case dense embeddings handle poorly. Vectors come
+from a small feature-hashing embedding (`fakes.HashingEmbeddings`) in an
+in-memory store. Your own data can be evaluated instead with JSONL files:
+
+    corpus:  {"id": "...", "text": "..."} per line
+    queries: {"query": "...", "relevant": ["id", ...]} per line
+
+    python benchmarks/retrieval_eval.py --docs 2000 --queries 200
+    python benchmarks/retrieval_eval.py --corpus corpus.jsonl --queries-file queries.jsonl
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import tempfile
+import time
+
+from langchain_core.documents import Document
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from common import emit, summarize
+
+GENERIC = [
+    "Babies grow quickly in the first year and every child develops at their own pace.",
+    "Keep a simple routine for feeding, naps and bedtime.",
+    "Always check the label and ask your pediatrician before giving any medicine.",
+    "Fever in young infants should be discussed with a doctor.",
+    "Offer plenty of fluids when your baby is unwell.",
+    "Measure liquid doses with the syringe that comes with the bottle.",
+    "Many parents find it helpful to keep a symptom diary.",
+    "Store medicines out of reach of children.",
+]
+SYLLABLES = ["zo", "va", "rex", "pel", "mi", "cort", "lu", "dran", "ti", "nex", "so", "fen", "qua", "bril"]
+
+
+def synthetic_corpus(docs: int, queries: int, rng: random.Random):
+    names = set()
+    while len(names) < docs:
+        names.add("".join(rng.choice(SYLLABLES) for _ in range(3)).capitalize())
+    corpus = []
+    for i, name in enumerate(sorted(names)):
+        sentences = rng.sample(GENERIC, 5)
+        sentences.insert(rng.randrange(6), f"{name} infant suspension is given at {rng.randint(1, 10)} ml per dose.")
+        corpus.append({"id": f"doc-{i}", "text": " ".join(sentences), "name": name})
+    asked = rng.sample(corpus, min(queries, len(corpus)))
+    return corpus, [{"query": f"What is the infant dose of {doc['name']}?", "relevant": [doc["id"]]} for doc in asked]
+
+
+def read_jsonl(path: str) -> list:
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+async def evaluate(name: str, search, queries: list, ks: list) -> dict:
+    hits = {k: 0 for k in ks}
+    latencies = []
+    for row in queries:
+        start = time.perf_counter()
+        docs = await search(row["query"], max(ks))
+        latencies.append(time.perf_counter() - start)
+        ids = [doc.id for doc in docs]
+        for k in ks:
+            hits[k] += bool(set(ids[:k]) & set(row["relevant"]))
+    stats = summarize(latencies)
+    return {
+        **{f"recall@{k}": round(hits[k] / len(queries), 3) for k in ks},
+        "p50_ms": stats["p50_ms"],
+        "p95_ms": stats["p95_ms"],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--corpus", default=None)
+    parser.add_argument("--queries-file", default=None)
+    parser.add_argument("--dimensions", type=int, default=64)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    import fake_app  # noqa: F401
+    from fakes import FakeIndex, HashingEmbeddings
+
+    from ai.tools.bm25_index import BM25Index
+
+    pinecone_tools = importlib.import_module("ai.tools.pinecone")
+
+    if args.corpus:
+        corpus, queries = read_jsonl(args.corpus), read_jsonl(args.queries_file)
+    else:
+        corpus, queries = synthetic_corpus(args.docs, args.queries, random.Random(0))
+
+    store = InMemoryVectorStore(embedding=HashingEmbeddings(args.dimensions))
+    start = time.perf_counter()
+    store.add_documents([Document(id=row["id"], page_content=row["text"]) for row in corpus])
+    vector_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = BM25Index(os.path.join(tempfile.mkdtemp(prefix="bm25-eval-"), "bm25_index.sqlite"))
+    for row in corpus:
+        index.add(row["id"], row["text"])
+    index.save()
+    bm25_build = time.perf_counter() - start
+
+    # Lexical hits get their text from the store, as they do from Pinecone
+    store.index = FakeIndex(store.store)
+    pinecone_tools.vectorstore = store
+    pinecone_tools.query_batcher = pinecone_tools.QueryBatcher(store, window=0)
+    pinecone_tools.bm25_index = index
+
+    async def lexical(query, k):
+        return await asyncio.to_thread(index.search, query, k)
+
+    ks = [1, 5, 10]
+    results = {
+        "vector": await evaluate("vector", pinecone_tools.query_batcher.search, queries, ks),
+        "bm25": await evaluate("bm25", lexical, queries, ks),
+        "hybrid_rrf": await evaluate("hybrid", pinecone_tools.hybrid_search, queries, ks),
+    }
+    emit({
+        "config": vars(args),
+        "corpus_docs": len(corpus),
+        "queries": len(queries),
+        "build_seconds": {"vector": round(vector_build, 2), "bm25": round(bm25_build, 2)},
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+"""What a chat thread persists per turn, and what the messages reducer costs.
+
+Part 1 drives `--turns` turns through the real graph (`ai.graph.get_agent`,
+fake models, in-memory checkpointer) the way `ChatService.send_message` does.
+It reports the checkpoints written per turn (root thread vs. sub-agent
+namespaces), the bytes stored, and the size of the latest root checkpoint.
+
+Part 2 times `add_messages` for one turn at several history lengths. It
+compares the old pattern, where the node returned the whole history plus the
+reply and the whole history was merged again, with the new one, where only the
+new message goes through the reducer.
+
+Part 3 offers the compiled supervisor both handoffs at once and fails unless
+it makes one per response: its model is bound with `parallel_tool_calls=False`,
+and the fake models honour that only if the binding reaches them.
+
+    python benchmarks/thread_state.py --turns 20 --histories 50,200,1000
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from common import emit, summarize
+
+
+async def persisted_per_turn(turns: int) -> dict:
+    # Count every checkpoint written: don't let the in-memory checkpointer prune them
+    os.environ["MEMORY_CHECKPOINT_KEEP"] = str(10 ** 6)
+    import fake_app  # noqa: F401
+    from langchain_core.messages import HumanMessage
+
+    from ai.checkpointer import get_checkpointer
+    from api.chat.routing import chat_service
+
+    await chat_service._ensure_initialized()
+    saver = await get_checkpointer()
+    config = {"configurable": {"thread_id": "thread-state-bench", "user_id": 1}}
+    questions = [
+        "Can you research a good bedtime routine for my baby?",
+        "Thanks, that helps!",
+        "Please research how much a 6 month old should sleep",
+        "What did I tell you about my daughter last week?",
+    ]
+    latencies = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        await chat_service.agent.ainvoke(
+            {"messages": [HumanMessage(content=questions[turn % len(questions)])]}, config
+        )
+        latencies.append(time.perf_counter() - start)
+
+    namespaces = saver.storage["thread-state-bench"]
+    latest = await saver.aget_tuple(config)
+    blob_bytes = sum(len(value[1]) for key, value in saver.blobs.items() if key[0] == "thread-state-bench")
+    write_bytes = sum(
+        len(write[3]) for key, writes in saver.writes.items() if key[0] == "thread-state-bench" for write in writes.values()
+    )
+    latest_bytes = sum(
+        len(saver.serde.dumps_typed(value)[1]) for value in latest.checkpoint["channel_values"].values()
+    )
+    return {
+        "turns": turns,
+        "root_checkpoints_per_turn": round(len(namespaces.get("", {})) / turns, 2),
+        "subgraph_checkpoints_per_turn": round(
+            sum(len(checkpoints) for ns, checkpoints in namespaces.items() if ns) / turns, 2
+        ),
+        "subgraph_namespaces": sum(1 for ns in namespaces if ns),
+        "stored_blob_bytes": blob_bytes,
+        "stored_write_bytes": write_bytes,
+        "latest_checkpoint_messages": len(latest.checkpoint["channel_values"]["messages"]),
+        "latest_checkpoint_bytes": latest_bytes,
+        "latest_checkpoint_channels": sorted(latest.checkpoint["channel_values"]),
+        "turn": summarize(latencies),
+    }
+
+
+async def supervisor_handoffs() -> dict:
+    import fake_app  # noqa: F401
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    from ai.agents import config, get_supervisor_agent
+    from ai.llms import get_llm_from_config
+
+    chain = get_llm_from_config(config["llm_models"]["supervisor"])
+    fakes = [getattr(model, "primary", model) for model in getattr(chain, "models", [chain])]
+    scripts = [model.tool_script for model in fakes]
+    for model in fakes:
+        model.tool_script = ["transfer_to_research_agent", "transfer_to_relevant_memory_agent"]
+    try:
+        supervisor = await get_supervisor_agent()
+        # Parallel handoffs would fan out again on every round; a low limit makes that fail fast
+        result = await supervisor.ainvoke(
+            {"messages": [HumanMessage(content="Research sleep and recall my notes")]}, {"recursion_limit": 8}
+        )
+    finally:
+        for model, script in zip(fakes, scripts):
+            model.tool_script = script
+    per_response = [
+        sum(call["name"].startswith("transfer_to_") for call in m.tool_calls)
+        for m in result["messages"]
+        if isinstance(m, AIMessage) and m.name == "supervisor" and m.tool_calls
+    ]
+    assert per_response and max(per_response) == 1, f"handoffs per supervisor response: {per_response}"
+    return {"handoffs_per_response": per_response}
+
+
+def reducer_cost(histories: list, repeat: int) -> dict:
+    from langchain_core.messages import AIMessage, HumanMessage
+    from langgraph.graph.message import add_messages
+
+    results = {}
+    for size in histories:
+        history = add_messages([], [
+            (HumanMessage if i % 2 == 0 else AIMessage)(content=f"message {i} " * 20) for i in range(size)
+        ])
+        reply = AIMessage(content="A new answer")
+        full, delta = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            add_messages(history, history + [reply])
+            full.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            add_messages(history, [reply])
+            delta.append(time.perf_counter() - start)
+        results[size] = {
+            "whole_history_p50_ms": summarize(full)["p50_ms"],
+            "new_message_only_p50_ms": summarize(delta)["p50_ms"],
+        }
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--histories", default="50,200,1000")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    emit({
+        "config": vars(args),
+        "persisted": await persisted_per_turn(args.turns),
+        "supervisor": await supervisor_handoffs(),
+        "reducer_per_turn": reducer_cost([int(h) for h in args.histories.split(",")], args.repeat),
+    }, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
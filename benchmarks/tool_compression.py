@@ -0,0 +1,125 @@
+"""Tokens the research agent receives from its tools, with and without compression.
+
+Builds web search results and retrieved chunks for a set of parenting
+questions from a pool of varied sentences. A share of the sentences answer the
+question; the rest is off-topic filler, and results overlap the way syndicated
+articles do. Formats them with `web_search.format_results` and
+`pinecone.format_docs` with and without a token budget, and reports tokens,
+how many answering sentences survive, and compression time.
+
+    python benchmarks/tool_compression.py --results 5 --sentences 30
+"""
+import argparse
+import random
+import time
+
+from langchain_core.documents import Document
+
+from common import emit
+
+TOPICS = {
+    "teething": [
+        "Chilled teething rings can ease sore gums during teething.",
+        "Teething usually starts between four and seven months.",
+        "Gently rubbing the gums with a clean finger helps teething pain.",
+        "Avoid teething gels with benzocaine for babies.",
+        "Extra drooling and chewing are common signs of teething.",
+    ],
+    "sleep": [
+        "Most six month olds need two to three naps during the day.",
+        "A consistent bedtime routine helps babies fall asleep.",
+        "Sleep regressions often happen around four months.",
+        "Babies should always be put to sleep on their backs.",
+        "Total daily sleep at six months is around fourteen hours.",
+    ],
+    "solids": [
+        "Starting solids is recommended at around six months.",
+        "Iron-rich foods are good first foods when starting solids.",
+        "Introduce common allergens early and one at a time when starting solids.",
+        "Offer soft finger foods once the baby can sit up for solids.",
+        "Honey should not be given before twelve months.",
+    ],
+}
+QUESTIONS = {
+    "teething": "What helps with teething pain and gums?",
+    "sleep": "How many naps and how much sleep does a six month old need?",
+    "solids": "What are the best first foods when starting solids?",
+}
+FILLER = [
+    "Subscribe to our newsletter for weekly updates.",
+    "This article was medically reviewed by our editorial team.",
+    "Every family is different, so trust your instincts.",
+    "Share this article with other new parents.",
+    "Cookies help us deliver our services.",
+    "Related reading can be found in our parenting guides section.",
+    "Parenting can be both rewarding and exhausting.",
+    "Talk to your pediatrician if you have any concerns.",
+]
+
+
+def make_texts(topic: str, count: int, sentences: int, rng: random.Random) -> list:
+    relevant = TOPICS[topic]
+    off_topic = [s for other, items in TOPICS.items() if other != topic for s in items] + FILLER
+    texts = []
+    for _ in range(count):
+        picked = rng.sample(relevant, 3) + [rng.choice(off_topic) for _ in range(sentences - 3)]
+        rng.shuffle(picked)
+        texts.append(" ".join(picked))
+    return texts
+
+
+def measure(format_fn, topic: str, texts: list, budget) -> dict:
+    start = time.perf_counter()
+    output = format_fn(texts, QUESTIONS[topic], budget)
+    seconds = time.perf_counter() - start
+    answering = sum(1 for sentence in TOPICS[topic] if sentence in output)
+    return {"tokens": len(output) // 4 + 1, "answering_sentences": answering, "ms": seconds * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", type=int, default=5)
+    parser.add_argument("--sentences", type=int, default=30, help="Sentences per result or chunk")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    import fake_app  # noqa: F401
+    from ai.tools.pinecone import PINECONE_TOKEN_BUDGET, format_docs
+    from ai.tools.web_search import WEB_SEARCH_TOKEN_BUDGET, format_results
+
+    tools = {
+        "web_search": (
+            lambda texts, query, budget: format_results(
+                [{"title": f"Result {i}", "url": f"https://example.com/{i}", "content": t} for i, t in enumerate(texts)],
+                query, budget,
+            ),
+            WEB_SEARCH_TOKEN_BUDGET,
+        ),
+        "search_pinecone": (
+            lambda texts, query, budget: format_docs([Document(page_content=t) for t in texts], query, budget),
+            PINECONE_TOKEN_BUDGET,
+        ),
+    }
+    rng = random.Random(0)
+    report = {}
+    for name, (format_fn, budget) in tools.items():
+        totals = {"raw": [], "compressed": []}
+        for round_ in range(args.rounds):
+            topic = list(TOPICS)[round_ % len(TOPICS)]
+            texts = make_texts(topic, args.results, args.sentences, rng)
+            totals["raw"].append(measure(format_fn, topic, texts, 0))
+            totals["compressed"].append(measure(format_fn, topic, texts, budget))
+        report[name] = {
+            "budget_tokens": budget,
+            **{
+                variant: {key: round(sum(r[key] for r in rows) / len(rows), 2) for key in rows[0]}
+                for variant, rows in totals.items()
+            },
+        }
+        report[name]["token_reduction"] = round(1 - report[name]["compressed"]["tokens"] / report[name]["raw"]["tokens"], 3)
+    emit({"config": vars(args), "results": report}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Latency of one research-agent step that issues several searches at once.
+
+Feeds the same AI message (distinct and repeated `search_pinecone` and
+`web_search` calls) to a plain ToolNode with one embedding request per search,
+and to the research agent's ToolNode with `ToolExecutor` and the batched
+Pinecone tool. Reports step latency percentiles, embedding requests per step
+and tool messages returned.
+
+    python benchmarks/tool_fanout.py --steps 30 --pinecone-queries 4 --duplicates 2
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+from common import emit, summarize
+
+
+def step_message(pinecone_queries: int, duplicates: int, step: int) -> AIMessage:
+    calls = [("search_pinecone", {"query": f"sleep advice {step}-{i}"}) for i in range(pinecone_queries)]
+    calls += [("web_search", {"query": f"teething remedies {step}"})] * (1 + duplicates)
+    calls += [("search_pinecone", {"query": f"sleep advice {step}-0"})] * duplicates
+    return AIMessage(
+        content="",
+        tool_calls=[{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}", "type": "tool_call"} for name, args in calls],
+    )
+
+
+def single_step_graph(node):
+    from langgraph.graph import END, START, MessagesState, StateGraph
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("tools", node)
+    graph.add_edge(START, "tools")
+    graph.add_edge("tools", END)
+    return graph.compile()
+
+
+async def bench(node, embeddings, args) -> dict:
+    graph = single_step_graph(node)
+    latencies = []
+    embed_requests = 0
+    tool_messages = 0
+    for step in range(args.steps):
+        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+        before = embeddings.requests
+        start = time.perf_counter()
+        result = await graph.ainvoke({"messages": [step_message(args.pinecone_queries, args.duplicates, step)]}, config)
+        latencies.append(time.perf_counter() - start)
+        embed_requests += embeddings.requests - before
+        tool_messages += len(result["messages"]) - 1
+    return {
+        **summarize(latencies),
+        "embedding_requests_per_step": embed_requests / args.steps,
+        "tool_messages_per_step": tool_messages / args.steps,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=30)
+    parser.add_argument("--pinecone-queries", type=int, default=4)
+    parser.add_argument("--duplicates", type=int, default=2)
+    parser.add_argument("--tool-latency-ms", type=float, default=150)
+    parser.add_argument("--embed-latency-ms", type=float, default=100)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    os.environ.update({
+        "FAKE_TOOL_LATENCY_MS": str(args.tool_latency_ms),
+        "FAKE_EMBED_LATENCY_MS": str(args.embed_latency_ms),
+    })
+    import fake_app  # noqa: F401
+    from langgraph.prebuilt import ToolNode
+
+    from ai.agents import get_research_agent
+    from ai.tools import web_search
+    from ai.tools.pinecone import vectorstore
+
+    @tool("search_pinecone")
+    async def unbatched_search_pinecone(query: str, k: int = 5) -> str:
+        """Search the Pinecone index for the most relevant documents."""
+        vector = await vectorstore.embeddings.aembed_query(query)
+        docs = await vectorstore.asimilarity_search_by_vector(vector, k=k)
+        return "\n\n".join(doc.page_content for doc in docs)
+
+    baseline = ToolNode([web_search, unbatched_search_pinecone])
+    batched = get_research_agent().get_graph().nodes["tools"].data
+
+    emit({
+        "config": vars(args),
+        "results": {
+            "plain_tool_node": await bench(baseline, vectorstore.embeddings, args),
+            "tool_executor": await bench(batched, vectorstore.embeddings, args),
+        },
+    }, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""Turn latency under a deadline (`ai.deadline.TurnBudget`), and what it gives up.
+
+Runs `--turns` research turns through `ChatService.send_message` on the real
+graph with fake models and tools, once per deadline in `--deadlines`. Each
+deadline scales the `deadline` section of config.yaml, so `research`, `memory`
+and `answer` keep their proportions of `seconds`. The report gives each
+deadline's turn latency, how many turns overran it and how often each
+degradation fired.
+
+    python benchmarks/turn_deadline.py --deadlines 2,4,8,45 --turns 10 --tool-latency-ms 800
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+
+from common import emit, summarize
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deadlines", default="2,4,8,45")
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--tool-latency-ms", type=float, default=800)
+    parser.add_argument("--graph-mode", choices=["handoff", "parallel"], default="handoff")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["FAKE_TOOL_LATENCY_MS"] = str(args.tool_latency_ms)
+    os.environ["GRAPH_MODE"] = args.graph_mode
+    import fake_app  # noqa: F401
+    from sqlmodel import Session
+
+    from ai.deadline import deadline_settings
+    from api.chat.routing import chat_service
+    from api.db import engine, init_db
+    from api.models import User
+
+    init_db()
+    configured = dict(deadline_settings)
+    results = {}
+    with Session(engine) as session:
+        user = User(username=f"bench-deadline-{os.getpid()}")
+        session.add(user)
+        session.commit()
+        for seconds in [float(s) for s in args.deadlines.split(",")]:
+            scale = seconds / configured["seconds"]
+            deadline_settings.update({stage: value * scale for stage, value in configured.items()})
+            chat = chat_service.create_chat(session, user, f"bench {seconds}")
+            latencies, degraded, overran = [], Counter(), 0
+            for turn in range(args.turns):
+                start = time.perf_counter()
+                result = await chat_service.send_message(
+                    session, chat, f"Please research how much a 6 month old should sleep ({turn})", user
+                )
+                latencies.append(time.perf_counter() - start)
+                degraded.update(result.get("degraded", []))
+                overran += latencies[-1] > seconds
+            results[seconds] = {
+                "turn": summarize(latencies),
+                "overran_deadline": overran,
+                "degraded": dict(degraded),
+            }
+        deadline_settings.update(configured)
+
+    emit({"config": vars(args), "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
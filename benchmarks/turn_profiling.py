@@ -0,0 +1,113 @@
+"""Cost of the turn profiling hook (`api.profiling`), off and on.
+
+Serves the app (fake models and tools, see `fake_app.py`) with uvicorn on a
+local port and sends `--turns` `send_message` requests for each mode:
+
+    off         no header and no sampling: the hook only times the turn
+    timeline    `X-Profile: 1` from an admin: service stages, graph nodes,
+                tool and LLM calls
+    cpu         `X-Profile: cpu`: the timeline plus a pyinstrument profile
+
+It reports each mode's turn latency, the cost of a disabled `profiling.span`
+call, and the slowest events of the last profiled turn as read back from
+`/api/admin/slow_turns/{id}`.
+
+    python benchmarks/turn_profiling.py --turns 20 --llm-latency-ms 100
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from common import emit, summarize
+
+
+def disabled_span_ns(calls: int = 200_000) -> float:
+    from api import profiling
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        with profiling.span("bench"):
+            pass
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--llm-latency-ms", type=float, default=100)
+    parser.add_argument("--tool-latency-ms", type=float, default=100)
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    os.environ.update({
+        "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "FAKE_TOOL_LATENCY_MS": str(args.tool_latency_ms),
+        "ADMIN_USERNAMES": "bench-profiler",
+        "PROFILE_SAMPLE_RATE": "0",
+    })
+    import fake_app
+    import httpx
+    import uvicorn
+
+    from api import profiling
+
+    server = uvicorn.Server(uvicorn.Config(fake_app.app, host="127.0.0.1", port=args.port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    results = {"disabled_span_ns": round(disabled_span_ns(), 1)}
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=60) as client:
+            await client.post("/api/auth/register", json={"username": "bench-profiler", "password": "bench"})
+            token = (await client.post("/api/auth/login", data={"username": "bench-profiler", "password": "bench"})).json()
+            headers = {"Authorization": f"Bearer {token['access_token']}"}
+            modes = {"off": None, "timeline": "1", "cpu": "cpu"}
+            chats = {
+                mode: (await client.post("/api/chats/create_chat", json={"title": mode}, headers=headers)).json()
+                for mode in modes
+            }
+
+            # Compile the agents before timing anything
+            await client.post("/api/chats/send_message", params={"chat_id": chats["off"]["id"]},
+                              json={"content": "Please research sleep"}, headers=headers)
+            # Modes take turns, so drift over the run affects each of them alike
+            latencies = {mode: [] for mode in modes}
+            profile_id = None
+            for turn in range(args.turns):
+                for mode, header in modes.items():
+                    start = time.perf_counter()
+                    response = await client.post(
+                        "/api/chats/send_message",
+                        params={"chat_id": chats[mode]["id"]},
+                        json={"content": f"Please research how much a 6 month old should sleep ({turn})"},
+                        headers={**headers, **({profiling.PROFILE_HEADER: header} if header else {})},
+                    )
+                    latencies[mode].append(time.perf_counter() - start)
+                    response.raise_for_status()
+                    profile_id = response.headers.get("X-Profile-Id", profile_id)
+            results.update({mode: summarize(latencies[mode]) for mode in modes})
+
+            turn = (await client.get(f"/api/admin/slow_turns/{profile_id}", headers=headers)).json()
+            slowest = sorted(turn["timeline"], key=lambda event: event["duration_ms"], reverse=True)[:10]
+            results["last_profiled_turn"] = {
+                "duration_ms": turn["duration_ms"],
+                "events": len(turn["timeline"]),
+                "kinds": sorted({event["kind"] for event in turn["timeline"]}),
+                "slowest_events": slowest,
+                "cpu_profile_lines": len((turn["cpu_profile"] or "").splitlines()),
+            }
+            results["slow_turns_kept"] = len(
+                (await client.get("/api/admin/slow_turns", params={"limit": 500}, headers=headers)).json()["turns"]
+            )
+    finally:
+        server.should_exit = True
+        await serving
+
+    emit({"config": vars(args), "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+"""Cost of recording LLM usage per call vs. aggregating it in `api.usage.UsageLedger`.
+
+Simulates `--calls` LLM calls from `--users` users over the agents and models
+of a turn. "per_call" writes each call to the `llmusage` table as it finishes
+(one upsert and commit on the turn's path). "ledger" is what the app does:
+`UsageLedger.record` adds to an in-memory bucket, and `flush` writes all the
+buckets every `--flush-every` calls. Reports the time added to each call, the
+total database time and rows written, and the cost of the soft quota check
+run before every turn. Both modes must end with the same totals.
+
+Uses a temporary SQLite file unless BENCH_DATABASE_URL is set:
+
+    python benchmarks/usage_ledger.py --calls 20000 --users 200 --flush-every 2000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from common import emit, summarize
+
+AGENTS = [("supervisor", "gpt-4o"), ("research_agent", "gpt-4.1-mini"), ("agent", "gpt-4.1-mini"),
+          ("memory", "claude-haiku-4-5")]
+
+
+def make_calls(rng: random.Random, calls: int, user_ids: list) -> list:
+    return [
+        (
+            rng.choice(user_ids),
+            *rng.choice(AGENTS),
+            {"input_tokens": rng.randint(300, 4000), "output_tokens": rng.randint(10, 600),
+             "input_token_details": {"cache_read": rng.choice([0, 0, 1024])}},
+            rng.uniform(0.3, 4.0),
+        )
+        for _ in range(calls)
+    ]
+
+
+def totals(engine, user_ids: list) -> tuple:
+    from sqlalchemy import func
+    from sqlmodel import Session, select
+
+    from api.models import LLMUsage
+
+    with Session(engine) as session:
+        calls, tokens = session.exec(
+            select(func.sum(LLMUsage.calls), func.sum(LLMUsage.input_tokens + LLMUsage.output_tokens))
+            .where(LLMUsage.user_id.in_(user_ids))
+        ).one()
+    return calls, tokens
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--flush-every", type=int, default=2000, help="Calls between ledger flushes")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    import fake_app  # noqa: F401
+    from sqlmodel import Session
+
+    from api.db import engine, init_db
+    from api.models import User
+    from api.usage import UsageLedger
+
+    init_db()
+    rng = random.Random(0)
+    suffix = f"{int(time.time())}-{rng.randrange(10 ** 6)}"
+    results = {}
+    for mode in ("per_call", "ledger"):
+        with Session(engine) as session:
+            users = [User(username=f"bench-usage-{mode}-{suffix}-{u}") for u in range(args.users)]
+            session.add_all(users)
+            session.commit()
+            user_ids = [user.id for user in users]
+        calls = make_calls(random.Random(1), args.calls, user_ids)
+        ledger = UsageLedger(engine)
+        per_call, flushes = [], []
+        start = time.perf_counter()
+        for i, call in enumerate(calls, 1):
+            t0 = time.perf_counter()
+            ledger.record(*call)
+            if mode == "per_call":
+                await ledger.flush()
+            per_call.append(time.perf_counter() - t0)
+            if mode == "ledger" and i % args.flush_every == 0:
+                t0 = time.perf_counter()
+                await ledger.flush()
+                flushes.append(time.perf_counter() - t0)
+        if mode == "ledger":
+            t0 = time.perf_counter()
+            await ledger.flush()
+            flushes.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+
+        quota = []
+        with Session(engine) as session:
+            for user_id in user_ids[:50]:
+                for _ in range(20):
+                    t0 = time.perf_counter()
+                    ledger.usage_today(session, user_id)
+                    quota.append(time.perf_counter() - t0)
+
+        written_calls, tokens = totals(engine, user_ids)
+        results[mode] = {
+            "added_per_call": summarize(per_call),
+            "flushes": summarize(flushes) if flushes else None,
+            "database_seconds": round(sum(flushes) if flushes else elapsed, 3),
+            "rows_written": ledger.stats["rows_written"],
+            "calls_recorded": written_calls,
+            "tokens_recorded": tokens,
+            "quota_check": summarize(quota),
+        }
+    results["same_totals"] = (
+        results["per_call"]["calls_recorded"] == results["ledger"]["calls_recorded"]
+        and results["per_call"]["tokens_recorded"] == results["ledger"]["tokens_recorded"]
+    )
+    emit({"config": vars(args), "database": engine.dialect.name, "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
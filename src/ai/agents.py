@@ -1,14 +1,21 @@
-from langgraph.prebuilt import create_react_agent
-from langgraph_supervisor import create_supervisor
-from langchain_core.messages import HumanMessage, SystemMessage
+from langgraph.prebuilt import create_react_agent, ToolNode
+from langgraph.graph import StateGraph, MessagesState, START, END
+from langgraph_supervisor import create_handoff_tool
+from langgraph_supervisor.handoff import create_handoff_back_messages
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
 from ai.checkpointer import get_checkpointer
-from ai.llms import get_llm
+from ai.llms import get_llm_from_config
+from ai.failover import breaker_settings
+from ai.deadline import deadline_settings
+from ai.prompt_registry import get_prompt
 from ai.tools import (
     add_to_memory,
     get_from_memory,
     web_search,
     search_pinecone
 )
+from ai.tools.executor import ToolExecutor
 import yaml
 from pathlib import Path
 
@@ -18,61 +25,139 @@ BASE_DIR = Path(__file__).parent
 with open(f'{BASE_DIR}/config.yaml', 'r') as file:
     config = yaml.safe_load(file)
 
+breaker_settings.update(config.get("circuit_breaker", {}))
+deadline_settings.update(config.get("deadline", {}))
+
+# Global agent instances, compiled once per process
+_supervisor_agent_instances = {}
+_fast_agent_instance = None
+_research_agent_instance = None
+
 
 def get_research_agent():
+    global _research_agent_instance
+
+    if _research_agent_instance is not None:
+        return _research_agent_instance
+
     model_config = config["llm_models"]["research_agent"]
     
-    llm = get_llm(provider=model_config["provider"], model_name=model_config["model"])
+    llm = get_llm_from_config(model_config)
     
-    with open(f'{BASE_DIR}/prompts/{model_config["prompt_file"]}', encoding='utf-8', mode='r') as file:
-        prompt = file.read()
+    prompt = get_prompt(model_config["prompt_file"]).text
     
-    tools = [web_search, search_pinecone]
+    # A step's searches run concurrently, deduplicated and with Pinecone batched
+    tools = ToolNode(
+        [web_search, search_pinecone],
+        awrap_tool_call=ToolExecutor(**config.get("tool_execution", {})),
+    )
     
     agent = create_react_agent(
         model=llm,
         tools=tools,
         prompt=prompt,
         name="research_agent",
+        checkpointer=False,
     )
 
+    _research_agent_instance = agent
     return agent
 
 
 def get_relevant_memory_agent():
     model_config = config["llm_models"]["relevant_memory_agent"]
-    llm = get_llm(provider=model_config["provider"], model_name=model_config["model"])
-    with open(f'{BASE_DIR}/prompts/{model_config["prompt_file"]}', encoding='utf-8', mode='r') as file:
-        prompt = file.read()
+    llm = get_llm_from_config(model_config)
+    prompt = get_prompt(model_config["prompt_file"]).text
     tools = [get_from_memory]
     agent = create_react_agent(
         model=llm,
         tools=tools,
         prompt=prompt,
-        name="relevant_memory_agent",  
+        name="relevant_memory_agent",
+        checkpointer=False,
     )
 
     return agent
 
-async def get_supervisor_agent():
+def get_fast_agent():
+    """Rosy's persona on a fast model, without sub-agents, for simple turns."""
+    global _fast_agent_instance
+
+    if _fast_agent_instance is not None:
+        return _fast_agent_instance
+
+    model_config = config["llm_models"]["fast_responder"]
+    llm = get_llm_from_config(model_config)
+    prompt = get_prompt(model_config["prompt_file"]).text
+    _fast_agent_instance = create_react_agent(
+        model=llm,
+        tools=[],
+        prompt=prompt,
+        name="fast_responder",
+        checkpointer=False,
+    )
+
+    return _fast_agent_instance
+
+def get_synthesizer():
+    """The supervisor's model and prompt, for answering from context gathered in parallel."""
+    model_config = config["llm_models"]["supervisor"]
+    llm = get_llm_from_config(model_config)
+    prompt = get_prompt(model_config["prompt_file"]).text
+    return llm, prompt
+
+def _handing_back(agent):
+    """A node running `agent` that returns its last message to the supervisor."""
+    async def call_agent(state: MessagesState, config: RunnableConfig):
+        messages = (await agent.ainvoke(state, config))["messages"]
+        messages = messages[-2:] if isinstance(messages[-1], ToolMessage) else messages[-1:]
+        return {"messages": [*messages, *create_handoff_back_messages(agent.name, "supervisor")]}
+    return call_agent
+
+async def get_supervisor_agent(include_memory_agent: bool = True, include_research_agent: bool = True):
+    """The supervisor graph, optionally without the memory or research sub-agent.
+
+    The memory agent is left out when the user's memories were already
+    prefetched into the conversation, which saves its LLM round-trips. Either
+    is left out when the turn's time budget no longer allows it.
+    """
+    key = (include_memory_agent, include_research_agent)
+    # Return existing instance if already created
+    if key in _supervisor_agent_instances:
+        return _supervisor_agent_instances[key]
+
     model_config = config["llm_models"]["supervisor"]  
     # checkpointer = await get_checkpointer()
 
-    llm = get_llm(provider=model_config["provider"], model_name=model_config["model"])
-    with open(f'{BASE_DIR}/prompts/{model_config["prompt_file"]}', encoding='utf-8', mode='r') as file:
-        prompt = file.read()
+    llm = get_llm_from_config(model_config)
+    prompt = get_prompt(model_config["prompt_file"]).text
 
-    research_agent = get_research_agent()
-    relevant_memory_agent = get_relevant_memory_agent()
+    agents = []
+    if include_research_agent:
+        agents.append(get_research_agent())
+    if include_memory_agent:
+        agents.append(get_relevant_memory_agent())
 
-    supervisor_agent = create_supervisor(
-        model=llm,
-        agents=[research_agent, relevant_memory_agent],
+    # The graph `create_supervisor` builds (handoff tools, one handoff at a time,
+    # each sub-agent's last message handed back), put together here so the
+    # supervisor's own tool loop can be compiled without a checkpointer.
+    # Handoffs and tool calls are per-turn scratch: a subgraph would otherwise
+    # inherit the parent thread's checkpointer and save them under it.
+    handoff_tools = [create_handoff_tool(agent_name=agent.name) for agent in agents]
+    supervisor = create_react_agent(
+        model=llm.bind_tools(handoff_tools, parallel_tool_calls=False),
+        tools=handoff_tools,
         prompt=prompt,
-        # add_handoff_back_messages=True,
-        # output_mode="full_history"
-    ).compile(
-        # checkpointer=checkpointer
+        name="supervisor",
+        checkpointer=False,
     )
+    workflow = StateGraph(MessagesState)
+    workflow.add_node(supervisor, destinations=tuple(agent.name for agent in agents) + (END,))
+    workflow.add_edge(START, "supervisor")
+    for agent in agents:
+        workflow.add_node(agent.name, _handing_back(agent))
+        workflow.add_edge(agent.name, "supervisor")
+    supervisor_agent = workflow.compile(checkpointer=False)
 
+    _supervisor_agent_instances[key] = supervisor_agent
     return supervisor_agent
\ No newline at end of file
@@ -0,0 +1,175 @@
+import time
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langgraph.errors import GraphBubbleUp
+
+
+class LLMCallCounter(AsyncCallbackHandler):
+    """Counts chat model calls made during a run (including sub-agents)."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.calls += 1
+
+
+# Process-wide prompt cache counters, keyed by model name
+_prompt_cache_totals = {}
+
+
+class PromptCacheTracker(AsyncCallbackHandler):
+    """Tracks how many input tokens were served from the providers' prompt caches.
+
+    Reads `input_token_details.cache_read` (and `cache_creation` for Anthropic)
+    from each response's usage metadata. Totals are kept for the run this
+    handler is attached to and for the process, per model.
+    """
+
+    def __init__(self):
+        self.input_tokens = 0
+        self.cache_read = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.cache_read / self.input_tokens if self.input_tokens else 0.0
+
+    async def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if not usage:
+                    continue
+                details = usage.get("input_token_details") or {}
+                model = message.response_metadata.get("model_name") or message.response_metadata.get("model", "unknown")
+                totals = _prompt_cache_totals.setdefault(
+                    model, {"calls": 0, "input_tokens": 0, "cache_read": 0, "cache_creation": 0}
+                )
+                totals["calls"] += 1
+                totals["input_tokens"] += usage.get("input_tokens", 0)
+                totals["cache_read"] += details.get("cache_read", 0)
+                totals["cache_creation"] += details.get("cache_creation", 0)
+                self.input_tokens += usage.get("input_tokens", 0)
+                self.cache_read += details.get("cache_read", 0)
+
+
+def prompt_cache_stats() -> dict:
+    """Per-model prompt cache totals since the process started, with hit ratios."""
+    return {
+        model: {
+            **totals,
+            "hit_ratio": round(totals["cache_read"] / totals["input_tokens"], 3) if totals["input_tokens"] else 0.0,
+        }
+        for model, totals in _prompt_cache_totals.items()
+    }
+
+
+def agent_name(metadata: dict) -> str:
+    """The agent that made an LLM call, from its LangGraph checkpoint namespace.
+
+    Model calls happen in a react agent's `agent` node, so the agent is the
+    enclosing segment (`agent|supervisor|agent` -> `supervisor`). Calls made
+    directly by a root graph node (the fast responder, the router, the parallel
+    branches) are reported under that node's name.
+    """
+    namespace = (metadata or {}).get("langgraph_checkpoint_ns") or (metadata or {}).get("langgraph_node") or ""
+    segments = [segment.split(":", 1)[0] for segment in namespace.split("|") if segment]
+    if not segments:
+        return "unknown"
+    return segments[-2] if len(segments) > 1 else segments[-1]
+
+
+class UsageRecorder(AsyncCallbackHandler):
+    """Reports model, agent, token counts and latency of every LLM call in a run.
+
+    Each finished call is passed to `sink(user_id, agent, model, usage, latency)`,
+    which must be cheap: it runs on the event loop inside the agent's turn.
+    `tokens` totals the run's input and output tokens so far.
+    """
+
+    def __init__(self, user_id, sink):
+        self.user_id = user_id
+        self.sink = sink
+        self.tokens = 0
+        self._started = {}
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._started[run_id] = (time.perf_counter(), agent_name(metadata))
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        started, agent = self._started.pop(run_id, (None, "unknown"))
+        latency = time.perf_counter() - started if started is not None else 0.0
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if not usage:
+                    continue
+                model = message.response_metadata.get("model_name") or message.response_metadata.get("model", "unknown")
+                self.tokens += usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+                self.sink(self.user_id, agent, model, usage, latency)
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+
+class TimelineRecorder(AsyncCallbackHandler):
+    """Wall-clock spans of a run's graph nodes, tool calls and LLM calls.
+
+    Each finished span is passed to `sink(kind, name, start, end, path, error)`
+    with `time.perf_counter()` bounds; `path` is the node's place in the graph,
+    e.g. `agent/supervisor/research_agent/tools`. Only attached to profiled
+    turns, so it costs nothing otherwise.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self._started = {}
+
+    def _path(self, metadata: dict) -> str:
+        namespace = (metadata or {}).get("langgraph_checkpoint_ns") or ""
+        return "/".join(segment.split(":", 1)[0] for segment in namespace.split("|") if segment)
+
+    def _start(self, run_id, kind: str, name: str, metadata: dict):
+        self._started[run_id] = (kind, name, self._path(metadata), time.perf_counter())
+
+    def _end(self, run_id, error: bool = False):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            kind, name, path, start = started
+            self.sink(kind, name, start, time.perf_counter(), path, error)
+
+    async def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        # Graph nodes only, not the runnables inside them (a subgraph node runs one named like itself)
+        node = (metadata or {}).get("langgraph_node")
+        if node is None or kwargs.get("name") != node:
+            return
+        path = self._path(metadata)
+        if not any(started[:3] == ("node", node, path) for started in self._started.values()):
+            self._start(run_id, "node", node, metadata)
+
+    async def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    async def on_chain_error(self, error, *, run_id, **kwargs):
+        # Handoffs end a node with a bubbled-up Command, not a failure
+        self._end(run_id, error=not isinstance(error, GraphBubbleUp))
+
+    async def on_tool_start(self, serialized, input_str, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "tool", kwargs.get("name") or (serialized or {}).get("name", "tool"), metadata)
+
+    async def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    async def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=True)
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "llm", (metadata or {}).get("ls_model_name") or kwargs.get("name") or "llm", metadata)
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id)
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=True)
@@ -0,0 +1,224 @@
+import sys
+from collections import OrderedDict
+from typing import Any, Optional, Sequence
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    copy_checkpoint,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from langgraph.checkpoint.serde.types import _DeltaSnapshot
+
+LATEST_VERSION_SQL = """
+SELECT c.checkpoint_id,
+       (SELECT count(*) FROM checkpoint_writes w
+        WHERE w.thread_id = c.thread_id AND w.checkpoint_ns = c.checkpoint_ns
+          AND w.checkpoint_id = c.checkpoint_id) AS writes
+FROM checkpoints c
+WHERE c.thread_id = %s AND c.checkpoint_ns = ''
+ORDER BY c.checkpoint_id DESC
+LIMIT 1
+"""
+
+
+def estimate_bytes(value: Any) -> int:
+    """Approximate memory held by a checkpoint value, for the cache budget."""
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value) + 50
+    if isinstance(value, BaseMessage):
+        return (
+            400 + estimate_bytes(value.content) + estimate_bytes(value.additional_kwargs)
+            + estimate_bytes(getattr(value, "tool_calls", None) or [])
+        )
+    if isinstance(value, dict):
+        return 100 + sum(estimate_bytes(k) + estimate_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return 60 + sum(estimate_bytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class CachedCheckpointer(BaseCheckpointSaver):
+    """Keep the latest checkpoint of recently active threads in memory.
+
+    Reads of a thread's latest root checkpoint are served from an LRU keyed by
+    thread_id, bounded by an estimate of the bytes it holds. `aput` writes
+    through to the wrapped saver and then replaces the cached entry, so a
+    worker's own turns never go back to the database for blobs.
+
+    Another worker may have written since, so when the wrapped saver is
+    Postgres every hit is checked against the thread's latest checkpoint id
+    and pending-write count. That is a single index lookup instead of loading
+    and deserializing the blobs. Other savers live in this process and are
+    trusted as is.
+
+    Cached tuples are shared: callers must treat them as read-only (the
+    checkpoint dict itself is copied on every hit, as LangGraph updates it).
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver, max_bytes: int = 64 * 2 ** 20):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+    @property
+    def config_specs(self) -> list:
+        return self.saver.config_specs
+
+    def get_next_version(self, current, channel):
+        return self.saver.get_next_version(current, channel)
+
+    # Cache bookkeeping
+
+    @staticmethod
+    def _latest_key(config: RunnableConfig) -> Optional[str]:
+        """The thread_id when `config` asks for a thread's latest root checkpoint."""
+        configurable = config.get("configurable", {})
+        if configurable.get("checkpoint_ns", "") or get_checkpoint_id(config):
+            return None
+        return configurable.get("thread_id")
+
+    def _store(self, thread_id: str, checkpoint_tuple: CheckpointTuple):
+        self.invalidate(thread_id)
+        if any(isinstance(v, _DeltaSnapshot) for v in checkpoint_tuple.checkpoint["channel_values"].values()):
+            return
+        size = estimate_bytes(checkpoint_tuple.checkpoint["channel_values"]) + estimate_bytes(
+            checkpoint_tuple.pending_writes or []
+        )
+        if size > self.max_bytes // 4:
+            return
+        self._entries[thread_id] = (checkpoint_tuple, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.stats["evictions"] += 1
+
+    def invalidate(self, thread_id: str):
+        entry = self._entries.pop(thread_id, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    async def _latest_version(self, thread_id: str) -> Optional[tuple]:
+        """(checkpoint_id, pending writes) of the thread's latest checkpoint in the shared store.
+
+        None means the store isn't shared with other processes, so the cache is trusted.
+        """
+        if not isinstance(self.saver, AsyncPostgresSaver):
+            return None
+        async with self.saver._cursor() as cur:
+            await cur.execute(LATEST_VERSION_SQL, (thread_id,))
+            row = await cur.fetchone()
+        return (row["checkpoint_id"], row["writes"]) if row else ("", 0)
+
+    # Async API
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = self._latest_key(config)
+        if thread_id is None:
+            return await self.saver.aget_tuple(config)
+        entry = self._entries.get(thread_id)
+        if entry is not None:
+            cached = entry[0]
+            version = await self._latest_version(thread_id)
+            if version is None or version == (cached.checkpoint["id"], len(cached.pending_writes or [])):
+                self._entries.move_to_end(thread_id)
+                self.stats["hits"] += 1
+                return cached._replace(checkpoint=copy_checkpoint(cached.checkpoint))
+            self.stats["stale"] += 1
+        self.stats["misses"] += 1
+        checkpoint_tuple = await self.saver.aget_tuple(config)
+        if checkpoint_tuple is not None:
+            self._store(thread_id, checkpoint_tuple)
+            return checkpoint_tuple._replace(checkpoint=copy_checkpoint(checkpoint_tuple.checkpoint))
+        self.invalidate(thread_id)
+        return None
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        async for checkpoint_tuple in self.saver.alist(config, filter=filter, before=before, limit=limit):
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        self.invalidate(thread_id)
+        next_config = await self.saver.aput(config, checkpoint, metadata, new_versions)
+        if not config["configurable"].get("checkpoint_ns", ""):
+            parent_id = config["configurable"].get("checkpoint_id")
+            parent_config = (
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": "", "checkpoint_id": parent_id}}
+                if parent_id else None
+            )
+            self._store(thread_id, CheckpointTuple(
+                config=next_config,
+                checkpoint=copy_checkpoint(checkpoint),
+                metadata=get_checkpoint_metadata(config, metadata),
+                parent_config=parent_config,
+                pending_writes=[],
+            ))
+        return next_config
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        # Pending writes only exist mid-run; the next aput caches the new checkpoint again
+        self.invalidate(config["configurable"]["thread_id"])
+        await self.saver.aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.invalidate(thread_id)
+        await self.saver.adelete_thread(thread_id)
+
+    async def adelete_for_runs(self, run_ids: Sequence[str]) -> None:
+        self._entries.clear()
+        self.bytes = 0
+        await self.saver.adelete_for_runs(run_ids)
+
+    async def acopy_thread(self, source_thread_id: str, target_thread_id: str) -> None:
+        self.invalidate(target_thread_id)
+        await self.saver.acopy_thread(source_thread_id, target_thread_id)
+
+    async def aprune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        for thread_id in thread_ids:
+            self.invalidate(thread_id)
+        await self.saver.aprune(thread_ids, strategy=strategy)
+
+    async def aget_delta_channel_history(self, *, config: RunnableConfig, channels: Sequence[str]):
+        return await self.saver.aget_delta_channel_history(config=config, channels=channels)
+
+    # Sync API: passed through, dropping any cached entry the call may change
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.saver.get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        self.invalidate(config["configurable"]["thread_id"])
+        return self.saver.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        self.invalidate(config["configurable"]["thread_id"])
+        return self.saver.put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.invalidate(thread_id)
+        return self.saver.delete_thread(thread_id)
+
+    def get_delta_channel_history(self, *, config: RunnableConfig, channels: Sequence[str]):
+        return self.saver.get_delta_channel_history(config=config, channels=channels)
@@ -1,53 +1,128 @@
 import os
 import asyncio
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
-from langgraph.checkpoint.memory import MemorySaver
+from ai.serde import get_serde
+from ai.checkpoint_cache import CachedCheckpointer
+from ai.memory_checkpointer import BoundedMemorySaver
+
+# Memory for the hot-thread cache in front of the Postgres checkpointer; 0 disables it
+CHECKPOINT_CACHE_MB = float(os.environ.get("CHECKPOINT_CACHE_MB", "64"))
+# Limits of the in-memory checkpointer: threads kept, total size, and checkpoints kept per thread
+MEMORY_CHECKPOINT_MAX_THREADS = int(os.environ.get("MEMORY_CHECKPOINT_MAX_THREADS", "1000"))
+MEMORY_CHECKPOINT_MAX_MB = float(os.environ.get("MEMORY_CHECKPOINT_MAX_MB", "256"))
+MEMORY_CHECKPOINT_KEEP = int(os.environ.get("MEMORY_CHECKPOINT_KEEP", "5"))
+# `memory`: use the in-memory checkpointer when Postgres can't be set up, instead of failing.
+# Conversations are then lost on restart and not shared between workers
+CHECKPOINTER_FALLBACK = os.environ.get("CHECKPOINTER_FALLBACK", "none").lower()
 
 # Global checkpointer instance
 _checkpointer_instance = None
 _checkpointer_context = None
+_checkpointer_lock = asyncio.Lock()
+
 
-async def get_checkpointer():
+def memory_checkpointer(serde, reason: str) -> BoundedMemorySaver:
+    """The bounded in-memory checkpointer, announced loudly: its state is per worker and lost on restart."""
+    print("=" * 80)
+    print(f"WARNING: using the in-memory checkpointer ({reason}).")
+    print("WARNING: conversations are kept per worker, lost on restart, and evicted beyond "
+          f"{MEMORY_CHECKPOINT_MAX_THREADS} threads / {MEMORY_CHECKPOINT_MAX_MB:g}MB.")
+    print("=" * 80)
+    saver = BoundedMemorySaver(
+        serde=serde,
+        max_threads=MEMORY_CHECKPOINT_MAX_THREADS,
+        max_bytes=int(MEMORY_CHECKPOINT_MAX_MB * 2 ** 20),
+        keep_checkpoints=MEMORY_CHECKPOINT_KEEP,
+        reason=reason,
+    )
+    return saver
+
+async def get_checkpointer(serde=None):
+    """The process-wide checkpointer; `serde` defaults to `ai.serde.get_serde()`."""
     global _checkpointer_instance, _checkpointer_context
     
     # Return existing instance if already created
     if _checkpointer_instance is not None:
         return _checkpointer_instance
+
+    # The warmup and the first requests can get here together: only one opens a pool
+    async with _checkpointer_lock:
+        if _checkpointer_instance is not None:
+            return _checkpointer_instance
     
-    CHECKPOINTER = os.environ.get("CHECKPOINTER", None)
-    print(f"CHECKPOINTER: {CHECKPOINTER}")
+        CHECKPOINTER = os.environ.get("CHECKPOINTER", None)
+        print(f"CHECKPOINTER: {CHECKPOINTER}")
+        serde = serde or get_serde()
     
-    if CHECKPOINTER == "postgres":
-        DATABASE_URL = os.getenv("DATABASE_URL")
+        if CHECKPOINTER == "postgres":
+            DATABASE_URL = os.getenv("DATABASE_URL")
 
-        if not DATABASE_URL:
-            raise NotImplementedError("`DATABASE_URL` is not set")
+            if not DATABASE_URL:
+                raise NotImplementedError("`DATABASE_URL` is not set")
 
-        print("Using AsyncPostgresSaver")
-        print(f"Connection String: {DATABASE_URL}")
+            print("Using AsyncPostgresSaver")
+            print(f"Connection String: {DATABASE_URL}")
         
-        try:
-            # Create the AsyncPostgresSaver context manager
-            _checkpointer_context = AsyncPostgresSaver.from_conn_string(DATABASE_URL)
+            # Published only once set up, as callers skip the lock when it is set
+            context = saver = None
+            try:
+                # Create the AsyncPostgresSaver context manager
+                context = AsyncPostgresSaver.from_conn_string(DATABASE_URL, serde=serde)
             
-            # Enter the context to get the actual checkpointer
-            _checkpointer_instance = await _checkpointer_context.__aenter__()
+                # Enter the context to get the actual checkpointer
+                saver = await context.__aenter__()
             
-            # Setup the checkpointer tables
-            await _checkpointer_instance.setup()
-            print("AsyncPostgresSaver setup complete")
+                # Setup the checkpointer tables
+                await saver.setup()
+                print("AsyncPostgresSaver setup complete")
+
+                if CHECKPOINT_CACHE_MB > 0:
+                    saver = CachedCheckpointer(saver, max_bytes=int(CHECKPOINT_CACHE_MB * 2 ** 20))
+                    print(f"Caching hot threads in up to {CHECKPOINT_CACHE_MB:g}MB")
+                _checkpointer_context, _checkpointer_instance = context, saver
             
-        except Exception as e:
-            print(f"Error setting up AsyncPostgresSaver: {e}")
-            print("Falling back to MemorySaver")
-            _checkpointer_instance = MemorySaver()
+            except Exception as e:
+                print(f"Error setting up AsyncPostgresSaver: {e}")
+                if saver is not None:
+                    # Connected but not set up: release the connection
+                    try:
+                        await context.__aexit__(None, None, None)
+                    except Exception as close_error:
+                        print(f"Error closing AsyncPostgresSaver: {close_error}")
+                if CHECKPOINTER_FALLBACK != "memory":
+                    # Fail the warmup (and /ready) rather than quietly keeping conversations in memory
+                    raise
+                _checkpointer_instance = memory_checkpointer(serde, f"Postgres setup failed: {e}")
         
-    else:
-        print("Using MemorySaver")
-        _checkpointer_instance = MemorySaver()
+        elif CHECKPOINTER in (None, "", "memory"):
+            _checkpointer_instance = memory_checkpointer(serde, f"CHECKPOINTER={CHECKPOINTER or 'unset'}")
+        else:
+            raise ValueError(f"Unknown CHECKPOINTER: {CHECKPOINTER} (expected `postgres` or `memory`)")
     
     return _checkpointer_instance
 
+async def close_checkpointer():
+    """Close the checkpointer's connection and reset the process-wide instance."""
+    global _checkpointer_instance, _checkpointer_context
+
+    if _checkpointer_context is not None:
+        await _checkpointer_context.__aexit__(None, None, None)
+        print("AsyncPostgresSaver connection closed")
+    _checkpointer_instance = None
+    _checkpointer_context = None
+
+
+def reset_checkpointer():
+    """Forget the checkpointer without closing it.
+
+    Used in a freshly forked worker: the connection belongs to the parent process
+    and must not be closed (or reused) from the child.
+    """
+    global _checkpointer_instance, _checkpointer_context
+    _checkpointer_instance = None
+    _checkpointer_context = None
+
+
 # Synchronous wrapper for backward compatibility
 def get_checkpointer_sync():
     """Synchronous wrapper for get_checkpointer - use only for sync operations"""
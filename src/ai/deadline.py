@@ -0,0 +1,72 @@
+import asyncio
+import os
+import time
+from typing import Optional
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import ToolException
+from ai import metrics
+
+# Seconds a turn may take end to end; overrides `deadline.seconds` in config.yaml
+TURN_DEADLINE_SECONDS = os.environ.get("TURN_DEADLINE_SECONDS") or None
+
+# Filled from the `deadline` section of config.yaml by ai.agents
+deadline_settings = {"seconds": 45, "research": 20, "memory": 10, "answer": 8}
+
+
+class TurnBudget:
+    """Time left for one turn, carried in `configurable["budget"]`.
+
+    Stages ask `allows(stage)` before starting and stop waiting on work after
+    `timeout()`, which keeps `deadline.answer` seconds back for the final
+    answer. As the budget runs low research is skipped first, then memory
+    lookups, then the supervisor's sub-agents, and `degradations` lists which
+    of these happened.
+    """
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = float(seconds or TURN_DEADLINE_SECONDS or deadline_settings["seconds"])
+        self.deadline = time.monotonic() + self.seconds
+        self.degradations = []
+
+    def remaining(self) -> float:
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def allows(self, stage: str) -> bool:
+        """Whether at least the stage's `deadline.<stage>` seconds are left."""
+        return self.remaining() >= deadline_settings[stage]
+
+    def timeout(self) -> float:
+        """Seconds a stage may run before only the answer's reserve is left."""
+        return max(self.remaining() - deadline_settings["answer"], 0.0)
+
+    def degrade(self, name: str, reason: str):
+        """Record a degradation once per turn, e.g. `research` or `supervisor_only`."""
+        if name in self.degradations:
+            return
+        self.degradations.append(name)
+        metrics.increment(f"degraded_{name}")
+        print(f"Deadline: {name} ({reason}), {self.remaining():.1f}s of {self.seconds:g}s left")
+
+
+class OutOfTime(ToolException):
+    """A tool call skipped or cut short by the turn's budget.
+
+    Raised by `within_budget`. Tools re-raise it with `handle_tool_error` set,
+    so the agent reads the message as a failed call and the tool executor
+    doesn't reuse it on a later turn.
+    """
+
+
+def get_budget(config: Optional[RunnableConfig]) -> Optional[TurnBudget]:
+    """The turn's budget, or None when the graph was invoked without one."""
+    return ((config or {}).get("configurable") or {}).get("budget")
+
+
+async def within_budget(budget: Optional[TurnBudget], awaitable):
+    """Await `awaitable`, raising OutOfTime once only the answer's reserve is left."""
+    if budget is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout=budget.timeout())
+    except asyncio.TimeoutError:
+        raise OutOfTime(f"Cut off {deadline_settings['answer']}s before the turn's deadline") from None
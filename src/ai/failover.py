@@ -0,0 +1,188 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+class CircuitBreaker:
+    """Per provider/model health tracker.
+
+    Closed: calls flow and their outcomes are recorded over a sliding window.
+    Open: once at least `min_calls` outcomes are recorded and the share of
+    failures (errors, timeouts or calls slower than `slow_call_seconds`) reaches
+    `failure_rate`, calls are refused for `open_seconds`.
+    Half-open: after that, a single probe call is let through; its outcome closes
+    or re-opens the breaker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_seconds: Optional[float] = None,
+        open_seconds: float = 30,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.outcomes = deque(maxlen=window)
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.open_seconds:
+            self.state = "half_open"
+            self.probe_in_flight = False
+        if self.state == "half_open" and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def record(self, ok: bool, seconds: float):
+        failed = not ok or (self.slow_call_seconds is not None and seconds > self.slow_call_seconds)
+        if self.state == "half_open":
+            if failed:
+                self._open()
+            else:
+                print(f"Circuit breaker {self.name} closed")
+                self.state = "closed"
+                self.outcomes.clear()
+            return
+        self.outcomes.append(failed)
+        if len(self.outcomes) >= self.min_calls and sum(self.outcomes) / len(self.outcomes) >= self.failure_rate:
+            self._open()
+
+    def _open(self):
+        print(f"Circuit breaker {self.name} opened for {self.open_seconds}s")
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+        self.outcomes.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "recent_calls": len(self.outcomes),
+            "recent_failures": sum(self.outcomes),
+        }
+
+
+# One breaker per provider/model, shared by every agent in the process
+_breakers = {}
+breaker_settings = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name, **breaker_settings)
+    return _breakers[name]
+
+
+def breaker_states() -> dict:
+    """State of every circuit breaker created so far, keyed by provider:model."""
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
+
+
+class FailoverChatModel(BaseChatModel):
+    """Try a chain of chat models in order, skipping those whose breaker is open.
+
+    Each attempt is bounded by `attempt_timeout`, so a degraded provider costs at
+    most that long before the next model in the chain is tried. If every breaker
+    is open the chain is still attempted in order rather than failing outright.
+    Tools are bound to the chain and formatted for each model when it is tried.
+    """
+
+    models: List[BaseChatModel]
+    names: List[str]
+    attempt_timeout: Optional[float] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "failover"
+
+    def bind_tools(self, tools, *, tool_choice=None, parallel_tool_calls: Optional[bool] = None, **kwargs):
+        if tool_choice is not None:
+            kwargs["tool_choice"] = tool_choice
+        if parallel_tool_calls is not None:
+            kwargs["parallel_tool_calls"] = parallel_tool_calls
+        # A binding (not a copy of the chain), so create_react_agent sees the tools
+        # as bound and keeps `parallel_tool_calls`. Every provider accepts the
+        # OpenAI format; each model re-formats them its own way in _model_kwargs.
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _model_kwargs(self, index: int, kwargs: dict) -> dict:
+        if "tools" not in kwargs:
+            return kwargs
+        kwargs = dict(kwargs)
+        tool_kwargs = {name: kwargs.pop(name) for name in ("tool_choice", "parallel_tool_calls") if name in kwargs}
+        return {**self.models[index].bind_tools(kwargs.pop("tools"), **tool_kwargs).kwargs, **kwargs}
+
+    def _allow(self, index: int) -> bool:
+        return get_breaker(self.names[index]).allow()
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        last_error = None
+        tried = set()
+        for fail_open in (False, True):
+            for index in range(len(self.models)):
+                if index in tried or (not fail_open and not self._allow(index)):
+                    continue
+                tried.add(index)
+                breaker = get_breaker(self.names[index])
+                start = time.monotonic()
+                try:
+                    result = self.models[index]._generate(messages, stop=stop, **self._model_kwargs(index, kwargs))
+                except Exception as e:
+                    breaker.record(False, time.monotonic() - start)
+                    last_error = e
+                    continue
+                breaker.record(True, time.monotonic() - start)
+                return result
+            if tried:
+                break
+        raise last_error
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        last_error = None
+        tried = set()
+        # Breakers are consulted lazily so a half-open probe slot is only taken
+        # by the model that actually gets called. If every breaker refuses, the
+        # chain is attempted anyway rather than failing without trying.
+        for fail_open in (False, True):
+            for index in range(len(self.models)):
+                if index in tried or (not fail_open and not self._allow(index)):
+                    continue
+                tried.add(index)
+                breaker = get_breaker(self.names[index])
+                start = time.monotonic()
+                try:
+                    result = await asyncio.wait_for(
+                        self.models[index]._agenerate(messages, stop=stop, **self._model_kwargs(index, kwargs)),
+                        timeout=self.attempt_timeout,
+                    )
+                except asyncio.CancelledError:
+                    # The caller gave up; don't leave a half-open probe slot taken
+                    breaker.probe_in_flight = False
+                    raise
+                except Exception as e:
+                    breaker.record(False, time.monotonic() - start)
+                    print(f"LLM call to {self.names[index]} failed ({type(e).__name__}: {e}), trying next model")
+                    last_error = e
+                    continue
+                breaker.record(True, time.monotonic() - start)
+                return result
+            if tried:
+                break
+        raise last_error
@@ -1,41 +1,284 @@
 import os
-from pydantic import BaseModel
+import time
+import asyncio
 from langgraph.graph import StateGraph, START, END
 from ai.schemas import AgentState
-from ai.agents import get_supervisor_agent
-from langchain_core.messages import AIMessage, HumanMessage
+from ai.agents import (
+    config as agents_config,
+    get_supervisor_agent,
+    get_fast_agent,
+    get_research_agent,
+    get_synthesizer,
+)
+from ai.routing import route_message, estimate_cost
+from langchain_core.callbacks import get_usage_metadata_callback
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from ai.checkpointer import get_checkpointer
-from ai.tools.memory import add_to_memory
+from ai.tools.memory import add_to_memory, search_memories
 from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import merge_configs
+from ai.callbacks import LLMCallCounter
+from ai.deadline import OutOfTime, get_budget, within_budget
 
-async def agent_node(state: AgentState) -> AgentState:
-    supervisor_agent = await get_supervisor_agent()
-    response = await supervisor_agent.ainvoke({"messages": state["messages"]})
+GRAPH_MODE = os.environ.get("GRAPH_MODE") or agents_config.get("graph", {}).get("mode", "handoff")
+prefetch_config = agents_config.get("memory_prefetch", {})
 
-    return {
-        "messages": state["messages"] + [AIMessage(content=response["messages"][-1].content)]
-    }
 
-async def memory_node(state: AgentState) -> AgentState:
+def start_memory_prefetch(state: AgentState, config: RunnableConfig):
+    """Start a Mem0 search for the latest user message in the background."""
+    if not prefetch_config.get("enabled", True):
+        return None
+    budget = get_budget(config)
+    if budget is not None and not budget.allows("memory"):
+        return None
+    query = latest_user_text(state)
+    user_id = config.get("configurable", {}).get("user_id")
+    if not query or user_id is None:
+        return None
+    return asyncio.create_task(search_memories(query, user_id))
+
+
+async def collect_memory_prefetch(task, started: float, route: str) -> str:
+    """Wait for the prefetch until `timeout_ms` after the turn started.
+
+    Fast turns only wait `fast_timeout_ms` (by default they take the memories
+    only if the search already finished). A slow or failed search is dropped
+    rather than delaying the turn; the supervisor then keeps its memory agent
+    and looks memories up itself.
+    """
+    if task is None:
+        return ""
+    timeout_ms = prefetch_config.get("fast_timeout_ms", 0) if route == "fast" else prefetch_config.get("timeout_ms", 800)
+    remaining = timeout_ms / 1000 - (time.perf_counter() - started)
+    try:
+        return await asyncio.wait_for(task, timeout=max(remaining, 0))
+    except asyncio.TimeoutError:
+        print(f"Memory prefetch: timed out on the {route} route, answering without prefetched memories")
+    except Exception as e:
+        print(f"Memory prefetch failed: {e}")
+    return ""
+
+async def agent_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    start = time.perf_counter()
+    budget = get_budget(config)
+    # The memory search overlaps routing instead of waiting for a supervisor handoff
+    prefetch = start_memory_prefetch(state, config)
+    try:
+        decision = await route_message(state["messages"])
+    except BaseException:
+        # Cancelled or failed turn: don't leave the search running
+        if prefetch is not None:
+            prefetch.cancel()
+        raise
+    route_seconds = time.perf_counter() - start
+
+    memories = await collect_memory_prefetch(prefetch, start, decision.route)
+    messages = with_context(state["messages"], f"## What you remember about this user\n{memories}" if memories else "")
+
+    counter = LLMCallCounter()
+    config = merge_configs(config, {"callbacks": [counter]})
+    with get_usage_metadata_callback() as usage:
+        if decision.route == "fast":
+            response = await get_fast_agent().ainvoke({"messages": messages}, config)
+            answer = response["messages"][-1].content
+        else:
+            answer = await supervise(messages, config, include_memory_agent=not memories)
+
+    cost = estimate_cost(usage.usage_metadata)
+    saved = 0.0
+    if decision.route == "fast":
+        # Lower bound: the supervisor would have used at least these tokens, at its own price
+        saved = estimate_cost(usage.usage_metadata, as_model=agents_config["llm_models"]["supervisor"]["model"]) - cost
+    print(
+        f"Routing: route={decision.route} reason={decision.reason} "
+        f"classify={route_seconds * 1000:.1f}ms total={time.perf_counter() - start:.2f}s "
+        f"cost=${cost:.6f} saved=${saved:.6f} llm_calls={counter.calls} "
+        f"memories={'prefetched' if memories else 'none'}"
+        + (f" degraded={','.join(budget.degradations)}" if budget and budget.degradations else "")
+    )
+
+    # Only the answer joins the thread; the supervisor's handoffs and tool calls are dropped
+    return {"messages": [AIMessage(content=answer)]}
+
+
+async def supervise(messages: list, config: RunnableConfig, include_memory_agent: bool = True) -> str:
+    """The supervisor's answer, with the sub-agents the turn's time budget allows.
+
+    Research is dropped first, then memory lookups; with neither left, or when
+    the sub-agents run into the answer's reserve, the supervisor model answers
+    on its own from the conversation.
+    """
+    budget = get_budget(config)
+    include_research_agent = True
+    if budget is not None:
+        if not budget.allows("research"):
+            include_research_agent = False
+            budget.degrade("research", "not enough time to research")
+        if include_memory_agent and not budget.allows("memory"):
+            include_memory_agent = False
+            budget.degrade("memory", "not enough time to look up memories")
+    if include_research_agent or include_memory_agent:
+        agent = await get_supervisor_agent(
+            include_memory_agent=include_memory_agent, include_research_agent=include_research_agent
+        )
+        try:
+            response = await within_budget(budget, agent.ainvoke({"messages": messages}, config))
+            return response["messages"][-1].content
+        except OutOfTime:
+            pass
+    if budget is not None:
+        budget.degrade("supervisor_only", "answering without sub-agents")
+    return await answer_directly(messages, config)
+
+
+async def answer_directly(messages: list, config: RunnableConfig, context: str = "") -> str:
+    """A single supervisor model call, without sub-agents or tools."""
+    llm, prompt = get_synthesizer()
+    response = await llm.ainvoke([SystemMessage(content=prompt)] + with_context(messages, context), config)
+    return response.content
+
+def latest_user_text(state: AgentState) -> str:
+    latest = next((m for m in reversed(state["messages"]) if isinstance(m, HumanMessage)), None)
+    return latest.content if latest is not None and isinstance(latest.content, str) else ""
+
+
+async def route_turn(state: AgentState, config: RunnableConfig):
+    """Parallel mode entry: fast path, or fan out to research and recall."""
+    decision = await route_message(state["messages"])
+    print(f"Routing: route={decision.route} reason={decision.reason}")
+    if decision.route == "fast":
+        return "fast"
+    return ["research", "recall"]
+
+
+async def fast_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    response = await get_fast_agent().ainvoke({"messages": state["messages"]}, config)
+    return {"messages": [AIMessage(content=response["messages"][-1].content)]}
+
+
+async def research_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    start = time.perf_counter()
+    budget = get_budget(config)
+    if budget is not None and not budget.allows("research"):
+        budget.degrade("research", "not enough time to research")
+        return {"research": ""}
+    try:
+        response = await within_budget(budget, get_research_agent().ainvoke({"messages": state["messages"]}, config))
+        research = response["messages"][-1].content
+    except OutOfTime:
+        budget.degrade("research", "research ran into the answer's reserve")
+        research = ""
+    except Exception as e:
+        print(f"Research branch failed: {e}")
+        research = ""
+    print(f"Parallel branch research: {time.perf_counter() - start:.2f}s")
+    return {"research": research}
+
+
+async def recall_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    start = time.perf_counter()
+    budget = get_budget(config)
+    if budget is not None and not budget.allows("memory"):
+        budget.degrade("memory", "not enough time to look up memories")
+        return {"memories": ""}
+    try:
+        memories = await within_budget(
+            budget, search_memories(latest_user_text(state), config["configurable"].get("user_id"))
+        )
+    except OutOfTime:
+        budget.degrade("memory", "memory lookup ran into the answer's reserve")
+        memories = ""
+    except Exception as e:
+        print(f"Recall branch failed: {e}")
+        memories = ""
+    print(f"Parallel branch recall: {time.perf_counter() - start:.2f}s")
+    return {"memories": memories}
+
+
+def with_context(messages: list, context: str) -> list:
+    """Attach per-turn context to the latest user message (for the LLM call only)."""
+    if not context:
+        return messages
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            augmented = HumanMessage(content=f"{messages[i].content}\n\n<context>\n{context}\n</context>")
+            return messages[:i] + [augmented] + messages[i + 1:]
+    return messages
+
+
+async def synthesize_node(state: AgentState, config: RunnableConfig) -> AgentState:
+    """Single supervisor call that answers from the research and recalled memories."""
+    sections = []
+    if state.get("research"):
+        sections.append(f"## Research findings\n{state['research']}")
+    if state.get("memories"):
+        sections.append(f"## What you remember about this user\n{state['memories']}")
+    answer = await answer_directly(state["messages"], config, "\n\n".join(sections))
+    return {"messages": [AIMessage(content=answer)]}
+
+
+# Memory writes moved off the turn's critical path, kept referenced until they finish
+_deferred_memory_writes = set()
+
+
+async def memory_node(state: AgentState, config: RunnableConfig) -> AgentState:
     readable_messages = []
     for m in state["messages"]:
         if isinstance(m, HumanMessage):
             readable_messages.append({"role": "user", "content": m.content})
         elif isinstance(m, AIMessage):
             readable_messages.append({"role": "assistant", "content": m.content})
-    await add_to_memory.ainvoke({"messages": readable_messages})
-    return state
+    write = add_to_memory.ainvoke({"messages": readable_messages}, config)
+    budget = get_budget(config)
+    if budget is not None and not budget.allows("memory"):
+        # The answer is ready; store the exchange without making the user wait for it
+        task = asyncio.create_task(write)
+        _deferred_memory_writes.add(task)
+        task.add_done_callback(_memory_write_done)
+        budget.degrade("memory_write_deferred", "storing memories after replying")
+        return {}
+    await write
+    return {}
+
+
+def _memory_write_done(task: asyncio.Task):
+    _deferred_memory_writes.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Deferred memory write failed: {task.exception()}")
+
+
+async def drain_deferred_memory_writes(timeout: float) -> bool:
+    """Wait for deferred memory writes, e.g. on shutdown; True if none were left unfinished."""
+    if not _deferred_memory_writes:
+        return True
+    print(f"Waiting for {len(_deferred_memory_writes)} deferred memory write(s)...")
+    _, pending = await asyncio.wait(set(_deferred_memory_writes), timeout=max(timeout, 0))
+    if pending:
+        print(f"Gave up on {len(pending)} deferred memory write(s): their exchanges are not in memory")
+        return False
+    return True
 
 
-async def get_agent():
+async def get_agent(mode: str = GRAPH_MODE):
     # Get the checkpointer instance
     checkpointer = await get_checkpointer()
     
     graph = StateGraph(AgentState)
-    graph.add_node("agent", agent_node)
     graph.add_node("memory", memory_node)
-    graph.add_edge(START, "agent")
-    graph.add_edge("agent", "memory")
+    if mode == "parallel":
+        graph.add_node("fast", fast_node)
+        graph.add_node("research", research_node)
+        graph.add_node("recall", recall_node)
+        graph.add_node("synthesize", synthesize_node)
+        graph.add_conditional_edges(START, route_turn, ["fast", "research", "recall"])
+        # Synthesis waits for both branches
+        graph.add_edge(["research", "recall"], "synthesize")
+        graph.add_edge("synthesize", "memory")
+        graph.add_edge("fast", "memory")
+    else:
+        graph.add_node("agent", agent_node)
+        graph.add_edge(START, "agent")
+        graph.add_edge("agent", "memory")
     graph.add_edge("memory", END)
 
     # Compile the graph with the checkpointer
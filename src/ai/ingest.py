@@ -0,0 +1,334 @@
+"""Load documents into the retrieval index queried by `search_pinecone`.
+
+Streams .txt, .md, .pdf and .jsonl files, splits them into chunks, embeds the
+chunks in concurrent batches and upserts them into Pinecone and the local BM25
+index. Chunk ids are content hashes, and progress is checkpointed in a small
+SQLite file, so an interrupted run resumes where it stopped and unchanged
+chunks (or whole unchanged files) are skipped on later runs. Chunks a changed
+file no longer produces are deleted. The BM25 index is written to disk batch by
+batch, before the batch is recorded as done, so memory stays flat as the corpus
+grows and a crash never leaves recorded chunks out of it. If the BM25 index
+holds fewer chunks than were recorded (deleted, or built by an older version),
+the run re-adds them from the source files without embedding them again.
+
+    cd src && python -m ai.ingest ../docs/books --chunk-size 1000 --concurrency 4
+
+JSONL lines are objects with a `text` field and optionally `id` and `metadata`.
+PDF support needs `pip install pypdf`.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import resource
+import sqlite3
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path=".env", override=True)
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter  # noqa: E402
+
+from ai.tools.pinecone import vectorstore, bm25_index  # noqa: E402
+
+DEFAULT_STATE_PATH = str(Path(__file__).resolve().parents[1] / "data" / "ingest_state.sqlite")
+EXTENSIONS = {".txt", ".md", ".pdf", ".jsonl"}
+# Pinecone accepts up to 1000 vectors (2MB) per upsert request
+UPSERT_BATCH = 100
+
+
+class IngestState:
+    """Which chunks are stored, and which files were fully ingested unchanged."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, source TEXT NOT NULL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS chunks_source ON chunks (source)")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS sources (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, chunks INTEGER)"
+        )
+        self.db.commit()
+
+    def source_unchanged(self, path: str, stat: os.stat_result) -> bool:
+        row = self.db.execute("SELECT size, mtime_ns FROM sources WHERE path = ?", (path,)).fetchone()
+        return row is not None and row == (stat.st_size, stat.st_mtime_ns)
+
+    def has_chunk(self, chunk_id: str) -> bool:
+        return self.db.execute("SELECT 1 FROM chunks WHERE id = ?", (chunk_id,)).fetchone() is not None
+
+    def chunk_count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def add_chunks(self, rows: list):
+        self.db.executemany("INSERT OR IGNORE INTO chunks (id, source) VALUES (?, ?)", rows)
+        self.db.commit()
+
+    def stale_chunks(self, path: str, current_ids: set) -> list:
+        rows = self.db.execute("SELECT id FROM chunks WHERE source = ?", (path,)).fetchall()
+        return [chunk_id for (chunk_id,) in rows if chunk_id not in current_ids]
+
+    def finish_source(self, path: str, stat: os.stat_result, chunk_count: int, stale: list):
+        self.db.executemany("DELETE FROM chunks WHERE id = ?", [(chunk_id,) for chunk_id in stale])
+        self.db.execute(
+            "INSERT OR REPLACE INTO sources (path, size, mtime_ns, chunks) VALUES (?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns, chunk_count),
+        )
+        self.db.commit()
+
+
+class Throttle:
+    """Shared pause, so a rate limit seen by one worker slows all of them down."""
+
+    def __init__(self):
+        self.resume_at = 0.0
+
+    async def wait(self):
+        delay = self.resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float):
+        self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+
+def _retry_after(error: Exception):
+    response = getattr(error, "response", None)
+    value = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (TimeoutError, ConnectionError)) or any(
+        word in type(error).__name__ for word in ("RateLimit", "Timeout", "Connection")
+    )
+
+
+async def embed_with_backoff(embeddings, texts: list, throttle: Throttle, max_attempts: int = 6) -> list:
+    for attempt in range(max_attempts):
+        await throttle.wait()
+        try:
+            return await embeddings.aembed_documents(texts)
+        except Exception as e:
+            if attempt == max_attempts - 1 or not _is_retryable(e):
+                raise
+            delay = _retry_after(e) or min(60.0, 2 ** attempt) * (0.5 + random.random())
+            print(f"Embedding batch failed ({type(e).__name__}), backing off {delay:.1f}s")
+            throttle.pause(delay)
+
+
+def iter_files(paths: list):
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            for file in sorted(path.rglob("*")):
+                if file.is_file() and file.suffix.lower() in EXTENSIONS:
+                    yield file
+        elif path.suffix.lower() in EXTENSIONS:
+            yield path
+
+
+def iter_sections(file: Path, block_chars: int):
+    """Yield (text, metadata) sections of at most about `block_chars` characters."""
+    suffix = file.suffix.lower()
+    if suffix == ".jsonl":
+        with open(file, encoding="utf-8") as handle:
+            for number, line in enumerate(handle, start=1):
+                if line.strip():
+                    row = json.loads(line)
+                    yield row["text"], {**row.get("metadata", {}), "record": row.get("id", number)}
+    elif suffix == ".pdf":
+        from pypdf import PdfReader
+
+        for number, page in enumerate(PdfReader(str(file)).pages, start=1):
+            yield page.extract_text() or "", {"page": number}
+    else:
+        # Cut at paragraph breaks so a huge text file is never held in memory at once
+        block = []
+        size = 0
+        with open(file, encoding="utf-8", errors="replace") as handle:
+            for line in handle:
+                block.append(line)
+                size += len(line)
+                if size >= block_chars and not line.strip():
+                    yield "".join(block), {}
+                    block, size = [], 0
+        if block:
+            yield "".join(block), {}
+
+
+def chunk_id(source: str, text: str) -> str:
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+
+class Ingestor:
+    def __init__(self, args):
+        self.args = args
+        self.state = IngestState(args.state)
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+        self.throttle = Throttle()
+        self.queue = asyncio.Queue(maxsize=args.concurrency * 2)
+        self.text_key = getattr(vectorstore, "_text_key", "text")
+        self.pending = {}
+        self.sources = {}
+        self.stats = {
+            "files": 0, "files_skipped": 0, "chunks": 0, "chunks_skipped": 0, "chunks_deleted": 0,
+            "chunks_reindexed": 0, "batches": 0,
+        }
+        self.start = time.monotonic()
+        self.rebuild_bm25 = not args.no_bm25 and len(bm25_index) < self.state.chunk_count()
+        if self.rebuild_bm25:
+            print(
+                f"BM25 index has {len(bm25_index)} of {self.state.chunk_count()} ingested chunks: "
+                "re-reading every file to add the missing ones (without embedding them again)"
+            )
+
+    async def produce(self):
+        batch = []
+        reindex = []
+        for file in iter_files(self.args.paths):
+            source = str(file.resolve())
+            stat = file.stat()
+            if self.state.source_unchanged(source, stat) and not self.rebuild_bm25:
+                self.stats["files_skipped"] += 1
+                continue
+            self.stats["files"] += 1
+            ids = set()
+            self.pending[source] = 0
+            for text, metadata in iter_sections(file, self.args.chunk_size * 20):
+                for piece in self.splitter.split_text(text):
+                    piece_id = chunk_id(source, piece)
+                    if piece_id in ids:
+                        continue
+                    ids.add(piece_id)
+                    if self.state.has_chunk(piece_id):
+                        if self.rebuild_bm25:
+                            reindex.append((piece_id, piece, {**metadata, "source": source}))
+                            if len(reindex) >= self.args.batch_size:
+                                await self.reindex(reindex)
+                                reindex = []
+                        self.stats["chunks_skipped"] += 1
+                        continue
+                    self.pending[source] += 1
+                    batch.append((piece_id, piece, {**metadata, "source": source}))
+                    if len(batch) >= self.args.batch_size:
+                        await self.queue.put(batch)
+                        batch = []
+            self.sources[source] = (stat, ids)
+            if self.pending[source] == 0:
+                await self.finish_source(source)
+        if reindex:
+            await self.reindex(reindex)
+        if batch:
+            await self.queue.put(batch)
+        for _ in range(self.args.concurrency):
+            await self.queue.put(None)
+
+    async def consume(self):
+        while True:
+            batch = await self.queue.get()
+            if batch is None:
+                return
+            vectors = await embed_with_backoff(vectorstore.embeddings, [text for _, text, _ in batch], self.throttle)
+            records = [
+                {"id": piece_id, "values": vector, "metadata": {**metadata, self.text_key: text}}
+                for (piece_id, text, metadata), vector in zip(batch, vectors)
+            ]
+            for i in range(0, len(records), UPSERT_BATCH):
+                await asyncio.to_thread(
+                    vectorstore.index.upsert, vectors=records[i:i + UPSERT_BATCH], namespace=self.args.namespace
+                )
+            if not self.args.no_bm25:
+                # Committed before the state: after a crash in between, the batch is redone, not skipped
+                await asyncio.to_thread(self.write_bm25, batch)
+            self.state.add_chunks([(piece_id, metadata["source"]) for piece_id, _, metadata in batch])
+            await self.record_batch(batch)
+
+    def write_bm25(self, batch: list, stale: tuple = ()):
+        bm25_index.add_many(batch)
+        for stale_id in stale:
+            bm25_index.remove(stale_id)
+        bm25_index.save()
+
+    async def reindex(self, chunks: list):
+        """Add chunks that are already embedded, but missing from the BM25 index."""
+        await asyncio.to_thread(self.write_bm25, chunks)
+        self.stats["chunks_reindexed"] += len(chunks)
+
+    async def record_batch(self, batch: list):
+        self.stats["chunks"] += len(batch)
+        self.stats["batches"] += 1
+        if self.stats["batches"] % self.args.progress_every == 0:
+            print(f"Ingested {self.stats['chunks']} chunks, {self.report()['chunks_per_second']} chunks/s")
+        for _, _, metadata in batch:
+            self.pending[metadata["source"]] -= 1
+        for source in {metadata["source"] for _, _, metadata in batch}:
+            if self.pending[source] == 0 and source in self.sources:
+                await self.finish_source(source)
+
+    async def finish_source(self, source: str):
+        stat, ids = self.sources.pop(source)
+        del self.pending[source]
+        stale = self.state.stale_chunks(source, ids)
+        if stale:
+            for i in range(0, len(stale), UPSERT_BATCH):
+                vectorstore.index.delete(ids=stale[i:i + UPSERT_BATCH], namespace=self.args.namespace)
+            if not self.args.no_bm25:
+                await asyncio.to_thread(self.write_bm25, [], stale)
+            self.stats["chunks_deleted"] += len(stale)
+        self.state.finish_source(source, stat, len(ids), stale)
+
+    def report(self) -> dict:
+        elapsed = time.monotonic() - self.start
+        return {
+            **self.stats,
+            "seconds": round(elapsed, 2),
+            "chunks_per_second": round(self.stats["chunks"] / elapsed, 1) if elapsed else 0.0,
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+
+    async def run(self) -> dict:
+        # The bounded queue makes reading wait for embedding, keeping memory flat
+        tasks = [asyncio.create_task(self.produce())]
+        tasks += [asyncio.create_task(self.consume()) for _ in range(self.args.concurrency)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if not self.args.no_bm25:
+                bm25_index.save()
+        return self.report()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Files or directories to ingest")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Characters per chunk")
+    parser.add_argument("--chunk-overlap", type=int, default=150)
+    parser.add_argument("--batch-size", type=int, default=128, help="Chunks per embedding request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Embedding requests in flight")
+    parser.add_argument("--namespace", default=None, help="Pinecone namespace")
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH, help="SQLite file tracking ingested chunks")
+    parser.add_argument("--no-bm25", action="store_true", help="Don't update the local BM25 index")
+    parser.add_argument("--progress-every", type=int, default=10, help="Batches between progress logs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    report = asyncio.run(Ingestor(parse_args(argv)).run())
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
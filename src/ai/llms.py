@@ -1,8 +1,16 @@
 import os
+import asyncio
+from collections import deque
+from typing import Any, List, Optional
 
+import httpx
+from pydantic import PrivateAttr
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from ai.failover import FailoverChatModel
 
 # OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL") or None
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY") or None
@@ -14,21 +22,191 @@ if not OPENAI_API_KEY:
 if not ANTHROPIC_API_KEY:
     raise NotImplementedError("ANTHROPIC_API_KEY is not set")
 
-def get_llm(provider: str = "openai", model_name: str = "gpt-4.1-mini"):
+# One keep-alive pool per process shared by every OpenAI model; the SDK applies
+# each model's own timeout per request, so the pool itself has none.
+_http_limits = httpx.Limits(
+    max_connections=int(os.environ.get("LLM_HTTP_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.environ.get("LLM_HTTP_MAX_KEEPALIVE", "20")),
+    keepalive_expiry=float(os.environ.get("LLM_HTTP_KEEPALIVE_EXPIRY", "30")),
+)
+_http_client = httpx.Client(limits=_http_limits, timeout=None)
+_http_async_client = httpx.AsyncClient(limits=_http_limits, timeout=None)
+
+# Cached chat models keyed by (provider, model, params)
+_llm_instances = {}
+
+
+def get_llm(
+    provider: str = "openai",
+    model_name: str = "gpt-4.1-mini",
+    timeout: Optional[float] = None,
+    max_retries: Optional[int] = None,
+    prompt_caching: bool = True,
+):
+    """Return the process-wide chat model for this provider, model and settings.
+
+    Instances are created once and reused across agents and turns, so their SDK
+    clients (and the shared HTTP pool underneath) keep connections alive.
+
+    OpenAI caches long prompt prefixes automatically. Anthropic only does so when
+    asked: with `prompt_caching` every request carries a top-level
+    `cache_control`, which marks the end of the prompt as a cache breakpoint so
+    the next call in the agent loop (or the next turn) reads the shared prefix
+    from cache.
+    """
+    key = (provider, model_name, timeout, max_retries, prompt_caching)
+    if key in _llm_instances:
+        return _llm_instances[key]
+
     if provider == "openai":
         openai_params = {
             "model": model_name,
             "api_key": OPENAI_API_KEY,
+            "http_client": _http_client,
+            "http_async_client": _http_async_client,
         }
-        return ChatOpenAI(**openai_params)
-    
+        if timeout is not None:
+            openai_params["timeout"] = timeout
+        if max_retries is not None:
+            openai_params["max_retries"] = max_retries
+        llm = ChatOpenAI(**openai_params)
+
     elif provider == "anthropic":
+        # The Anthropic SDK client is cached on the instance and uses the
+        # integration's process-wide pool for this timeout
         anthropic_params = {
             "model": model_name,
             "api_key": ANTHROPIC_API_KEY,
         }
-        return ChatAnthropic(**anthropic_params)
-    
+        if timeout is not None:
+            anthropic_params["timeout"] = timeout
+        if max_retries is not None:
+            anthropic_params["max_retries"] = max_retries
+        if prompt_caching:
+            anthropic_params["model_kwargs"] = {"cache_control": {"type": "ephemeral"}}
+        llm = ChatAnthropic(**anthropic_params)
+
     else:
         raise NotImplementedError(f"Provider {provider} is not supported")
-    
\ No newline at end of file
+
+    _llm_instances[key] = llm
+    return llm
+
+
+def get_llm_from_config(model_config: dict):
+    """Build the chat model described by an `llm_models` entry in config.yaml.
+
+    Honours the optional `timeout`, `max_retries`, `prompt_caching`, `hedge`,
+    `fallbacks` and `attempt_timeout` settings.
+    """
+    llm = _get_hedged_llm(model_config)
+    fallbacks = model_config.get("fallbacks") or []
+    if not fallbacks:
+        return llm
+
+    chain = [model_config, *fallbacks]
+    key = ("failover", *(id(_get_hedged_llm(entry)) for entry in chain), model_config.get("attempt_timeout"))
+    if key not in _llm_instances:
+        _llm_instances[key] = FailoverChatModel(
+            models=[_get_hedged_llm(entry) for entry in chain],
+            names=[f'{entry["provider"]}:{entry["model"]}' for entry in chain],
+            attempt_timeout=model_config.get("attempt_timeout"),
+        )
+    return _llm_instances[key]
+
+
+def _get_hedged_llm(model_config: dict):
+    llm = get_llm(
+        provider=model_config["provider"],
+        model_name=model_config["model"],
+        timeout=model_config.get("timeout"),
+        max_retries=model_config.get("max_retries"),
+        prompt_caching=model_config.get("prompt_caching", True),
+    )
+    hedge = model_config.get("hedge") or {}
+    if not hedge.get("enabled", False):
+        return llm
+
+    key = ("hedged", id(llm), hedge.get("delay_ms"), hedge.get("adaptive"))
+    if key not in _llm_instances:
+        _llm_instances[key] = HedgedChatModel(
+            primary=llm,
+            delay=hedge.get("delay_ms", 2000) / 1000,
+            adaptive=hedge.get("adaptive", True),
+        )
+    return _llm_instances[key]
+
+
+class HedgedChatModel(BaseChatModel):
+    """Fire a backup request when the primary is slower than usual.
+
+    If the first call has not finished after `delay` seconds (or, once enough
+    samples exist and `adaptive` is on, after the observed p95 latency), a second
+    identical call is started and whichever finishes first wins; the other is
+    cancelled. Tool bindings are forwarded to the wrapped model.
+    """
+
+    primary: BaseChatModel
+    delay: float = 2.0
+    adaptive: bool = True
+    min_samples: int = 20
+
+    _latencies: deque = PrivateAttr(default_factory=lambda: deque(maxlen=200))
+
+    @property
+    def _llm_type(self) -> str:
+        return f"hedged-{self.primary._llm_type}"
+
+    def bind_tools(self, tools, *, tool_choice=None, parallel_tool_calls: Optional[bool] = None, **kwargs):
+        # Let the wrapped model format the tools, then bind the same kwargs to us.
+        # `parallel_tool_calls` is spelled out so the supervisor can disable it.
+        if tool_choice is not None:
+            kwargs["tool_choice"] = tool_choice
+        if parallel_tool_calls is not None:
+            kwargs["parallel_tool_calls"] = parallel_tool_calls
+        return self.bind(**self.primary.bind_tools(tools, **kwargs).kwargs)
+
+    def hedge_delay(self) -> float:
+        if not self.adaptive or len(self._latencies) < self.min_samples:
+            return self.delay
+        ordered = sorted(self._latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return self.primary._generate(messages, stop=stop, **kwargs)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            return await self._hedged_call(messages, stop, kwargs)
+        finally:
+            # End-to-end latency, so cancelled slow calls still move the p95
+            self._latencies.append(loop.time() - start)
+
+    async def _hedged_call(self, messages: List[BaseMessage], stop, kwargs: dict) -> ChatResult:
+        delay = self.hedge_delay()
+        first = asyncio.create_task(self.primary._agenerate(messages, stop=stop, **kwargs))
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+        except asyncio.CancelledError:
+            # asyncio.wait doesn't cancel what it waits on; don't leave the request running
+            first.cancel()
+            raise
+        if done:
+            return first.result()
+
+        print(f"Hedging {self.primary._llm_type} call after {delay:.2f}s")
+        pending = {first, asyncio.create_task(self.primary._agenerate(messages, stop=stop, **kwargs))}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
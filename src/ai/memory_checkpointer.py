@@ -0,0 +1,190 @@
+from collections import OrderedDict, defaultdict
+from typing import Any, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.memory import InMemorySaver
+
+# Rough cost of a stored entry besides its serialized bytes: the key tuple,
+# the value tuple and the dict slot
+ENTRY_OVERHEAD_BYTES = 150
+
+
+def _typed_bytes(value) -> int:
+    """Size of a `serde.dumps_typed` result, `(type, bytes)`."""
+    return len(value[0]) + len(value[1]) + ENTRY_OVERHEAD_BYTES
+
+
+def _checkpoint_bytes(entry) -> int:
+    checkpoint, metadata, _ = entry
+    return _typed_bytes(checkpoint) + _typed_bytes(metadata)
+
+
+def _writes_bytes(writes: Optional[dict]) -> int:
+    return sum(_typed_bytes(value) for _, _, value, _ in (writes or {}).values())
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """`MemorySaver` with limits, for single-node and development deployments.
+
+    Only the latest `keep_checkpoints` checkpoints of each thread (per
+    namespace) are kept, with their pending writes and the channel blobs they
+    reference. Whole threads are evicted, least recently used first, once
+    there are more than `max_threads` or the serialized checkpoints take more
+    than `max_bytes`. An evicted thread starts over on its next turn.
+
+    Older checkpoints are dropped whole, which suits graphs without
+    `DeltaChannel`s (this repo's). Sizes are serialized bytes plus a fixed
+    per-entry overhead, so `bytes` is an estimate of what the saver holds.
+    """
+
+    def __init__(self, *, serde=None, max_threads: int = 1000, max_bytes: int = 256 * 2 ** 20,
+                 keep_checkpoints: int = 5, reason: Optional[str] = None):
+        super().__init__(serde=serde)
+        # Why this saver is in use (e.g. the Postgres error it stands in for), reported in `usage()`
+        self.reason = reason
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.keep_checkpoints = max(keep_checkpoints, 1)
+        self.bytes = 0
+        self._threads = OrderedDict()  # thread_id -> bytes, least recently used first
+        self._blob_keys = defaultdict(set)  # thread_id -> {(checkpoint_ns, channel, version)}
+        self._write_keys = defaultdict(set)  # thread_id -> {(checkpoint_ns, checkpoint_id)}
+        self._versions = {}  # (thread_id, checkpoint_ns, checkpoint_id) -> channel_versions
+        self.stats = {"evicted_threads": 0, "pruned_checkpoints": 0}
+
+    # Bookkeeping
+
+    def _touch(self, thread_id: str, added: int = 0):
+        self._threads[thread_id] = self._threads.get(thread_id, 0) + added
+        self._threads.move_to_end(thread_id)
+        self.bytes += added
+
+    def _drop_thread(self, thread_id: str):
+        for checkpoint_ns, checkpoints in self.storage.pop(thread_id, {}).items():
+            for checkpoint_id in checkpoints:
+                self._versions.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        for checkpoint_ns, checkpoint_id in self._write_keys.pop(thread_id, ()):
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        for key in self._blob_keys.pop(thread_id, ()):
+            self.blobs.pop((thread_id, *key), None)
+        self.bytes -= self._threads.pop(thread_id, 0)
+
+    def _prune(self, thread_id: str, checkpoint_ns: str, keep: int):
+        """Keep the thread's latest `keep` checkpoints in the namespace and the blobs they use."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= keep:
+            return
+        freed = 0
+        for checkpoint_id in sorted(checkpoints)[:-keep]:
+            freed += _checkpoint_bytes(checkpoints.pop(checkpoint_id))
+            self._versions.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            freed += _writes_bytes(self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None))
+            self._write_keys[thread_id].discard((checkpoint_ns, checkpoint_id))
+            self.stats["pruned_checkpoints"] += 1
+        referenced = {
+            (checkpoint_ns, channel, version)
+            for checkpoint_id in checkpoints
+            for channel, version in self._versions.get((thread_id, checkpoint_ns, checkpoint_id), {}).items()
+        }
+        blob_keys = self._blob_keys[thread_id]
+        for key in [key for key in blob_keys if key[0] == checkpoint_ns and key not in referenced]:
+            blob_keys.discard(key)
+            blob = self.blobs.pop((thread_id, *key), None)
+            if blob is not None:
+                freed += _typed_bytes(blob)
+        self._threads[thread_id] -= freed
+        self.bytes -= freed
+
+    def _evict(self, keep_thread: str):
+        while len(self._threads) > self.max_threads or self.bytes > self.max_bytes:
+            thread_id = next(iter(self._threads))
+            if thread_id == keep_thread:
+                # A single thread over the byte limit stays until another one is written
+                break
+            self._drop_thread(thread_id)
+            self.stats["evicted_threads"] += 1
+            print(f"BoundedMemorySaver: evicted thread {thread_id} ({len(self._threads)} threads, {self.bytes / 2 ** 20:.1f}MB left)")
+
+    # Reads: unknown threads return early, so a read never creates an entry
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        if thread_id not in self.storage:
+            return None
+        self._touch(thread_id)
+        return super().get_tuple(config)
+
+    def list(self, config: Optional[RunnableConfig], *, filter=None, before=None, limit=None):
+        if config is not None:
+            thread_id = config["configurable"]["thread_id"]
+            if thread_id not in self.storage:
+                return
+            self._touch(thread_id)
+        yield from super().list(config, filter=filter, before=before, limit=limit)
+
+    # Writes
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        blob_keys = [(thread_id, checkpoint_ns, channel, version) for channel, version in new_versions.items()]
+        replaced = sum(_typed_bytes(self.blobs[key]) for key in blob_keys if key in self.blobs)
+        previous = self.storage.get(thread_id, {}).get(checkpoint_ns, {}).get(checkpoint["id"])
+        if previous is not None:
+            replaced += _checkpoint_bytes(previous)
+
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+
+        added = _checkpoint_bytes(self.storage[thread_id][checkpoint_ns][checkpoint["id"]])
+        added += sum(_typed_bytes(self.blobs[key]) for key in blob_keys)
+        self._blob_keys[thread_id].update(key[1:] for key in blob_keys)
+        self._versions[(thread_id, checkpoint_ns, checkpoint["id"])] = dict(checkpoint["channel_versions"])
+        self._touch(thread_id, added - replaced)
+        self._prune(thread_id, checkpoint_ns, self.keep_checkpoints)
+        self._evict(keep_thread=thread_id)
+        return next_config
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        key = (thread_id, checkpoint_ns, checkpoint_id)
+        before = _writes_bytes(self.writes.get(key))
+        super().put_writes(config, writes, task_id, task_path)
+        self._write_keys[thread_id].add((checkpoint_ns, checkpoint_id))
+        self._touch(thread_id, _writes_bytes(self.writes.get(key)) - before)
+        self._evict(keep_thread=thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._drop_thread(thread_id)
+
+    def prune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        for thread_id in thread_ids:
+            if strategy == "delete":
+                self._drop_thread(thread_id)
+            elif thread_id in self.storage:
+                for checkpoint_ns in list(self.storage[thread_id]):
+                    self._prune(thread_id, checkpoint_ns, keep=1)
+
+    async def aprune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        self.prune(thread_ids, strategy=strategy)
+
+    def usage(self) -> dict:
+        """Memory use and limits, for metrics."""
+        return {
+            "reason": self.reason,
+            **self.stats,
+            "threads": len(self._threads),
+            "max_threads": self.max_threads,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "keep_checkpoints": self.keep_checkpoints,
+        }
@@ -0,0 +1,40 @@
+from collections import defaultdict
+
+# Process-wide counters, e.g. cancelled runs and the tokens that saved
+_counters = defaultdict(float)
+# Running mean of a completed turn's tokens, the baseline for "tokens saved"
+_turns = {"count": 0, "tokens": 0}
+
+
+def increment(name: str, value: float = 1):
+    _counters[name] += value
+
+
+def turn_completed(tokens: int):
+    """Record the tokens used by a turn that ran to completion."""
+    _turns["count"] += 1
+    _turns["tokens"] += tokens
+
+
+def mean_turn_tokens() -> float:
+    return _turns["tokens"] / _turns["count"] if _turns["count"] else 0.0
+
+
+def turn_cancelled(tokens_used: int):
+    """Count a cancelled turn and estimate the tokens it didn't spend.
+
+    The estimate is the mean tokens of the turns completed so far in this
+    process, less what the cancelled turn had already used.
+    """
+    increment("runs_cancelled")
+    increment("cancelled_tokens_used", tokens_used)
+    increment("cancelled_tokens_saved_estimate", max(mean_turn_tokens() - tokens_used, 0))
+
+
+def metrics() -> dict:
+    """Counters since the process started."""
+    return {
+        **{name: round(value, 2) for name, value in _counters.items()},
+        "turns_completed": _turns["count"],
+        "mean_turn_tokens": round(mean_turn_tokens(), 1),
+    }
@@ -0,0 +1,39 @@
+import hashlib
+import os
+from dataclasses import dataclass
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+
+
+@dataclass(frozen=True)
+class Prompt:
+    name: str
+    text: str
+    version: str
+
+
+# Prompts loaded so far, keyed by file name; read from disk once per process
+_prompts = {}
+
+
+def get_prompt(name: str) -> Prompt:
+    """Return the prompt stored in `ai/prompts/<name>`.
+
+    The text is normalised once (line endings, trailing whitespace) so the
+    system prompt sent to the providers is byte-identical on every call, which
+    is what their prefix caches key on. `version` is a short content hash.
+    """
+    if name in _prompts:
+        return _prompts[name]
+
+    with open(os.path.join(PROMPTS_DIR, name), encoding="utf-8", mode="r") as file:
+        text = file.read().replace("\r\n", "\n").strip()
+    prompt = Prompt(name=name, text=text, version=hashlib.sha256(text.encode("utf-8")).hexdigest()[:12])
+    print(f"Loaded prompt {name} version={prompt.version} ({len(text)} chars)")
+    _prompts[name] = prompt
+    return prompt
+
+
+def prompt_versions() -> dict:
+    """Version hash of every prompt loaded so far, keyed by file name."""
+    return {name: prompt.version for name, prompt in _prompts.items()}
@@ -0,0 +1,95 @@
+import re
+from typing import List
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from ai.agents import config
+from ai.llms import get_llm_from_config
+from ai.schemas import RouteDecision
+
+routing_config = config.get("routing", {})
+model_pricing = config.get("model_pricing", {})
+
+# Cues that the answer depends on what we know about the user
+MEMORY_CUES = (
+    "remember", "last time", "i told you", "i mentioned", "as i said", "you know my",
+    "my baby's name", "my son's", "my daughter's", "we talked", "earlier",
+)
+
+# Cues that the answer needs facts, advice or sources
+RESEARCH_CUES = (
+    "advice", "tips", "recommend", "suggest", "ideas", "research", "study", "book",
+    "normal", "safe", "dose", "dosage", "fever", "rash", "vaccine", "milestone",
+    "schedule", "formula", "solids", "allergy", "doctor", "symptom",
+)
+
+INTERROGATIVES = {
+    "how", "what", "why", "when", "where", "which", "who", "should", "can", "could",
+    "is", "are", "does", "do", "will", "would",
+}
+
+CLASSIFIER_PROMPT = (
+    "You route messages for Rosy, a support companion for new parents. "
+    "Answer `fast` for greetings, thanks, small talk and emotional check-ins that only need empathy. "
+    "Answer `supervisor` for anything that needs facts, advice, research, or what Rosy remembers about the user."
+)
+
+
+def classify_heuristic(text: str) -> RouteDecision:
+    """Route with local keyword rules; free and sub-millisecond."""
+    lowered = text.lower()
+    words = re.findall(r"[a-z']+", lowered)
+
+    if any(cue in lowered for cue in MEMORY_CUES):
+        return RouteDecision(route="supervisor", reason="memory")
+    if "?" in text or (words and words[0] in INTERROGATIVES):
+        return RouteDecision(route="supervisor", reason="question")
+    if any(cue in lowered for cue in RESEARCH_CUES):
+        return RouteDecision(route="supervisor", reason="research")
+    if len(words) > routing_config.get("max_simple_words", 40):
+        return RouteDecision(route="supervisor", reason="long")
+    return RouteDecision(route="fast", reason="simple")
+
+
+async def classify_llm(text: str) -> RouteDecision:
+    """Route with the small classifier model, falling back to the heuristic."""
+    model_config = config["llm_models"]["router_classifier"]
+    llm = get_llm_from_config(model_config)
+    try:
+        classifier = llm.with_structured_output(RouteDecision)
+        return await classifier.ainvoke([SystemMessage(content=CLASSIFIER_PROMPT), HumanMessage(content=text)])
+    except Exception as e:
+        print(f"Router classifier failed, using heuristic: {e}")
+        return classify_heuristic(text)
+
+
+async def route_message(messages: List[BaseMessage]) -> RouteDecision:
+    """Decide which tier answers the latest human message."""
+    if not routing_config.get("enabled", False):
+        return RouteDecision(route="supervisor", reason="routing disabled")
+
+    latest = next((m for m in reversed(messages) if isinstance(m, HumanMessage)), None)
+    if latest is None or not isinstance(latest.content, str):
+        return RouteDecision(route="supervisor", reason="no text message")
+
+    if routing_config.get("classifier") == "llm":
+        return await classify_llm(latest.content)
+    return classify_heuristic(latest.content)
+
+
+def price_for(model_name: str) -> dict | None:
+    """Pricing entry whose key is the longest prefix of `model_name`."""
+    matches = [key for key in model_pricing if model_name.startswith(key)]
+    return model_pricing[max(matches, key=len)] if matches else None
+
+
+def estimate_cost(usage_by_model: dict, as_model: str | None = None) -> float:
+    """USD cost of the given usage, optionally as if every call had used `as_model`."""
+    total = 0.0
+    for model_name, usage in usage_by_model.items():
+        price = price_for(as_model or model_name)
+        if price is None:
+            continue
+        total += usage.get("input_tokens", 0) * price["input"] / 1_000_000
+        total += usage.get("output_tokens", 0) * price["output"] / 1_000_000
+    return total
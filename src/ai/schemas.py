@@ -3,19 +3,40 @@ from pydantic import BaseModel, Field
 from typing import TypedDict, Literal, Annotated
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
+from langgraph.channels import EphemeralValue
 
 
-class AgentState(TypedDict, total=False):
-    """State of the agent."""
+class ConversationState(TypedDict, total=False):
+    """The checkpointed thread: the user's messages and the answers they saw."""
     messages: Annotated[List[BaseMessage], add_messages]
 
 
+class TurnScratch(TypedDict, total=False):
+    """Context gathered for the current turn only.
+
+    Ephemeral channels: a value is readable in the step after it is written and
+    then dropped, so it never reaches the thread's final checkpoint.
+    """
+    research: Annotated[str, EphemeralValue]
+    memories: Annotated[str, EphemeralValue]
+
+
+class AgentState(ConversationState, TurnScratch, total=False):
+    """State of the agent."""
+
+
 
 class AIResponse(BaseModel):
     """Response from the AI model."""
     content: str
+    degraded: List[str] = Field(default_factory=list, description="Steps skipped to answer within the turn's deadline, e.g. `research`")
 
 class WebSearchResponse(BaseModel):
     """Response from the web search."""
     content: str = Field(description="The main content or summary from the web search results")
     sources: List[str] = Field(description="List of URLs or source references used in the web search")
+
+class RouteDecision(BaseModel):
+    """Which tier should answer the latest user message."""
+    route: Literal["fast", "supervisor"] = Field(description="`fast` for greetings, thanks and emotional check-ins; `supervisor` when the answer needs research or the user's stored memories")
+    reason: str = Field(description="Short reason for the decision")
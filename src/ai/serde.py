@@ -0,0 +1,64 @@
+import os
+import zlib
+from typing import Any
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# `zstd`, `zlib` or `none`; zstd falls back to zlib when `zstandard` isn't installed
+CHECKPOINT_COMPRESSION = os.environ.get("CHECKPOINT_COMPRESSION", "zstd").lower()
+# Serialized values smaller than this many bytes are stored uncompressed
+CHECKPOINT_COMPRESSION_THRESHOLD = int(os.environ.get("CHECKPOINT_COMPRESSION_THRESHOLD", "2048"))
+CHECKPOINT_COMPRESSION_LEVEL = int(os.environ.get("CHECKPOINT_COMPRESSION_LEVEL", "3"))
+
+
+class CompressedSerializer(JsonPlusSerializer):
+    """The default msgpack checkpoint serializer, compressing large values.
+
+    The codec is recorded in the type tag (`msgpack+zstd`, `msgpack+zlib`), the
+    same way `EncryptedSerializer` marks ciphertext, so values written without
+    compression (including every checkpoint stored before this serializer)
+    load unchanged, and a future codec only needs a new tag.
+    """
+
+    def __init__(self, codec: str = "zstd", threshold: int = 2048, level: int = 3, **kwargs):
+        super().__init__(**kwargs)
+        if codec == "zstd" and zstandard is None:
+            print("zstandard is not installed, compressing checkpoints with zlib")
+            codec = "zlib"
+        if codec not in ("zstd", "zlib", "none"):
+            raise ValueError(f"Unknown checkpoint compression codec: {codec}")
+        self.codec = codec
+        self.threshold = threshold
+        self.level = level
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        type_, data = super().dumps_typed(obj)
+        if self.codec == "none" or type_ != "msgpack" or len(data) < self.threshold:
+            return type_, data
+        if self.codec == "zstd":
+            return f"{type_}+zstd", zstandard.compress(data, self.level)
+        return f"{type_}+zlib", zlib.compress(data, min(self.level, 9))
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith("+zstd"):
+            if zstandard is None:
+                raise RuntimeError("This checkpoint is zstd-compressed; install `zstandard` to load it")
+            return super().loads_typed((type_[:-len("+zstd")], zstandard.decompress(payload)))
+        if type_.endswith("+zlib"):
+            return super().loads_typed((type_[:-len("+zlib")], zlib.decompress(payload)))
+        return super().loads_typed(data)
+
+
+def get_serde() -> CompressedSerializer:
+    """Checkpoint serializer configured from the environment."""
+    return CompressedSerializer(
+        codec=CHECKPOINT_COMPRESSION,
+        threshold=CHECKPOINT_COMPRESSION_THRESHOLD,
+        level=CHECKPOINT_COMPRESSION_LEVEL,
+    )
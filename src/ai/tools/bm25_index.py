@@ -0,0 +1,152 @@
+import heapq
+import json
+import math
+import os
+import sqlite3
+import threading
+from collections import Counter
+from typing import List, Optional
+
+from langchain_core.documents import Document
+
+from ai.tools.compression import tokenize
+
+# `docs.terms` lists a document's distinct terms, so removing it needs no index on `postings.doc`
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, length INTEGER NOT NULL, terms TEXT NOT NULL, metadata TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL, doc INTEGER NOT NULL, tf INTEGER NOT NULL, length INTEGER NOT NULL,
+    PRIMARY KEY (term, doc)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stats (id INTEGER PRIMARY KEY CHECK (id = 0), documents INTEGER, total_length INTEGER);
+INSERT OR IGNORE INTO stats (id, documents, total_length) VALUES (0, 0, 0);
+"""
+
+
+class BM25Index:
+    """Local inverted index for lexical (BM25) search over the retrieval corpus.
+
+    The index is a SQLite file of postings and per-document lengths and
+    metadata, keyed by the vector store's ids; the text of a hit comes from the
+    vector store. Nothing is loaded up front: searches read the postings of the
+    query terms (each thread with its own connection), so memory doesn't grow
+    with the corpus. `add` and `remove` are visible to searches, and durable,
+    after `save()`; they may be called from any thread, one at a time.
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._db = None
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _writer(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            # Searches in serving workers keep reading while ingestion writes
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def _reader(self) -> Optional[sqlite3.Connection]:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            if not os.path.exists(self.path):
+                return None
+            db = self._local.db = sqlite3.connect(self.path)
+        return db
+
+    def __len__(self) -> int:
+        db = self._reader()
+        if db is None:
+            return 0
+        return db.execute("SELECT documents FROM stats").fetchone()[0]
+
+    def _remove(self, db: sqlite3.Connection, doc_id: str):
+        row = db.execute("SELECT doc, length, terms FROM docs WHERE id = ?", (doc_id,)).fetchone()
+        if row is None:
+            return
+        doc, length, terms = row
+        db.executemany("DELETE FROM postings WHERE term = ? AND doc = ?", [(term, doc) for term in terms.split()])
+        db.execute("DELETE FROM docs WHERE doc = ?", (doc,))
+        db.execute("UPDATE stats SET documents = documents - 1, total_length = total_length - ?", (length,))
+
+    def add_many(self, documents):
+        """Add or replace `(doc_id, text, metadata)` documents; only their terms and metadata are stored."""
+        with self._write_lock:
+            db = self._writer()
+            postings = []
+            added = added_length = 0
+            # The last version of a document repeated in `documents` wins
+            for doc_id, (text, metadata) in {doc_id: (text, metadata) for doc_id, text, metadata in documents}.items():
+                self._remove(db, doc_id)
+                counts = Counter(tokenize(text))
+                length = sum(counts.values())
+                doc = db.execute(
+                    "INSERT INTO docs (id, length, terms, metadata) VALUES (?, ?, ?, ?)",
+                    (doc_id, length, " ".join(counts), json.dumps(metadata or {})),
+                ).lastrowid
+                postings += [(term, doc, tf, length) for term, tf in counts.items()]
+                added += 1
+                added_length += length
+            # In key order, the inserts touch each B-tree page once
+            postings.sort()
+            db.executemany("INSERT INTO postings (term, doc, tf, length) VALUES (?, ?, ?, ?)", postings)
+            db.execute(
+                "UPDATE stats SET documents = documents + ?, total_length = total_length + ?", (added, added_length)
+            )
+
+    def add(self, doc_id: str, text: str, metadata: Optional[dict] = None):
+        self.add_many([(doc_id, text, metadata)])
+
+    def remove(self, doc_id: str):
+        with self._write_lock:
+            self._remove(self._writer(), doc_id)
+
+    def search(self, query: str, k: int = 10) -> List[Document]:
+        """Top `k` documents by BM25 score, with the score in `metadata["bm25_score"]`.
+
+        Documents come back without text (`page_content` is empty). Blocking:
+        run it in a thread from async code.
+        """
+        db = self._reader()
+        if db is None:
+            return []
+        count, total_length = db.execute("SELECT documents, total_length FROM stats").fetchone()
+        if not count:
+            return []
+        avg_length = total_length / count or 1.0
+        scores = Counter()
+        for term in set(tokenize(query)):
+            postings = db.execute("SELECT doc, tf, length FROM postings WHERE term = ?", (term,)).fetchall()
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, tf, length in postings:
+                norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[doc] += idf * tf * (self.k1 + 1) / (tf + norm)
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        if not top:
+            return []
+        rows = {
+            doc: (doc_id, metadata)
+            for doc, doc_id, metadata in db.execute(
+                f"SELECT doc, id, metadata FROM docs WHERE doc IN ({', '.join('?' * len(top))})", [doc for doc, _ in top]
+            )
+        }
+        return [
+            Document(id=rows[doc][0], page_content="", metadata={**json.loads(rows[doc][1]), "bm25_score": score})
+            for doc, score in top
+            if doc in rows
+        ]
+
+    def save(self):
+        """Commit the changes since the last save."""
+        with self._write_lock:
+            if self._db is not None:
+                self._db.commit()
@@ -0,0 +1,120 @@
+import math
+import re
+from collections import Counter
+from typing import List, Optional
+
+WORD = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in is it its "
+    "my of on or our should so that the their them there they this to was what when "
+    "which who will with would you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words without stopwords, for lexical scoring."""
+    return [word for word in WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def split_passages(text: str, max_chars: int = 400) -> List[str]:
+    """Pack consecutive sentences into passages of at most `max_chars`."""
+    passages = []
+    current = ""
+    for sentence in SENTENCE_BREAK.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            passages.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        passages.append(current)
+    return passages
+
+
+def bm25_scores(query_terms: List[str], documents: List[List[str]], k1: float = 1.5, b: float = 0.75) -> List[float]:
+    """Okapi BM25 score of each tokenized document for the query terms."""
+    if not documents:
+        return []
+    avg_length = sum(len(doc) for doc in documents) / len(documents) or 1.0
+    document_frequency = Counter(term for doc in documents for term in set(doc))
+    scores = []
+    for doc in documents:
+        frequencies = Counter(doc)
+        score = 0.0
+        for term in set(query_terms):
+            tf = frequencies.get(term, 0)
+            if not tf:
+                continue
+            df = document_frequency[term]
+            idf = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc) / avg_length))
+        scores.append(score)
+    return scores
+
+
+def _shingles(terms: List[str], size: int = 4) -> set:
+    """Word `size`-grams of the terms; empty when there are too few terms to compare."""
+    return {tuple(terms[i:i + size]) for i in range(len(terms) - size + 1)}
+
+
+def compress_passages(
+    query: str,
+    texts: List[str],
+    budget_tokens: Optional[int],
+    header_tokens: Optional[List[int]] = None,
+    passage_chars: int = 400,
+    duplicate_threshold: float = 0.6,
+) -> List[List[str]]:
+    """Keep the passages of `texts` most relevant to `query` within a token budget.
+
+    Texts are split into passages and ranked by BM25 against the query (ties
+    keep the original source and reading order). Passages are taken greedily
+    while they fit the budget, skipping any that mostly repeat one already
+    taken (shingle overlap above `duplicate_threshold`; passages with fewer
+    than four terms are never treated as duplicates). `header_tokens[i]` is
+    charged once when the first passage of text `i` is kept.
+
+    Returns:
+        For each text, its kept passages in their original order (possibly none).
+        With no budget, every passage is kept.
+    """
+    passages = [split_passages(text, passage_chars) for text in texts]
+    if not budget_tokens or budget_tokens <= 0:
+        return passages
+
+    header_tokens = header_tokens or [0] * len(texts)
+    flat = [(i, j, passage) for i, source in enumerate(passages) for j, passage in enumerate(source)]
+    terms = [tokenize(passage) for _, _, passage in flat]
+    scores = bm25_scores(tokenize(query), terms)
+    ranked = sorted(range(len(flat)), key=lambda n: (-scores[n], flat[n][0], flat[n][1]))
+
+    kept = set()
+    kept_sources = set()
+    kept_shingles = []
+    used = 0
+    for n in ranked:
+        i, j, passage = flat[n]
+        cost = estimate_tokens(passage) + (header_tokens[i] if i not in kept_sources else 0)
+        if used + cost > budget_tokens:
+            continue
+        shingles = _shingles(terms[n])
+        if shingles and any(
+            len(shingles & other) / len(shingles | other) >= duplicate_threshold for other in kept_shingles
+        ):
+            continue
+        kept.add((i, j))
+        kept_sources.add(i)
+        if shingles:
+            kept_shingles.append(shingles)
+        used += cost
+
+    return [[passage for j, passage in enumerate(source) if (i, j) in kept] for i, source in enumerate(passages)]
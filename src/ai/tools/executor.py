@@ -0,0 +1,141 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+
+from langchain_core.messages import ToolMessage
+
+
+class ToolExecutor:
+    """`awrap_tool_call` hook for a ToolNode that batches an agent step's tool calls.
+
+    ToolNode already runs a step's calls concurrently; on top of that this:
+    - caps concurrent calls per tool (`concurrency`, else `default_concurrency`),
+    - runs identical calls (same tool and arguments) in the same turn once,
+      sharing the in-flight call and reusing its result for up to
+      `dedupe_ttl_seconds`; the next turn searches again,
+    - logs the fan-out latency of each step once its last call finishes.
+    """
+
+    def __init__(
+        self,
+        concurrency: dict = None,
+        default_concurrency: int = 4,
+        dedupe_ttl_seconds: float = 120,
+        max_cached_results: int = 256,
+    ):
+        self.concurrency = concurrency or {}
+        self.default_concurrency = default_concurrency
+        self.dedupe_ttl = dedupe_ttl_seconds
+        self.max_cached_results = max_cached_results
+        self._semaphores = {}
+        self._inflight = {}
+        self._waiters = {}
+        self._results = OrderedDict()
+        self._steps = {}
+
+    def _semaphore(self, tool_name: str) -> asyncio.Semaphore:
+        if tool_name not in self._semaphores:
+            limit = self.concurrency.get(tool_name, self.default_concurrency)
+            self._semaphores[tool_name] = asyncio.Semaphore(limit)
+        return self._semaphores[tool_name]
+
+    def _cache_key(self, request) -> tuple:
+        config = getattr(request.runtime, "config", None) or {}
+        configurable = config.get("configurable", {})
+        # `turn_id` is set per message by ChatService; graphs run without it dedupe per thread
+        scope = configurable.get("turn_id") or configurable.get("thread_id")
+        args = json.dumps(request.tool_call["args"], sort_keys=True, default=str)
+        return (scope, request.tool_call["name"], args)
+
+    def _cached(self, key):
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        expires, message = entry
+        if time.monotonic() > expires:
+            del self._results[key]
+            return None
+        return message
+
+    def _remember(self, key, message):
+        # Errors and control-flow results are never reused
+        if not isinstance(message, ToolMessage) or message.status == "error":
+            return
+        self._results[key] = (time.monotonic() + self.dedupe_ttl, message)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_cached_results:
+            self._results.popitem(last=False)
+
+    async def _run(self, key, request, execute):
+        async with self._semaphore(request.tool_call["name"]):
+            message = await execute(request)
+        self._remember(key, message)
+        return message
+
+    async def _join(self, key, task):
+        """Wait for a shared call; it is cancelled only once every caller waiting on it is."""
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[key] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+    def _step_started(self, request):
+        step = _step_id(request)
+        if step is None:
+            return None
+        if step not in self._steps:
+            calls = len(request.state["messages"][-1].tool_calls)
+            self._steps[step] = {"start": time.perf_counter(), "calls": calls, "pending": calls, "deduped": 0}
+        return step
+
+    def _step_finished(self, step, deduped: bool):
+        stats = self._steps.get(step)
+        if stats is None:
+            return
+        stats["pending"] -= 1
+        stats["deduped"] += int(deduped)
+        if stats["pending"] <= 0:
+            del self._steps[step]
+            print(
+                f"Tool step: {stats['calls']} call(s), {stats['deduped']} deduplicated, "
+                f"fan-out {(time.perf_counter() - stats['start']) * 1000:.0f}ms"
+            )
+
+    async def __call__(self, request, execute):
+        step = self._step_started(request)
+        key = self._cache_key(request)
+        deduped = True
+        try:
+            message = self._cached(key)
+            if message is None:
+                task = self._inflight.get(key)
+                if task is None:
+                    deduped = False
+                    task = asyncio.ensure_future(self._run(key, request, execute))
+                    self._inflight[key] = task
+                    task.add_done_callback(lambda _, key=key: self._inflight.pop(key, None))
+                message = await self._join(key, task)
+        finally:
+            self._step_finished(step, deduped)
+
+        if deduped and isinstance(message, ToolMessage):
+            # A fresh id, or add_messages would treat the copy as the original
+            message = message.model_copy(update={"tool_call_id": request.tool_call["id"], "id": None})
+        return message
+
+
+def _step_id(request):
+    """The id of the AI message whose tool calls are being executed."""
+    state = request.state
+    messages = state.get("messages") if isinstance(state, dict) else None
+    if not messages or not getattr(messages[-1], "tool_calls", None):
+        return None
+    return messages[-1].id or id(messages[-1])
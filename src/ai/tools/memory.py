@@ -3,6 +3,7 @@ from mem0 import AsyncMemoryClient
 from typing import List, Dict, Optional
 from langchain_core.tools import tool
 from langchain_core.runnables import RunnableConfig
+from ai.deadline import OutOfTime, get_budget, within_budget
 
 MEM0_API_KEY = os.environ.get("MEM0_API_KEY") or None
 
@@ -41,8 +42,34 @@ async def get_from_memory(query: str, config: RunnableConfig) -> str:
         Top matching memories for the user.
     """
     global client
+    budget = get_budget(config)
+    if budget is not None and not budget.allows("memory"):
+        budget.degrade("memory", "memory lookup skipped")
+        raise OutOfTime("Memory lookup skipped: out of time, answer without the user's memories")
     user_id = config["metadata"].get("user_id")
     print(f"User ID: {user_id}")
-    memories = await client.search(query, user_id=user_id)
+    try:
+        memories = await within_budget(budget, client.search(query, user_id=user_id))
+    except OutOfTime:
+        budget.degrade("memory", "memory lookup timed out")
+        raise OutOfTime("Memory lookup timed out: answer without the user's memories")
     print(f"Memories: {memories}")
-    return memories
\ No newline at end of file
+    return memories
+
+
+# OutOfTime becomes an error result the agent can read
+get_from_memory.handle_tool_error = True
+
+
+def format_memories(memories) -> str:
+    """Render a Mem0 search result as a compact bullet list."""
+    if isinstance(memories, dict):
+        memories = memories.get("results", [])
+    lines = [f"- {m['memory']}" for m in memories or [] if m.get("memory")]
+    return "\n".join(lines)
+
+
+async def search_memories(query: str, user_id) -> str:
+    """Search a user's memories directly, without an agent in the loop."""
+    memories = await client.search(query, user_id=user_id)
+    return format_memories(memories)
@@ -1,12 +1,29 @@
 import os
+import time
+import asyncio
+from pathlib import Path
 from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import OpenAIEmbeddings
 from pinecone import Pinecone
 from langchain_pinecone import PineconeVectorStore
+from ai.tools.compression import compress_passages
+from ai.tools.bm25_index import BM25Index
+from ai.deadline import OutOfTime, get_budget, within_budget
 
 INDEX_NAME = os.environ.get("PINECONE_INDEX_NAME") or None
 EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL") or None
 PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY") or None
+# Searches started within this window share one embedding request
+PINECONE_BATCH_WINDOW_MS = float(os.environ.get("PINECONE_BATCH_WINDOW_MS", "5"))
+# Approximate tokens of retrieved text passed to the agent; 0 disables compression
+PINECONE_TOKEN_BUDGET = int(os.environ.get("PINECONE_TOKEN_BUDGET", "1000"))
+# Local lexical index fused with the vector search; empty or missing means vector only
+BM25_INDEX_PATH = os.environ.get("BM25_INDEX_PATH") or str(Path(__file__).resolve().parents[2] / "data" / "bm25_index.sqlite")
+# Candidates taken from each retriever before fusion
+HYBRID_CANDIDATES = int(os.environ.get("HYBRID_CANDIDATES", "20"))
+# Pinecone hosted reranker applied to the fused candidates, e.g. bge-reranker-v2-m3
+PINECONE_RERANK_MODEL = os.environ.get("PINECONE_RERANK_MODEL") or None
 
 if not INDEX_NAME:
     raise NotImplementedError("PINECONE_INDEX_NAME, EMBEDDING_MODEL, or PINECONE_API_KEY is not set")
@@ -24,13 +41,155 @@ vectorstore = PineconeVectorStore(
     pinecone_api_key=PINECONE_API_KEY,
 )
 
-vectorstore_retriever = vectorstore.as_retriever(search_type="similarity")
+
+class QueryBatcher:
+    """Coalesce concurrent searches into one embedding request.
+
+    Queries that arrive within `window` seconds of each other (e.g. the tool
+    calls of one agent step, which run concurrently) are embedded with a single
+    `aembed_documents` call; the vector queries then run in parallel.
+    """
+
+    def __init__(self, store, window: float):
+        self.store = store
+        self.window = window
+        self._pending = []
+        self._flush_task = None
+
+    async def search(self, query: str, k: int):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((query, k, future))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        return await future
+
+    async def _flush(self):
+        await asyncio.sleep(self.window)
+        batch, self._pending, self._flush_task = self._pending, [], None
+        queries = list(dict.fromkeys(query for query, _, _ in batch))
+        try:
+            vectors = dict(zip(queries, await self.store.embeddings.aembed_documents(queries)))
+            results = await asyncio.gather(
+                *(self.store.asimilarity_search_by_vector(vectors[query], k=k) for query, k, _ in batch),
+                return_exceptions=True,
+            )
+        except Exception as e:
+            results = [e] * len(batch)
+        if len(batch) > 1:
+            print(f"Pinecone batch: {len(batch)} searches, {len(queries)} embedded in one request")
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+query_batcher = QueryBatcher(vectorstore, window=PINECONE_BATCH_WINDOW_MS / 1000)
+
+# Opened on the first search; postings are read from disk, not held per worker
+bm25_index = BM25Index(BM25_INDEX_PATH)
+
+_pinecone_client = None
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> list:
+    """Merge ranked document lists, scoring each document sum(1 / (k + rank))."""
+    scores = {}
+    docs = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = doc.id or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+async def rerank(query: str, docs: list, top_n: int) -> list:
+    """Reorder documents with Pinecone's hosted reranker."""
+    global _pinecone_client
+    if _pinecone_client is None:
+        _pinecone_client = Pinecone(api_key=PINECONE_API_KEY)
+    result = await asyncio.to_thread(
+        _pinecone_client.inference.rerank,
+        model=PINECONE_RERANK_MODEL,
+        query=query,
+        documents=[doc.page_content for doc in docs],
+        top_n=top_n,
+        return_documents=False,
+    )
+    return [docs[row.index] for row in result.data]
+
+
+async def with_text(docs: list) -> list:
+    """Fill in the text of lexical hits from Pinecone, which stores each chunk under the same id.
+
+    Hits that are no longer in Pinecone are dropped.
+    """
+    missing = [doc.id for doc in docs if not doc.page_content]
+    if not missing:
+        return docs
+    response = await asyncio.to_thread(
+        vectorstore.index.fetch, ids=missing, namespace=getattr(vectorstore, "_namespace", None)
+    )
+    text_key = getattr(vectorstore, "_text_key", "text")
+    texts = {doc_id: (vector.metadata or {}).get(text_key, "") for doc_id, vector in response.vectors.items()}
+    docs = [doc if doc.page_content else doc.model_copy(update={"page_content": texts.get(doc.id, "")}) for doc in docs]
+    return [doc for doc in docs if doc.page_content]
+
+
+async def hybrid_search(query: str, k: int) -> list:
+    """Vector search fused with BM25 over the local index, optionally reranked.
+
+    Exact terms (drug and product names, ages) that embeddings blur are caught
+    by the lexical side. Falls back to vector search alone while the local
+    index is empty.
+    """
+    if not len(bm25_index):
+        return await query_batcher.search(query, k)
+
+    start = time.perf_counter()
+    vector, lexical = await asyncio.gather(
+        query_batcher.search(query, HYBRID_CANDIDATES),
+        # The postings scan is blocking; keep it off the event loop
+        asyncio.to_thread(bm25_index.search, query, HYBRID_CANDIDATES),
+    )
+    fused = reciprocal_rank_fusion([vector, lexical])
+    if PINECONE_RERANK_MODEL and len(fused) > 1:
+        fused = await with_text(fused[:HYBRID_CANDIDATES])
+        try:
+            fused = await rerank(query, fused, k)
+        except Exception as e:
+            print(f"Rerank failed, keeping fused order: {e}")
+    else:
+        fused = await with_text(fused[:k])
+    print(f"Hybrid search: {len(fused)} fused candidates in {(time.perf_counter() - start) * 1000:.0f}ms")
+    return fused[:k]
+
+
+def format_docs(docs: list, query: str, budget_tokens: int = PINECONE_TOKEN_BUDGET) -> str:
+    """Join retrieved chunks, keeping the passages most relevant to the query."""
+    kept = compress_passages(query, [doc.page_content for doc in docs], budget_tokens)
+    return "\n\n".join(" ".join(passages) for passages in kept if passages)
+
 
 @tool
-def search_pinecone(query: str, k: int = 5) -> str:
+async def search_pinecone(query: str, config: RunnableConfig, k: int = 5) -> str:
     """Search the Pinecone index for the most relevant documents."""
+    budget = get_budget(config)
+    if budget is not None and not budget.allows("research"):
+        budget.degrade("research", "Pinecone search skipped")
+        raise OutOfTime("Book search skipped: out of time for research, answer from what you already know")
     try:
-        docs = vectorstore_retriever.invoke(query, search_kwargs={"k": k})
-        return "\n\n".join(doc.page_content for doc in docs) if docs else "No books found"
+        docs = await within_budget(budget, hybrid_search(query, k))
+        return format_docs(docs, query) if docs else "No books found"
+    except OutOfTime:
+        budget.degrade("research", "Pinecone search timed out")
+        raise OutOfTime("Book search timed out: answer from what you already know")
     except Exception as e:
         return f"Retrieval Error: {str(e)}"
+
+
+# OutOfTime becomes an error result the agent can read
+search_pinecone.handle_tool_error = True
@@ -2,31 +2,61 @@ import os
 from langchain_tavily import TavilySearch
 from langchain_core.tools import tool
 from langchain_core.runnables import RunnableConfig
+from ai.tools.compression import compress_passages, estimate_tokens
+from ai.deadline import OutOfTime, get_budget, within_budget
 
 TAVILY_API_KEY = os.environ.get("TAVILY_API_KEY") or None
 
 if not TAVILY_API_KEY:
     raise NotImplementedError("TAVILY_API_KEY is not set")
 
+# Approximate tokens of search results passed to the agent; 0 disables compression
+WEB_SEARCH_TOKEN_BUDGET = int(os.environ.get("WEB_SEARCH_TOKEN_BUDGET", "1200"))
+
 tavily_search = TavilySearch(api_key=TAVILY_API_KEY)
 
+
+def format_results(results: list, query: str, budget_tokens: int = WEB_SEARCH_TOKEN_BUDGET) -> str:
+    """Render Tavily results, keeping the passages most relevant to the query.
+
+    Results without content keep their title and URL; results whose passages
+    were all dropped by the budget are left out.
+    """
+    headers = [f"Title: {item.get('title', 'No title')}\nURL: {item.get('url', '')}" for item in results]
+    kept = compress_passages(
+        query,
+        [item.get("content") or "" for item in results],
+        budget_tokens,
+        header_tokens=[estimate_tokens(header) for header in headers],
+    )
+    formatted_results = [
+        f"{header}\nContent: {' ... '.join(passages) if passages else 'No content'}\n"
+        for item, header, passages in zip(results, headers, kept)
+        if passages or not (item.get("content") or "").strip()
+    ]
+    return "\n\n".join(formatted_results) if formatted_results else "No results found"
+
+
 @tool
-def web_search(query: str, config: RunnableConfig) -> str:
+async def web_search(query: str, config: RunnableConfig) -> str:
     """Search the web for the most relevant information."""
+    budget = get_budget(config)
+    if budget is not None and not budget.allows("research"):
+        budget.degrade("research", "web search skipped")
+        raise OutOfTime("Web search skipped: out of time for research, answer from what you already know")
     try:
-        print(f"Web Search Config: {config}")
-        response = tavily_search.invoke({"query": query})
+        response = await within_budget(budget, tavily_search.ainvoke({"query": query}))
 
         if isinstance(response, dict) and "results" in response:
-            formatted_results = []
-            for item in response['results']:
-                title = item.get('title', 'No title')
-                url = item.get('url', '')
-                content = item.get('content', 'No content')
-                formatted_results.append(f"Title: {title}\nContent: {content}\nURL: {url}\n")
-
-            return "\n\n".join(formatted_results) if formatted_results else "No results found"
+            return format_results(response["results"], query)
         else:
             return str(response)
+    except OutOfTime:
+        budget.degrade("research", "web search timed out")
+        raise OutOfTime("Web search timed out: answer from what you already know")
     except Exception as e:
-        return f"Web Error: {str(e)}"
\ No newline at end of file
+        return f"Web Error: {str(e)}"
+
+
+# OutOfTime becomes an error result the agent can read
+web_search.handle_tool_error = True
@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+from ai.agents import config
+from ai.llms import get_llm
+
+
+async def prime_llms():
+    """Open a connection to every configured LLM provider.
+
+    Listing models costs no tokens but still pays for DNS, TCP and TLS, so the
+    shared HTTP pools used by the agents are hot before the first chat turn.
+    """
+    seen = set()
+    calls = []
+    for agent_config in config["llm_models"].values():
+        # Fallback providers are primed too, so failing over doesn't start cold
+        for model_config in [agent_config, *agent_config.get("fallbacks", [])]:
+            key = (model_config["provider"], model_config["model"])
+            if key in seen:
+                continue
+            seen.add(key)
+            llm = get_llm(
+                provider=model_config["provider"],
+                model_name=model_config["model"],
+                timeout=model_config.get("timeout"),
+                max_retries=model_config.get("max_retries"),
+                prompt_caching=model_config.get("prompt_caching", True),
+            )
+            if model_config["provider"] == "openai":
+                calls.append(llm.root_async_client.models.list())
+            elif model_config["provider"] == "anthropic":
+                calls.append(llm._async_client.models.list(limit=1))
+    await asyncio.gather(*calls)
+
+
+async def prime_memory():
+    """Prime the Mem0 async HTTP client with its ping endpoint."""
+    from ai.tools.memory import client
+
+    response = await client.async_client.get("/v1/ping/")
+    response.raise_for_status()
+
+
+async def prime_pinecone():
+    """Prime the Pinecone index connection used by `search_pinecone`."""
+    from ai.tools.pinecone import vectorstore
+
+    await asyncio.to_thread(vectorstore.index.describe_index_stats)
+
+
+async def _timed(name: str, awaitable) -> dict:
+    start = time.perf_counter()
+    try:
+        await awaitable
+        result = {"ok": True}
+    except Exception as e:
+        # Only logged: the report is served by the public `/ready`, and errors can
+        # carry connection strings or provider responses
+        result = {"ok": False}
+        print(f"Warmup {name} failed: {type(e).__name__}: {e}")
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    print(f"Warmup {name}: {result}")
+    return result
+
+
+async def warmup(**initializers) -> dict:
+    """Run the given initializers and the connection primers concurrently.
+
+    Args:
+        initializers: Named awaitables that must succeed for the worker to be
+            considered ready (e.g. building the agent and the checkpointer).
+
+    Returns:
+        A report keyed by step name with `ok` and `seconds`; errors are only
+        logged. Primer failures are reported but never fail the warmup on their own.
+    """
+    steps = {
+        **initializers,
+        "llms": prime_llms(),
+        "memory": prime_memory(),
+        "pinecone": prime_pinecone(),
+    }
+    start = time.perf_counter()
+    results = await asyncio.gather(*(_timed(name, step) for name, step in steps.items()))
+    report = dict(zip(steps.keys(), results))
+    report["ready"] = all(report[name]["ok"] for name in initializers)
+    print(f"Warmup finished in {time.perf_counter() - start:.2f}s, ready={report['ready']}")
+    return report
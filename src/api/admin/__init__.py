@@ -0,0 +1,8 @@
+import os
+
+# Comma-separated usernames allowed to use the admin endpoints
+ADMIN_USERNAMES = {name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()}
+
+
+def is_admin(user) -> bool:
+    return user is not None and user.username in ADMIN_USERNAMES
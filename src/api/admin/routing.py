@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from sqlmodel import Session
+
+from ai import metrics
+from ai.callbacks import prompt_cache_stats
+from ai.checkpoint_cache import CachedCheckpointer
+from ai.memory_checkpointer import BoundedMemorySaver
+from api.admin import is_admin
+from api.auth.routing import get_current_user
+from api.chat.routing import agent_runner, chat_service
+from api.db import get_session
+from api.models import UsageRollup, User
+from api.profiling import PROFILE_SLOW_TURN_SECONDS, get_slow_turn, recent_slow_turns
+from api.usage import usage_ledger, usage_rollups, utc_today
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    if not is_admin(current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
+
+# LLM usage per user and day
+@router.get("/usage", response_model=List[UsageRollup])
+async def get_usage(
+    start: Optional[date] = Query(None, description="First day (UTC), default 6 days before `end`"),
+    end: Optional[date] = Query(None, description="Last day (UTC), default today"),
+    user_id: Optional[int] = None,
+    by: Optional[str] = Query(None, pattern="^(agent|model)$", description="Also split rows by agent or model"),
+    limit: int = Query(500, ge=1, le=5000),
+    session: Session = Depends(get_session),
+    admin: User = Depends(require_admin)
+):
+    end = end or utc_today()
+    start = start or end - timedelta(days=6)
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="`start` is after `end`")
+    # Include this worker's calls that haven't been written yet
+    await usage_ledger.flush()
+    return usage_rollups(session, start, end, user_id=user_id, by=by, limit=limit)
+
+
+# Counters for this worker process since it started
+@router.get("/metrics")
+async def get_metrics(admin: User = Depends(require_admin)):
+    await chat_service._ensure_initialized()
+    checkpointer = chat_service.checkpointer
+    return {
+        "agent": metrics.metrics(),
+        "agent_runs": {**agent_runner.stats, "waiting": agent_runner.waiting, "busy": agent_runner.busy},
+        "usage_ledger": usage_ledger.stats,
+        "prompt_cache": prompt_cache_stats(),
+        "checkpoint_cache": (
+            {**checkpointer.stats, "bytes": checkpointer.bytes, "max_bytes": checkpointer.max_bytes}
+            if isinstance(checkpointer, CachedCheckpointer) else None
+        ),
+        "memory_checkpointer": checkpointer.usage() if isinstance(checkpointer, BoundedMemorySaver) else None,
+    }
+
+
+# Slow and profiled turns kept by this worker, newest first
+@router.get("/slow_turns")
+async def list_slow_turns(
+    limit: int = Query(20, ge=1, le=500),
+    admin: User = Depends(require_admin)
+):
+    return {"threshold_seconds": PROFILE_SLOW_TURN_SECONDS, "turns": recent_slow_turns(limit)}
+
+
+# One turn with its timeline; `format=cpu` returns its CPU profile as text
+@router.get("/slow_turns/{turn_id}")
+async def read_slow_turn(
+    turn_id: str,
+    format: str = Query("json", pattern="^(json|cpu)$"),
+    admin: User = Depends(require_admin)
+):
+    turn = get_slow_turn(turn_id)
+    if turn is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Turn not found on this worker")
+    if format == "cpu":
+        if turn["cpu_profile"] is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="This turn has no CPU profile")
+        return PlainTextResponse(turn["cpu_profile"])
+    return turn
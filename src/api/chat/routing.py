@@ -1,19 +1,64 @@
-from fastapi import APIRouter, Depends, Path, HTTPException, status
+import asyncio
+import os
+from fastapi import APIRouter, Depends, Path, HTTPException, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
 from sqlmodel import Session, select
-from typing import List
+from typing import List, Optional
 from api.db import get_session
 from api.models import (
     Chat,
     User,
     MessagePayload,
-    ChatHistory
+    ChatHistory,
+    ChatSearchResults,
+    AgentRun,
+    AgentRunStatus
 )
 from api.auth.routing import get_current_user
 from ai.schemas import AIResponse
 from api.chat.service import ChatService
+from api.chat.search import CHAT_SEARCH_SEMANTIC, search_messages, semantic_search
+from api.chat.transfer import TransferError, export_chats, import_chats
+from api.chat.runs import PRIORITIES, AgentRunner, QueueFull, run_status
+from api.usage import QuotaExceeded, usage_ledger
+from api.responses import etag_matches, json_response, not_modified
+from api.profiling import TurnProfile, profiled_turn, requested_profile
 
 router = APIRouter(prefix="/api/chats", tags=["chats"])
 chat_service = ChatService()
+agent_runner = AgentRunner(chat_service)
+
+CHAT_COLUMNS = [getattr(Chat, name) for name in Chat.model_fields]
+
+# Seconds between checks that the client of a running turn is still connected
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5"))
+# Logged for turns whose client went away (nginx's convention; the client never sees it)
+CLIENT_CLOSED_REQUEST = 499
+
+
+class ClientDisconnected(Exception):
+    """The client closed the connection before the response was ready."""
+
+
+async def cancel_on_disconnect(request: Request, coro):
+    """Await `coro`, cancelling it if the client disconnects first.
+
+    Cancellation reaches the graph, its tool calls and their HTTP requests;
+    `ChatService.send_message` then cleans up the thread before this raises.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
 
 # Health check
 @router.get("/health")
@@ -23,11 +68,15 @@ async def health_check():
 # 1. List chats
 @router.get("/list_chats", response_model=List[Chat])
 async def list_chats(
+    request: Request,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    chats = session.exec(select(Chat).where(Chat.user_id == current_user.id, Chat.is_deleted == False)).all()
-    return chats
+    # Select plain columns: rows go straight to JSON without building Chat objects
+    rows = session.exec(
+        select(*CHAT_COLUMNS).where(Chat.user_id == current_user.id, Chat.is_deleted == False)
+    ).all()
+    return await json_response(request, [row._asdict() for row in rows])
 
 # 2. Create chat
 @router.post("/create_chat", response_model=Chat)
@@ -42,6 +91,7 @@ async def create_chat(
 @router.get("/get_chat_messages", response_model=ChatHistory)
 async def get_chat_messages(
     chat_id: int,
+    request: Request,
     session: Session = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
@@ -49,23 +99,166 @@ async def get_chat_messages(
     if not chat or chat.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this chat")
     
-    messages = await chat_service.get_chat_messages(session, chat, current_user)
-    return messages
+    # Unchanged since the client's copy (same checkpoint and title): skip the download
+    checkpoint_tuple = await chat_service.get_latest_checkpoint(chat, current_user)
+    etag = chat_service.history_etag(chat, checkpoint_tuple)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return await json_response(request, chat_service.chat_history(chat, checkpoint_tuple), etag=etag)
 
 # 4. Send message and 5. Get message from AI model
 @router.post("/send_message", response_model=AIResponse)
 async def send_message(
     chat_id: int,
     payload: MessagePayload,
+    request: Request,
+    response: Response,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    profile: Optional[TurnProfile] = Depends(requested_profile)
 ):
     chat = session.get(Chat, chat_id)
     if not chat or chat.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this chat")
+    if chat_service.draining:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is shutting down, please retry",
+            headers={"Retry-After": "1"},
+        )
     
-    result = await chat_service.send_message(session, chat, payload.content, current_user)
-    return AIResponse(content=result["content"])
+    try:
+        with profiled_turn(profile, source="send_message", chat_id=chat.id, user_id=current_user.id) as turn:
+            result = await cancel_on_disconnect(
+                request, chat_service.send_message(session, chat, payload.content, current_user)
+            )
+            turn["degraded"] = result.get("degraded", [])
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except QuotaExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    if profile is not None and profile.forced:
+        # Read it back from GET /api/admin/slow_turns/{id}
+        response.headers["X-Profile-Id"] = profile.id
+    return AIResponse(content=result["content"], degraded=result.get("degraded", []))
+
+# Submit a message as a background run; returns at once with the run id
+@router.post("/runs", response_model=AgentRunStatus, status_code=status.HTTP_202_ACCEPTED)
+async def submit_run(
+    chat_id: int,
+    payload: MessagePayload,
+    priority: str = Query("normal", pattern="^(normal|low)$"),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    chat = session.get(Chat, chat_id)
+    if not chat or chat.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this chat")
+    if chat_service.draining:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is shutting down, please retry",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        usage_ledger.check_quota(session, current_user.id)
+        run = agent_runner.submit(session, chat, current_user, payload.content, PRIORITIES[priority])
+    except QuotaExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except QueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many messages are waiting, please retry",
+            headers={"Retry-After": "5"},
+        )
+    return run_status(run)
+
+def get_user_run(session: Session, run_id: str, user: User) -> AgentRun:
+    run = session.get(AgentRun, run_id)
+    if not run or run.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+    return run
+
+# Poll a run; with `wait`, hold the request until it finishes or `wait` seconds pass
+@router.get("/runs/{run_id}", response_model=AgentRunStatus)
+async def get_run(
+    run_id: str,
+    wait: float = Query(0, ge=0, le=30),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    run = get_user_run(session, run_id, current_user)
+    if wait:
+        # Give the connection back to the pool for the wait
+        session.close()
+        run = await agent_runner.wait(run, wait)
+    return run_status(run)
+
+# Subscribe to a run's status changes as server-sent events
+@router.get("/runs/{run_id}/events")
+async def run_events(
+    run_id: str,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    get_user_run(session, run_id, current_user)
+    # The dependency would otherwise hold the connection until the stream ends
+    session.close()
+    return StreamingResponse(
+        agent_runner.events(run_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Search messages across the user's chats
+@router.get("/search", response_model=ChatSearchResults)
+async def search_chats(
+    q: str = Query(..., min_length=1, max_length=200, description="Words or phrases to find"),
+    mode: str = Query("text", pattern="^(text|semantic)$"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    if mode == "semantic" and not CHAT_SEARCH_SEMANTIC:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Semantic search is not enabled")
+    # Fetch one extra row to know whether there is another page
+    if mode == "semantic":
+        hits = await semantic_search(session, current_user, q, limit + 1, offset)
+    else:
+        hits = search_messages(session, current_user, q, limit + 1, offset)
+    return ChatSearchResults(query=q, mode=mode, results=hits[:limit], offset=offset, has_more=len(hits) > limit)
+
+# Export all of the user's chats as NDJSON
+@router.get("/export")
+async def export_user_chats(current_user: User = Depends(get_current_user)):
+    await chat_service._ensure_initialized()
+    return StreamingResponse(
+        export_chats(current_user.id, chat_service.checkpointer),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="chats-{current_user.id}.ndjson"'},
+    )
+
+# Import chats from an NDJSON export (streamed request body)
+@router.post("/import")
+async def import_user_chats(
+    request: Request,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    await chat_service._ensure_initialized()
+    try:
+        return await import_chats(session, current_user, chat_service.agent, request.stream())
+    except TransferError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 # Edit title of chat
 @router.put("/edit_chat_title", status_code=status.HTTP_200_OK)
@@ -0,0 +1,391 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import func, text
+from sqlmodel import Session, select
+
+from api.models import AgentRun, AgentRunStatus, Chat, User, get_utc_now
+from api.profiling import profiled_turn, sampled
+from api.usage import QuotaExceeded
+
+# Agent runs executed concurrently by each app worker
+AGENT_RUN_WORKERS = int(os.getenv("AGENT_RUN_WORKERS", "4"))
+# `local`: runs execute in the worker that accepted them. `postgres`: every worker
+# claims runs from the agentrun table (FOR UPDATE SKIP LOCKED), so any worker can
+# pick up a run and runs survive a restart
+AGENT_RUN_QUEUE = os.getenv("AGENT_RUN_QUEUE", "local").lower()
+# Submissions are refused (503) once this many runs are waiting
+AGENT_RUN_QUEUE_MAX = int(os.getenv("AGENT_RUN_QUEUE_MAX", "1000"))
+# How often idle workers look for runs in the table, and waiting clients re-read their run
+AGENT_RUN_POLL_SECONDS = float(os.getenv("AGENT_RUN_POLL_SECONDS", "1"))
+# A run still `running` after this long is assumed lost with its worker and retried (postgres mode)
+AGENT_RUN_STALE_SECONDS = int(os.getenv("AGENT_RUN_STALE_SECONDS", "900"))
+AGENT_RUN_MAX_ATTEMPTS = 3
+
+PRIORITIES = {"normal": 10, "low": 0}
+FINISHED = ("done", "failed")
+RUN_ERROR = "Sorry, I encountered an error processing your message."
+RESTART_ERROR = "The server restarted before this message was answered, please send it again"
+
+# Highest priority first; within a priority, users with the fewest runs in
+# progress first, then oldest. Only the oldest queued run of a chat is
+# eligible, and not while another run of that chat is in progress, so a
+# chat's turns run one at a time and in order.
+CLAIM_SQL = text("""
+UPDATE agentrun
+SET status = 'running', started_at = now(), worker = :worker, attempts = attempts + 1
+WHERE id = (
+    SELECT r.id FROM agentrun r
+    WHERE r.attempts < :max_attempts
+      AND (r.status = 'queued'
+           OR (r.status = 'running' AND r.started_at < now() - make_interval(secs => :stale_seconds)))
+      AND NOT EXISTS (
+          SELECT 1 FROM agentrun o
+          WHERE o.chat_id = r.chat_id AND o.id <> r.id
+            AND ((o.status = 'queued' AND o.created_at < r.created_at)
+                 OR (o.status = 'running' AND o.started_at >= now() - make_interval(secs => :stale_seconds))))
+    ORDER BY r.priority DESC,
+             (SELECT count(*) FROM agentrun a WHERE a.user_id = r.user_id AND a.status = 'running'),
+             r.created_at
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING id
+""")
+
+FAIL_ABANDONED_SQL = text("""
+UPDATE agentrun
+SET status = 'failed', error = :error, finished_at = now()
+WHERE status = 'running' AND attempts >= :max_attempts
+  AND started_at < now() - make_interval(secs => :stale_seconds)
+""")
+
+
+class QueueFull(Exception):
+    """Too many runs are waiting to accept another one."""
+
+
+class FairQueue:
+    """Run ids by priority, then round-robin across users within a priority.
+
+    A user who submits many runs gets one turn per round instead of delaying
+    everyone queued behind them.
+    """
+
+    def __init__(self):
+        self._levels = {}  # priority -> OrderedDict[user_id, deque[run_id]]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, priority: int, user_id: int, run_id: str):
+        self._levels.setdefault(priority, OrderedDict()).setdefault(user_id, deque()).append(run_id)
+        self._size += 1
+
+    def pop(self) -> Optional[str]:
+        for priority in sorted(self._levels, reverse=True):
+            users = self._levels[priority]
+            if not users:
+                continue
+            user_id, runs = next(iter(users.items()))
+            run_id = runs.popleft()
+            if runs:
+                users.move_to_end(user_id)
+            else:
+                del users[user_id]
+            self._size -= 1
+            return run_id
+        return None
+
+    def drain(self) -> list:
+        """Remove and return every queued run id."""
+        run_ids = [run_id for users in self._levels.values() for runs in users.values() for run_id in runs]
+        self._levels.clear()
+        self._size = 0
+        return run_ids
+
+
+def run_status(run: AgentRun) -> AgentRunStatus:
+    return AgentRunStatus(
+        run_id=run.id,
+        chat_id=run.chat_id,
+        status=run.status,
+        content=run.result,
+        error=run.error,
+        created_at=run.created_at,
+        finished_at=run.finished_at,
+    )
+
+
+class AgentRunner:
+    """A bounded pool of asyncio workers executing submitted messages.
+
+    Runs are stored in the agentrun table when submitted and updated with the
+    reply when they finish, so clients can poll, long-poll or subscribe from
+    any connection (or any app worker) without re-running the agent.
+    """
+
+    def __init__(self, chat_service, workers: int = AGENT_RUN_WORKERS, mode: str = AGENT_RUN_QUEUE, engine=None):
+        if mode not in ("local", "postgres"):
+            raise ValueError(f"Unknown agent run queue: {mode}")
+        self.chat_service = chat_service
+        self.workers = workers
+        self.mode = mode
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._engine = engine
+        self._queue = FairQueue()
+        self._wake = asyncio.Event()
+        self._finished = {}  # run_id -> (Event, waiters), for clients waiting in this process
+        self._chat_locks = {}  # chat_id -> (Lock, holders)
+        self._tasks = []
+        self._stopping = False
+        self.busy = 0
+        self.stats = {"submitted": 0, "done": 0, "failed": 0}
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from api.db import engine
+
+            self._engine = engine
+        return self._engine
+
+    @property
+    def waiting(self) -> int:
+        """Runs queued in this process (local mode)."""
+        return len(self._queue)
+
+    # Submitting and waiting
+
+    def queued(self, session: Session) -> int:
+        if self.mode == "local":
+            return len(self._queue)
+        return session.exec(select(func.count()).select_from(AgentRun).where(AgentRun.status == "queued")).one()
+
+    def submit(self, session: Session, chat: Chat, user: User, content: str, priority: int) -> AgentRun:
+        """Store a run for `content` and queue it; returns immediately."""
+        if self.queued(session) >= AGENT_RUN_QUEUE_MAX:
+            raise QueueFull(f"{AGENT_RUN_QUEUE_MAX} runs are already waiting")
+        run = AgentRun(id=uuid.uuid4().hex, chat_id=chat.id, user_id=user.id, content=content, priority=priority)
+        session.add(run)
+        session.commit()
+        session.refresh(run)
+        if self.mode == "local":
+            self._queue.push(priority, user.id, run.id)
+        self.stats["submitted"] += 1
+        self._wake.set()
+        return run
+
+    async def wait(self, run: AgentRun, timeout: float) -> AgentRun:
+        """Wait up to `timeout` seconds for the run to finish, then return it re-read.
+
+        Each poll reads the run in a session of its own, so no connection is held
+        in between; close the caller's session before waiting for the same reason.
+        """
+        deadline = time.monotonic() + timeout
+        # Finished here: woken at once. Finished by another worker: seen on the next poll
+        with self._waiting_for(run.id) as finished:
+            while run.status not in FINISHED:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(finished.wait(), timeout=min(remaining, AGENT_RUN_POLL_SECONDS))
+                except asyncio.TimeoutError:
+                    pass
+                run = await asyncio.to_thread(self._read, run.id)
+        return run
+
+    def _read(self, run_id: str) -> AgentRun:
+        with Session(self.engine) as session:
+            return session.get(AgentRun, run_id)
+
+    @contextmanager
+    def _waiting_for(self, run_id: str):
+        """The event `_finish` sets for the run; dropped when its last waiter leaves, however the run ended."""
+        finished, waiters = self._finished.get(run_id, (None, 0))
+        finished = finished or asyncio.Event()
+        self._finished[run_id] = (finished, waiters + 1)
+        try:
+            yield finished
+        finally:
+            # Already popped if the run finished in this process
+            entry = self._finished.get(run_id)
+            if entry is not None and entry[0] is finished:
+                if entry[1] == 1:
+                    del self._finished[run_id]
+                else:
+                    self._finished[run_id] = (finished, entry[1] - 1)
+
+    async def events(self, run_id: str, heartbeat: float = 15) -> AsyncIterator[str]:
+        """Server-sent events: the run's status whenever it changes, ending once it finishes."""
+        run = await asyncio.to_thread(self._read, run_id)
+        last_status, last_sent = None, time.monotonic()
+        while True:
+            if run.status != last_status:
+                last_status, last_sent = run.status, time.monotonic()
+                yield f"event: {run.status}\ndata: {run_status(run).model_dump_json()}\n\n"
+                if run.status in FINISHED:
+                    return
+            elif time.monotonic() - last_sent >= heartbeat:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            run = await self.wait(run, timeout=heartbeat)
+
+    # Workers
+
+    def start(self):
+        if self._tasks:
+            return
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        print(f"Agent runner: {self.workers} worker(s), {self.mode} queue")
+
+    async def stop(self):
+        """Stop claiming runs. Runs queued in this process are failed, as nothing will pick them up."""
+        self._stopping = True
+        self._wake.set()
+        if self.mode == "local":
+            abandoned = self._queue.drain()
+            for run_id in abandoned:
+                await self._finish(run_id, "failed", error=RESTART_ERROR)
+            if abandoned:
+                print(f"Agent runner: failed {len(abandoned)} queued run(s) on shutdown")
+
+    async def close(self):
+        """Cancel the workers; call after `stop` and after in-flight runs have drained.
+
+        Runs still in progress are failed (local mode) or queued again for
+        another worker (postgres mode), so none is left `running`.
+        """
+        await self.stop()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self):
+        while not self._stopping:
+            try:
+                run_id = await asyncio.to_thread(self._claim) if self.mode == "postgres" else await self._claim_local()
+            except Exception as e:
+                print(f"Agent runner: error claiming a run: {e}")
+                run_id = None
+            if run_id is None:
+                self._wake.clear()
+                try:
+                    # Other workers enqueue into the shared table, so poll it too
+                    await asyncio.wait_for(
+                        self._wake.wait(), timeout=AGENT_RUN_POLL_SECONDS if self.mode == "postgres" else None
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self.busy += 1
+            try:
+                await self._execute(run_id)
+            finally:
+                self.busy -= 1
+
+    async def _claim_local(self) -> Optional[str]:
+        run_id = self._queue.pop()
+        if run_id is None:
+            return None
+        await asyncio.to_thread(self._mark_running, run_id)
+        return run_id
+
+    def _mark_running(self, run_id: str):
+        with Session(self.engine) as session:
+            run = session.get(AgentRun, run_id)
+            run.status, run.started_at, run.worker = "running", get_utc_now(), self.worker_id
+            run.attempts += 1
+            session.add(run)
+            session.commit()
+
+    def _claim(self) -> Optional[str]:
+        params = {"max_attempts": AGENT_RUN_MAX_ATTEMPTS, "stale_seconds": AGENT_RUN_STALE_SECONDS}
+        with Session(self.engine) as session:
+            row = session.execute(CLAIM_SQL, {**params, "worker": self.worker_id}).first()
+            if row is None:
+                session.execute(FAIL_ABANDONED_SQL, {**params, "error": RUN_ERROR})
+            session.commit()
+        return row.id if row else None
+
+    @asynccontextmanager
+    async def _chat_turn(self, chat_id: int):
+        """One run per chat at a time in this process (the postgres claim already ensures it)."""
+        lock, holders = self._chat_locks.get(chat_id, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._chat_locks[chat_id] = (lock, holders + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, holders = self._chat_locks[chat_id]
+            if holders == 1:
+                del self._chat_locks[chat_id]
+            else:
+                self._chat_locks[chat_id] = (lock, holders - 1)
+
+    async def _execute(self, run_id: str):
+        with Session(self.engine) as session:
+            run, chat, user = await asyncio.to_thread(self._load, session, run_id)
+            try:
+                async with self._chat_turn(run.chat_id):
+                    with profiled_turn(sampled(), source="agent_run", run_id=run_id, chat_id=chat.id, user_id=user.id) as turn:
+                        result = await self.chat_service.send_message(session, chat, run.content, user, raise_errors=True)
+                        turn["degraded"] = result.get("degraded", [])
+            except asyncio.CancelledError:
+                # Cancelled by `close` on shutdown
+                await asyncio.to_thread(session.rollback)
+                await self._abandon(run_id)
+                raise
+            except QuotaExceeded as e:
+                await self._finish(run_id, "failed", error=str(e))
+            except Exception as e:
+                await asyncio.to_thread(session.rollback)
+                print(f"Agent run {run_id} failed: {e}")
+                await self._finish(run_id, "failed", error=RUN_ERROR)
+            else:
+                await self._finish(run_id, "done", result=result["content"])
+
+    def _load(self, session: Session, run_id: str):
+        run = session.get(AgentRun, run_id)
+        return run, session.get(Chat, run.chat_id), session.get(User, run.user_id)
+
+    async def _abandon(self, run_id: str):
+        """Leave an interrupted run to another worker (postgres mode) or fail it (local mode)."""
+        if self.mode == "postgres":
+            await asyncio.to_thread(self._requeue, run_id)
+            print(f"Agent run {run_id} interrupted by shutdown, queued again")
+        else:
+            await self._finish(run_id, "failed", error=RESTART_ERROR)
+            print(f"Agent run {run_id} interrupted by shutdown, failed")
+
+    def _requeue(self, run_id: str):
+        with Session(self.engine) as session:
+            run = session.get(AgentRun, run_id)
+            run.status, run.started_at, run.worker = "queued", None, None
+            session.add(run)
+            session.commit()
+
+    async def _finish(self, run_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None):
+        await asyncio.to_thread(self._store_finished, run_id, status, result, error)
+        self.stats[status] += 1
+        entry = self._finished.pop(run_id, None)
+        if entry is not None:
+            entry[0].set()
+
+    def _store_finished(self, run_id: str, status: str, result: Optional[str], error: Optional[str]):
+        with Session(self.engine) as session:
+            run = session.get(AgentRun, run_id)
+            run.status, run.result, run.error, run.finished_at = status, result, error, get_utc_now()
+            session.add(run)
+            session.commit()
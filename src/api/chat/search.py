@@ -0,0 +1,204 @@
+import asyncio
+import os
+import re
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+from api.models import Chat, ChatMessage, ChatSearchHit, User
+
+# Also index messages in a Pinecone namespace for `mode=semantic` searches
+CHAT_SEARCH_SEMANTIC = os.getenv("CHAT_SEARCH_SEMANTIC", "false").lower() == "true"
+CHAT_SEARCH_NAMESPACE = os.getenv("CHAT_SEARCH_NAMESPACE", "chat-messages")
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+HEADLINE_OPTIONS = (
+    f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, "
+    "MaxWords=30, MinWords=12, MaxFragments=2, FragmentDelimiter=\" … \""
+)
+WORD = re.compile(r"\w+")
+
+# Rank inside a CTE so ts_headline only runs for the rows on the returned page
+POSTGRES_SEARCH = text("""
+WITH hits AS (
+    SELECT m.id, m.chat_id, c.title, m.role, m.content, m.created_at, query,
+           ts_rank_cd(m.search_vector, query) AS score
+    FROM chatmessage m
+    JOIN chat c ON c.id = m.chat_id,
+         websearch_to_tsquery('english', :query) query
+    WHERE m.user_id = :user_id AND NOT c.is_deleted AND m.search_vector @@ query
+    ORDER BY score DESC, m.created_at DESC
+    LIMIT :limit OFFSET :offset
+)
+SELECT id, chat_id, title, role, created_at, score,
+       ts_headline('english', content, query, :options) AS snippet
+FROM hits
+ORDER BY score DESC, created_at DESC
+""")
+
+_embedding_tasks = set()
+
+
+def index_messages(session: Session, chat: Chat, messages: List[Tuple[str, str]]) -> List[ChatMessage]:
+    """Store (role, content) pairs of a chat so they can be searched."""
+    rows = [ChatMessage(chat_id=chat.id, user_id=chat.user_id, role=role, content=content) for role, content in messages]
+    session.add_all(rows)
+    session.commit()
+    if CHAT_SEARCH_SEMANTIC:
+        # Embedding runs in the background so the reply isn't held up by it
+        task = asyncio.create_task(_embed_messages(rows))
+        _embedding_tasks.add(task)
+        task.add_done_callback(_embedding_tasks.discard)
+    return rows
+
+
+async def _embed_messages(rows: List[ChatMessage]):
+    from ai.tools.pinecone import vectorstore
+
+    try:
+        await vectorstore.aadd_texts(
+            [row.content for row in rows],
+            metadatas=[{"user_id": row.user_id, "chat_id": row.chat_id, "message_id": row.id} for row in rows],
+            ids=[f"chat-message-{row.id}" for row in rows],
+            namespace=CHAT_SEARCH_NAMESPACE,
+        )
+    except Exception as e:
+        print(f"Error embedding chat messages for search: {e}")
+
+
+def highlight(content: str, query: str, max_words: int = 30) -> str:
+    """A window of `content` around the first query term, with the terms marked."""
+    terms = {term.lower() for term in WORD.findall(query)}
+    words = content.split()
+    first = next((i for i, word in enumerate(words) if any(t in word.lower() for t in terms)), 0)
+    start = max(0, min(first - max_words // 3, len(words) - max_words))
+    window = words[start:start + max_words]
+    marked = [
+        f"{HIGHLIGHT_START}{word}{HIGHLIGHT_STOP}" if any(t in word.lower() for t in terms) else word
+        for word in window
+    ]
+    return ("… " if start > 0 else "") + " ".join(marked) + (" …" if start + max_words < len(words) else "")
+
+
+def _postgres_search(session: Session, user: User, query: str, limit: int, offset: int) -> List[ChatSearchHit]:
+    rows = session.execute(
+        POSTGRES_SEARCH,
+        {"query": query, "user_id": user.id, "limit": limit, "offset": offset, "options": HEADLINE_OPTIONS},
+    ).all()
+    return [
+        ChatSearchHit(
+            chat_id=row.chat_id, chat_title=row.title, message_id=row.id, type=row.role,
+            snippet=row.snippet, score=row.score, created_at=row.created_at,
+        )
+        for row in rows
+    ]
+
+
+def _like_search(session: Session, user: User, query: str, limit: int, offset: int) -> List[ChatSearchHit]:
+    """Every query word must appear in the message; newest messages first."""
+    terms = WORD.findall(query)[:8]
+    if not terms:
+        return []
+    statement = (
+        select(ChatMessage, Chat.title)
+        .join(Chat, Chat.id == ChatMessage.chat_id)
+        .where(ChatMessage.user_id == user.id, Chat.is_deleted == False)  # noqa: E712
+    )
+    for term in terms:
+        escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        statement = statement.where(ChatMessage.content.ilike(f"%{escaped}%", escape="\\"))
+    statement = statement.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc()).limit(limit).offset(offset)
+    return [
+        ChatSearchHit(
+            chat_id=message.chat_id, chat_title=title, message_id=message.id, type=message.role,
+            snippet=highlight(message.content, query),
+            score=float(sum(message.content.lower().count(term.lower()) for term in terms)),
+            created_at=message.created_at,
+        )
+        for message, title in session.exec(statement).all()
+    ]
+
+
+def search_messages(session: Session, user: User, query: str, limit: int, offset: int) -> List[ChatSearchHit]:
+    """Full-text search over a user's messages in chats that aren't deleted."""
+    if session.get_bind().dialect.name == "postgresql":
+        return _postgres_search(session, user, query, limit, offset)
+    return _like_search(session, user, query, limit, offset)
+
+
+async def semantic_search(session: Session, user: User, query: str, limit: int, offset: int) -> List[ChatSearchHit]:
+    """Messages closest in meaning to `query`, from the Pinecone chat namespace."""
+    from ai.tools.pinecone import vectorstore
+
+    matches = await vectorstore.asimilarity_search_with_score(
+        query, k=offset + limit, filter={"user_id": user.id}, namespace=CHAT_SEARCH_NAMESPACE
+    )
+    scores = {int(doc.metadata["message_id"]): score for doc, score in matches[offset:]}
+    if not scores:
+        return []
+    rows = session.exec(
+        select(ChatMessage, Chat.title)
+        .join(Chat, Chat.id == ChatMessage.chat_id)
+        .where(ChatMessage.id.in_(scores), ChatMessage.user_id == user.id, Chat.is_deleted == False)  # noqa: E712
+    ).all()
+    hits = [
+        ChatSearchHit(
+            chat_id=message.chat_id, chat_title=title, message_id=message.id, type=message.role,
+            snippet=highlight(message.content, query), score=scores[message.id], created_at=message.created_at,
+        )
+        for message, title in rows
+    ]
+    return sorted(hits, key=lambda hit: hit.score, reverse=True)
+
+
+def searchable_messages(messages: list) -> List[Tuple[str, str]]:
+    """(role, content) of the messages the user saw: theirs and the final answers, not agent handoffs."""
+    return [
+        ("user" if message.type == "human" else "ai", message.content)
+        for message in messages
+        if message.type in ("human", "ai") and isinstance(message.content, str) and message.content
+        and not getattr(message, "tool_calls", None)
+    ]
+
+
+async def backfill(session: Session, checkpointer) -> int:
+    """Index chats that predate the search index, from their latest checkpoint.
+
+    Returns:
+        The number of messages indexed.
+    """
+    indexed = set(session.exec(select(ChatMessage.chat_id).distinct()).all())
+    count = 0
+    for chat in session.exec(select(Chat).where(Chat.is_deleted == False)).all():  # noqa: E712
+        if chat.id in indexed:
+            continue
+        checkpoint_tuple = await checkpointer.aget_tuple({"configurable": {"thread_id": chat.thread_id}})
+        messages = checkpoint_tuple.checkpoint.get("channel_values", {}).get("messages", []) if checkpoint_tuple else []
+        rows = [
+            ChatMessage(chat_id=chat.id, user_id=chat.user_id, role=role, content=content, created_at=chat.updated_at)
+            for role, content in searchable_messages(messages)
+        ]
+        session.add_all(rows)
+        session.commit()
+        count += len(rows)
+    return count
+
+
+async def _main():
+    from ai.checkpointer import close_checkpointer, get_checkpointer
+    from api.db import engine, init_db
+
+    init_db()
+    with Session(engine) as session:
+        count = await backfill(session, await get_checkpointer())
+    await close_checkpointer()
+    print(f"Indexed {count} messages from existing chats")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path=".env", override=True)
+    asyncio.run(_main())
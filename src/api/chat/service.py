@@ -1,12 +1,23 @@
+import asyncio
 import uuid
+import zlib
 from typing import List, Optional
 from sqlmodel import Session, select
 from api.models import Chat, User, get_utc_now
 from ai.graph import get_agent
 from ai.checkpointer import get_checkpointer
-from langchain_core.messages import HumanMessage, AIMessage
+from ai.callbacks import PromptCacheTracker, UsageRecorder
+from ai.deadline import TurnBudget
+from ai import metrics
+from langchain_core.messages import HumanMessage, AIMessage, RemoveMessage
 from langgraph.checkpoint.base import CheckpointTuple
 from api.models import SimpleMessage, ChatHistory
+from api.chat.search import index_messages
+from api.usage import usage_ledger
+from api import profiling
+
+# Serializes building the agent, so concurrent first callers build it once
+_init_lock = asyncio.Lock()
 
 
 class ChatService:
@@ -16,14 +27,46 @@ class ChatService:
         self._agent = None
         self._checkpointer = None
         self._initialized = False
+        self._inflight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.draining = False
     
     async def _ensure_initialized(self):
         """Ensure agent and checkpointer are initialized."""
-        if not self._initialized:
-            self._agent = await get_agent()
-            self._checkpointer = await get_checkpointer()
-            self._initialized = True
+        if self._initialized:
+            return
+        # The warmup and the first requests can get here together
+        async with _init_lock:
+            if not self._initialized:
+                self._agent = await get_agent()
+                self._checkpointer = await get_checkpointer()
+                self._initialized = True
     
+    async def drain(self, timeout: float) -> bool:
+        """Stop accepting agent runs and wait for in-flight ones to finish.
+
+        Returns:
+            True if every run finished within `timeout` seconds.
+        """
+        self.draining = True
+        print(f"Draining {self._inflight} in-flight agent run(s)...")
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            print(f"Drain timed out with {self._inflight} agent run(s) still in flight")
+            return False
+
+    def _run_started(self):
+        self._inflight += 1
+        self._idle.clear()
+
+    def _run_finished(self):
+        self._inflight -= 1
+        if self._inflight == 0:
+            self._idle.set()
+
     @property
     def agent(self):
         if not self._initialized:
@@ -52,79 +95,56 @@ class ChatService:
         
         return chat
     
-    async def get_chat_messages(self, session: Session, chat: Chat, user: User) -> ChatHistory:
-        """Get all messages for a chat from LangGraph checkpointer."""
+    async def get_latest_checkpoint(self, chat: Chat, user: User) -> Optional[CheckpointTuple]:
+        """The chat's latest checkpoint, or None if nothing was sent yet."""
         await self._ensure_initialized()
-        
         config = {"configurable": {"thread_id": chat.thread_id, "user_id": user.id}}
-        
-        print(f"Getting messages for chat {chat.id} with thread_id: {chat.thread_id}")
-        
         try:
-            # Get the latest checkpoint from the checkpointer
-            print(f"Getting checkpoint with config: {config}")
-            checkpoint_tuple = await self.checkpointer.aget_tuple(config)
-            print(f"Checkpoint tuple type: {type(checkpoint_tuple)}")
-            
-            if checkpoint_tuple and checkpoint_tuple[1]:
-                # Extract messages from the checkpoint state
-                checkpoint = checkpoint_tuple[1]
-                print(f"Checkpoint: {checkpoint}")
-                
-                # Messages are stored in channel_values
-                channel_values = checkpoint.get("channel_values", {})
-                print(f"Channel values: {channel_values}")
-                
-                messages = channel_values.get("messages", [])
-                print(f"Found {len(messages)} messages in checkpoint")
-            else:
-                print("No checkpoint found, returning empty messages")
-                messages = []
-                
+            return await self.checkpointer.aget_tuple(config)
         except Exception as e:
             print(f"Error getting messages from checkpointer: {e}")
             import traceback
             traceback.print_exc()
-            messages = []
-        
-        # Convert messages to response format
-        message_responses = []
-        for msg in messages:
-            # Determine message type based on the message class
-            if hasattr(msg, 'type'):
-                msg_type = msg.type
-            elif hasattr(msg, '__class__'):
-                if 'HumanMessage' in str(msg.__class__):
-                    msg_type = "user"
-                elif 'AIMessage' in str(msg.__class__):
-                    msg_type = "ai"
-                else:
-                    msg_type = "unknown"
-            else:
-                msg_type = "unknown"
-                
-            message_responses.append(SimpleMessage(
-                content=msg.content,
-                type=msg_type
-            ))
-        
-        return ChatHistory(
-            messages=message_responses,
-            title=chat.title,
-            thread_id=chat.thread_id
-        )
+            return None
 
-    
-    async def send_message(self, session: Session, chat: Chat, content: str, user: User) -> dict:
-        """Send a message and get AI response using LangGraph."""
+    @staticmethod
+    def history_etag(chat: Chat, checkpoint_tuple: Optional[CheckpointTuple]) -> str:
+        """ETag of a chat's history: changes with every new checkpoint or title."""
+        checkpoint_id = checkpoint_tuple.checkpoint["id"] if checkpoint_tuple else "empty"
+        return f'"{checkpoint_id}-{zlib.crc32((chat.title or "").encode()):08x}"'
+
+    @staticmethod
+    def chat_history(chat: Chat, checkpoint_tuple: Optional[CheckpointTuple]) -> dict:
+        """A `ChatHistory` as plain data, built straight from the checkpoint's messages."""
+        messages = checkpoint_tuple.checkpoint["channel_values"].get("messages", []) if checkpoint_tuple else []
+        return {
+            "messages": [{"content": msg.content, "type": msg.type} for msg in messages],
+            "title": chat.title,
+            "thread_id": chat.thread_id,
+        }
+
+    async def get_chat_messages(self, session: Session, chat: Chat, user: User) -> ChatHistory:
+        """Get all messages for a chat from LangGraph checkpointer."""
+        checkpoint_tuple = await self.get_latest_checkpoint(chat, user)
+        return ChatHistory.model_validate(self.chat_history(chat, checkpoint_tuple))
+
+    async def send_message(self, session: Session, chat: Chat, content: str, user: User, raise_errors: bool = False) -> dict:
+        """Send a message and get AI response using LangGraph.
+
+        Errors from the agent become an apology reply unless `raise_errors` is set.
+        """
         await self._ensure_initialized()
+        # Soft quota: raises QuotaExceeded before any work is done for the turn
+        with profiling.span("check_quota"):
+            usage_ledger.check_quota(session, user.id)
         
         config = {"configurable": {"thread_id": chat.thread_id, "user_id": user.id}}
         
         # print(f"Sending message to chat {chat.id} with thread_id: {chat.thread_id}")
         
         # Check if this is the first message to set the title
-        checkpoint_tuple = await self.checkpointer.aget_tuple(config)
+        with profiling.span("read_checkpoint"):
+            checkpoint_tuple = await self.checkpointer.aget_tuple(config)
         is_first_message = checkpoint_tuple is None or not checkpoint_tuple[1].get("messages")
         # print(f"Is first message: {is_first_message}")
         
@@ -135,28 +155,48 @@ class ChatService:
         # Update chat timestamp
         chat.updated_at = get_utc_now()
 
-        session.add(chat)
-        session.commit()
+        with profiling.span("update_chat"):
+            session.add(chat)
+            session.commit()
         
         # Invoke the agent with the message
+        self._run_started()
         try:
             # print(f"Invoking agent with message: {content}")
             # print(f"Using config: {config}")
             
-            # Get existing messages from the checkpoint
-            existing_messages = []
-            if checkpoint_tuple and checkpoint_tuple[1]:
-                channel_values = checkpoint_tuple[1].get("channel_values", {})
-                existing_messages = channel_values.get("messages", [])
-                print(f"Found {len(existing_messages)} existing messages")
-            
-            # Add the new human message to the conversation
-            all_messages = existing_messages + [HumanMessage(content=content)]
-            # print(f"Invoking agent with {len(all_messages)} total messages")
-            
-            response = await self.agent.ainvoke(
-                {"messages": all_messages}, 
-                config=config
+            # The checkpointer restores the history; only the new message goes through the reducer
+            cache_tracker = PromptCacheTracker()
+            usage_recorder = UsageRecorder(user.id, usage_ledger.record)
+            # A known id, so a cancelled turn can take its message back out of the thread
+            message = HumanMessage(content=content, id=str(uuid.uuid4()))
+            # Checked by each stage of the graph, which degrades as it runs low
+            budget = TurnBudget()
+            callbacks = [cache_tracker, usage_recorder]
+            profile = profiling.current_profile()
+            if profile is not None:
+                callbacks += profile.callbacks()
+            try:
+                with profiling.span("graph"):
+                    response = await self.agent.ainvoke(
+                        {"messages": [message]}, 
+                        config={
+                            # `turn_id` scopes tool call deduplication to this turn
+                            "configurable": {**config["configurable"], "budget": budget, "turn_id": message.id},
+                            "callbacks": callbacks,
+                        }
+                    )
+            except asyncio.CancelledError:
+                await asyncio.shield(self._close_cancelled_turn(config, message.id))
+                metrics.turn_cancelled(usage_recorder.tokens)
+                print(f"Agent run cancelled after {usage_recorder.tokens} tokens")
+                raise
+            metrics.turn_completed(usage_recorder.tokens)
+            if budget.degradations:
+                metrics.increment("turns_degraded")
+            print(
+                f"Prompt cache: {cache_tracker.cache_read}/{cache_tracker.input_tokens} input tokens "
+                f"cached ({cache_tracker.hit_ratio:.0%})"
             )
             # print(f"Agent response keys: {response.keys()}")
             # print(f"Agent response messages count: {len(response.get('messages', []))}")
@@ -167,10 +207,19 @@ class ChatService:
             
             ai_content = last_message.content if last_message else "No response from AI"
             # print(f"AI content: {ai_content}")
+
+            # Keep the search index up to date with this exchange
+            try:
+                with profiling.span("index_messages"):
+                    index_messages(session, chat, [("user", content), ("ai", ai_content)])
+            except Exception as e:
+                session.rollback()
+                print(f"Error indexing messages for search: {e}")
             
             # Check if the checkpoint was saved
             # print("Checking if checkpoint was saved...")
-            checkpoint_tuple = await self.checkpointer.aget_tuple(config)
+            with profiling.span("check_checkpoint"):
+                checkpoint_tuple = await self.checkpointer.aget_tuple(config)
             if checkpoint_tuple and checkpoint_tuple[1]:
                 channel_values = checkpoint_tuple[1].get("channel_values", {})
                 saved_messages = channel_values.get("messages", [])
@@ -180,16 +229,38 @@ class ChatService:
             
             return {
                 "content": ai_content,
+                "degraded": budget.degradations,
             }
             
         except Exception as e:
             print(f"Error invoking agent: {e}")
             import traceback
             traceback.print_exc()
+            if raise_errors:
+                raise
             return {
                 "content": "Sorry, I encountered an error processing your message."
             }
+        finally:
+            self._run_finished()
     
+    async def _close_cancelled_turn(self, config: dict, message_id: str):
+        """Leave the thread as if a cancelled turn had not been sent, or as a finished turn.
+
+        If the agent hadn't answered yet, the user's message is removed. If it
+        had (only `memory_node` was cut short), the answer is kept. Either way
+        the thread is marked as past the last node, so nothing is pending.
+        """
+        try:
+            state = await self.agent.aget_state(config)
+            messages = state.values.get("messages", [])
+            if messages and messages[-1].id == message_id:
+                await self.agent.aupdate_state(config, {"messages": [RemoveMessage(id=message_id)]}, as_node="memory")
+            elif state.next:
+                await self.agent.aupdate_state(config, {"messages": []}, as_node="memory")
+        except Exception as e:
+            print(f"Error cleaning up cancelled turn: {e}")
+
     def delete_chat(self, session: Session, chat: Chat) -> bool:
         """Delete a chat and its associated thread data."""
         try:
@@ -0,0 +1,278 @@
+"""Export and import a user's chats as NDJSON, for data requests and migrations.
+
+The stream starts with a header line, then each chat is a `chat` line followed
+by one `message` line per message in its latest checkpoint:
+
+    {"type": "export", "version": 1, "username": "...", "exported_at": "..."}
+    {"type": "chat", "thread_id": "...", "title": "...", "created_at": "...", ...}
+    {"type": "message", "thread_id": "...", "message": {"type": "human", "data": {...}}}
+
+Chats are read through a server-side cursor and only one checkpoint is held at
+a time, so memory stays flat however large the export is. Imports create new
+chats (new thread ids) in batches and write their checkpoints concurrently.
+
+    cd src && python -m api.chat.transfer export alice -o alice.ndjson
+    cd src && python -m api.chat.transfer import bob alice.ndjson
+"""
+import argparse
+import asyncio
+import json
+import sys
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, List, Tuple
+
+from langchain_core.messages import message_to_dict, messages_from_dict
+from sqlmodel import Session, select
+
+from api.chat.search import searchable_messages
+from api.models import Chat, ChatMessage, User, get_utc_now
+
+EXPORT_VERSION = 1
+# Chats fetched per round trip from the server-side cursor
+EXPORT_FETCH_SIZE = 100
+# Bytes of NDJSON gathered before a chunk is sent
+EXPORT_CHUNK_BYTES = 64 * 1024
+# Longest import line accepted; a stream without newlines is rejected instead of buffered
+IMPORT_MAX_LINE_BYTES = 8 * 1024 * 1024
+
+
+class TransferError(ValueError):
+    """An import stream that can't be read; chats read in full before the bad line are kept."""
+
+
+def _line(record: dict) -> bytes:
+    return (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+async def export_chats(user_id: int, checkpointer) -> AsyncIterator[bytes]:
+    """Yield the user's chats as NDJSON chunks.
+
+    Opens its own database session, since a response body is streamed after
+    the request's dependencies have been closed.
+    """
+    from api.db import engine
+
+    with Session(engine) as session:
+        user = session.get(User, user_id)
+        buffer = bytearray(_line({
+            "type": "export", "version": EXPORT_VERSION, "username": user.username, "exported_at": get_utc_now(),
+        }))
+        chats = session.exec(
+            select(Chat).where(Chat.user_id == user_id).order_by(Chat.id).execution_options(yield_per=EXPORT_FETCH_SIZE)
+        )
+        for chat in chats:
+            buffer += _line({
+                "type": "chat", "thread_id": chat.thread_id, "title": chat.title, "created_at": chat.created_at,
+                "updated_at": chat.updated_at, "is_deleted": chat.is_deleted,
+            })
+            checkpoint_tuple = await checkpointer.aget_tuple({"configurable": {"thread_id": chat.thread_id}})
+            messages = checkpoint_tuple.checkpoint.get("channel_values", {}).get("messages", []) if checkpoint_tuple else []
+            for message in messages:
+                buffer += _line({"type": "message", "thread_id": chat.thread_id, "message": message_to_dict(message)})
+                if len(buffer) >= EXPORT_CHUNK_BYTES:
+                    yield bytes(buffer)
+                    buffer.clear()
+            del checkpoint_tuple, messages
+            session.expunge(chat)
+        if buffer:
+            yield bytes(buffer)
+
+
+def _record(line: bytes, number: int) -> Tuple[int, dict]:
+    if len(line) > IMPORT_MAX_LINE_BYTES:
+        raise TransferError(f"Line {number} is longer than {IMPORT_MAX_LINE_BYTES} bytes")
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise TransferError(f"Line {number} is not valid JSON: {e}") from e
+    if not isinstance(record, dict):
+        raise TransferError(f"Line {number} is not a JSON object")
+    return number, record
+
+
+async def iter_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, dict]]:
+    """Parse NDJSON from arbitrarily split byte chunks, one line of at most `IMPORT_MAX_LINE_BYTES` at a time.
+
+    Yields each record with its line number.
+    """
+    pending = bytearray()
+    number = 0
+    async for chunk in chunks:
+        # Only the new bytes can hold a newline; the rest of `pending` was searched already
+        start, search_from = 0, len(pending)
+        pending += chunk
+        while (end := pending.find(b"\n", search_from)) != -1:
+            number += 1
+            line = bytes(pending[start:end])
+            if line.strip():
+                yield _record(line, number)
+            start = search_from = end + 1
+        del pending[:start]
+        if len(pending) > IMPORT_MAX_LINE_BYTES:
+            raise TransferError(f"Line {number + 1} is longer than {IMPORT_MAX_LINE_BYTES} bytes")
+    if pending.strip():
+        yield _record(bytes(pending), number + 1)
+
+
+class ChatImporter:
+    """Create chats from export records, committing them in batches."""
+
+    def __init__(self, session: Session, user: User, agent, batch_chats: int = 50,
+                 batch_messages: int = 5000, concurrency: int = 8):
+        self.session = session
+        self.user_id = user.id
+        self.agent = agent
+        self.batch_chats = batch_chats
+        self.batch_messages = batch_messages
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.batch = []
+        # Chats of the batch followed by another chat line, so known to be read in full
+        self.complete_chats = 0
+        self.batch_message_count = 0
+        self.stats = {"chats": 0, "messages": 0}
+
+    async def add(self, record: dict, number: int):
+        """Add the record read from line `number`; a malformed one raises `TransferError`."""
+        kind = record.get("type")
+        if kind == "chat":
+            self.complete_chats = len(self.batch)
+            title = record.get("title") or "Imported Chat"
+            if not isinstance(title, str):
+                raise TransferError(f"Line {number}: the chat title is not a string")
+            chat = Chat(
+                user_id=self.user_id,
+                thread_id=str(uuid.uuid4()),
+                title=title,
+                is_deleted=bool(record.get("is_deleted", False)),
+            )
+            for field in ("created_at", "updated_at"):
+                if record.get(field):
+                    try:
+                        setattr(chat, field, datetime.fromisoformat(record[field]))
+                    except (TypeError, ValueError) as e:
+                        raise TransferError(f"Line {number}: invalid {field} {record[field]!r}") from e
+            if len(self.batch) >= self.batch_chats or self.batch_message_count >= self.batch_messages:
+                await self.flush()
+            self.batch.append((record.get("thread_id"), chat, []))
+        elif kind == "message":
+            if not self.batch or record.get("thread_id") != self.batch[-1][0]:
+                raise TransferError(
+                    f"Line {number}: message for thread {record.get('thread_id')} does not follow its chat line"
+                )
+            try:
+                message = messages_from_dict([record["message"]])[0]
+            except (KeyError, TypeError, ValueError) as e:
+                raise TransferError(f"Line {number}: invalid message ({type(e).__name__}: {e})") from e
+            self.batch[-1][2].append(message)
+            self.batch_message_count += 1
+        elif kind == "export":
+            if record.get("version") != EXPORT_VERSION:
+                raise TransferError(f"Line {number}: unsupported export version {record.get('version')}")
+        else:
+            raise TransferError(f"Line {number}: unknown record type {kind!r}")
+
+    async def _write_checkpoint(self, thread_id: str, messages: List):
+        async with self.semaphore:
+            # Written as the last node's output, so the thread is idle and ready for the next turn
+            await self.agent.aupdate_state(
+                {"configurable": {"thread_id": thread_id}}, {"messages": messages}, as_node="memory"
+            )
+
+    async def flush(self):
+        if not self.batch:
+            return
+        chats = [chat for _, chat, _ in self.batch]
+        histories = [messages for _, _, messages in self.batch]
+        # Checkpoints first, so a failed write leaves no chat behind that opens empty.
+        # Their thread ids are new: until the chats are committed nothing reads them.
+        await asyncio.gather(*(
+            self._write_checkpoint(chat.thread_id, messages) for chat, messages in zip(chats, histories) if messages
+        ))
+        # One transaction per batch; flushing first assigns the chat ids
+        self.session.add_all(chats)
+        self.session.flush()
+        self.session.add_all([
+            ChatMessage(chat_id=chat.id, user_id=chat.user_id, role=role, content=content, created_at=chat.updated_at)
+            for chat, messages in zip(chats, histories)
+            for role, content in searchable_messages(messages)
+        ])
+        self.session.commit()
+        for chat in chats:
+            self.session.expunge(chat)
+        self.stats["chats"] += len(chats)
+        self.stats["messages"] += sum(len(messages) for messages in histories)
+        self.batch = []
+        self.complete_chats = 0
+        self.batch_message_count = 0
+
+    async def abort(self, error: TransferError):
+        """Import the chats read in full before a bad line, then raise `error` with their count."""
+        self.batch = self.batch[:self.complete_chats]
+        await self.flush()
+        raise TransferError(f"{error} ({self.stats['chats']} chat(s) before it were imported)") from error
+
+
+async def import_chats(session: Session, user: User, agent, chunks: AsyncIterator[bytes]) -> dict:
+    """Import an NDJSON export into `user`'s account.
+
+    Returns:
+        The number of chats and messages imported.
+    """
+    importer = ChatImporter(session, user, agent)
+    try:
+        async for number, record in iter_records(chunks):
+            await importer.add(record, number)
+    except TransferError as e:
+        await importer.abort(e)
+    await importer.flush()
+    return importer.stats
+
+
+async def _read_file(path: str) -> AsyncIterator[bytes]:
+    with (open(path, "rb") if path != "-" else sys.stdin.buffer) as file:
+        while chunk := file.read(EXPORT_CHUNK_BYTES):
+            yield chunk
+
+
+async def _main(args):
+    from ai.checkpointer import close_checkpointer
+    from ai.graph import get_agent
+    from api.db import engine, init_db
+
+    init_db()
+    agent = await get_agent()
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.username == args.username)).first()
+    if user is None:
+        raise SystemExit(f"No user named {args.username!r}")
+    try:
+        if args.command == "export":
+            with (open(args.output, "wb") if args.output != "-" else sys.stdout.buffer) as output:
+                async for chunk in export_chats(user.id, agent.checkpointer):
+                    output.write(chunk)
+        else:
+            with Session(engine) as session:
+                stats = await import_chats(session, user, agent, _read_file(args.input))
+            print(f"Imported {stats['chats']} chats with {stats['messages']} messages", file=sys.stderr)
+    finally:
+        await close_checkpointer()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Write a user's chats as NDJSON")
+    export.add_argument("username")
+    export.add_argument("-o", "--output", default="-", help="Output file (default: stdout)")
+    load = commands.add_parser("import", help="Add chats from an NDJSON export to a user's account")
+    load.add_argument("username")
+    load.add_argument("input", nargs="?", default="-", help="Input file (default: stdin)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path=".env", override=True)
+    asyncio.run(_main(parse_args()))
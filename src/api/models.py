@@ -1,5 +1,6 @@
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import List, Optional
+from sqlalchemy import DDL, Index, UniqueConstraint, event
 from sqlmodel import Field, Relationship, SQLModel, DateTime
 
 def get_utc_now():
@@ -52,6 +53,85 @@ class Chat(SQLModel, table=True):
     user: User = Relationship(back_populates="chats")
 
 
+class ChatMessage(SQLModel, table=True):
+    """Searchable copy of a message; the conversation itself lives in the checkpointer."""
+
+    id: int | None = Field(default=None, primary_key=True)
+    chat_id: int = Field(foreign_key="chat.id", nullable=False, index=True)
+    user_id: int = Field(foreign_key="user.id", nullable=False, index=True)
+    role: str = Field(nullable=False)  # "user" or "ai"
+    content: str = Field(nullable=False)
+    created_at: datetime = Field(
+        default_factory=get_utc_now,
+        sa_type=DateTime(timezone=True),
+        nullable=False
+        )
+
+
+# On Postgres, full-text search uses a stored tsvector column with a GIN index.
+# Other databases (SQLite in development and benchmarks) fall back to LIKE.
+event.listen(
+    ChatMessage.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE chatmessage ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english', content)) STORED"
+    ).execute_if(dialect="postgresql"),
+)
+event.listen(
+    ChatMessage.__table__,
+    "after_create",
+    DDL(
+        "CREATE INDEX ix_chatmessage_search_vector ON chatmessage USING GIN (search_vector)"
+    ).execute_if(dialect="postgresql"),
+)
+
+
+class LLMUsage(SQLModel, table=True):
+    """LLM usage of one user on one UTC day, per agent and model.
+
+    Rows are rollups: `api.usage.UsageLedger` aggregates calls in memory and
+    adds them to these counters in batches.
+    """
+    __table_args__ = (UniqueConstraint("user_id", "day", "agent", "model"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", nullable=False, index=True)
+    day: date = Field(nullable=False, index=True)
+    agent: str = Field(nullable=False)
+    model: str = Field(nullable=False)
+    calls: int = Field(default=0, nullable=False)
+    input_tokens: int = Field(default=0, nullable=False)
+    output_tokens: int = Field(default=0, nullable=False)
+    cached_tokens: int = Field(default=0, nullable=False)
+    cost_usd: float = Field(default=0.0, nullable=False)
+    latency_ms: float = Field(default=0.0, nullable=False)  # summed over calls
+    max_latency_ms: float = Field(default=0.0, nullable=False)
+
+
+class AgentRun(SQLModel, table=True):
+    """A message submitted for a background agent run, and its result once finished."""
+    __table_args__ = (Index("ix_agentrun_queue", "status", "priority", "created_at"),)
+
+    id: str = Field(primary_key=True)  # uuid4 hex
+    chat_id: int = Field(foreign_key="chat.id", nullable=False, index=True)
+    user_id: int = Field(foreign_key="user.id", nullable=False, index=True)
+    content: str = Field(nullable=False)
+    priority: int = Field(default=10, nullable=False)  # higher runs first
+    status: str = Field(default="queued", nullable=False)  # queued, running, done, failed
+    result: str | None = Field(default=None)
+    error: str | None = Field(default=None)
+    worker: str | None = Field(default=None)
+    attempts: int = Field(default=0, nullable=False)
+    created_at: datetime = Field(
+        default_factory=get_utc_now,
+        sa_type=DateTime(timezone=True),
+        nullable=False
+        )
+    started_at: Optional[datetime] = Field(default=None, sa_type=DateTime(timezone=True), nullable=True)
+    finished_at: Optional[datetime] = Field(default=None, sa_type=DateTime(timezone=True), nullable=True)
+
+
 # ---------------------------------------------------------------------------
 # 🆕  Pydantic / response‑layer schemas
 # ---------------------------------------------------------------------------
@@ -69,4 +149,49 @@ class ChatHistory(SQLModel):
     """Chat history Pydantic model for API responses."""
     messages: List[SimpleMessage]
     title: str
-    thread_id: str
\ No newline at end of file
+    thread_id: str
+
+class ChatSearchHit(SQLModel):
+    """A message matching a chat search, with the matched terms highlighted."""
+    chat_id: int
+    chat_title: str | None
+    message_id: int
+    type: str  # "user" or "ai"
+    snippet: str
+    score: float
+    created_at: datetime
+
+class ChatSearchResults(SQLModel):
+    """One page of chat search results."""
+    query: str
+    mode: str  # "text" or "semantic"
+    results: List[ChatSearchHit]
+    offset: int
+    has_more: bool
+
+
+class UsageRollup(SQLModel):
+    """LLM usage of one user on one day, optionally split by agent or model."""
+    user_id: int
+    username: str | None
+    day: date
+    agent: str | None = None
+    model: str | None = None
+    calls: int
+    input_tokens: int
+    output_tokens: int
+    cached_tokens: int
+    cost_usd: float
+    avg_latency_ms: float
+    max_latency_ms: float
+
+
+class AgentRunStatus(SQLModel):
+    """State of a background agent run; `content` is the reply once it is done."""
+    run_id: str
+    chat_id: int
+    status: str
+    content: str | None = None
+    error: str | None = None
+    created_at: datetime
+    finished_at: datetime | None = None
@@ -0,0 +1,186 @@
+"""Opt-in profiling of agent turns, and a ring buffer of slow ones.
+
+A turn is profiled when an admin sends `X-Profile: 1` (or `cpu`), or when it is
+sampled at `PROFILE_SAMPLE_RATE`. A profiled turn records a timeline: the
+stages of `ChatService.send_message`, then every graph node, tool call and LLM
+call with its start and duration. With `cpu` (or `PROFILE_CPU` for sampled
+turns) it also takes a statistical CPU profile with pyinstrument, if installed.
+
+Every turn slower than `PROFILE_SLOW_TURN_SECONDS` is kept in this worker's
+ring buffer, with its timeline when it was profiled; so are profiled turns
+requested with the header, whatever their duration. Unprofiled turns cost a
+context variable lookup per stage.
+"""
+import contextvars
+import os
+import random
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+
+from fastapi import Depends, Request
+
+from ai.callbacks import TimelineRecorder
+from api.admin import is_admin
+from api.auth.routing import get_current_user
+from api.models import User, get_utc_now
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # CPU profiles are optional
+    Profiler = None
+
+# Fraction of turns profiled without the header, e.g. 0.01
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Sampled turns also get a CPU profile (header-triggered turns ask with `X-Profile: cpu`)
+PROFILE_CPU = os.getenv("PROFILE_CPU", "false").lower() == "true"
+# Turns slower than this are kept in the ring buffer
+PROFILE_SLOW_TURN_SECONDS = float(os.getenv("PROFILE_SLOW_TURN_SECONDS", "15"))
+# Slow turns kept per worker; the oldest are dropped first
+PROFILE_RING_SIZE = int(os.getenv("PROFILE_RING_SIZE", "50"))
+PROFILE_HEADER = "X-Profile"
+# pyinstrument's sampling interval (seconds)
+CPU_SAMPLE_INTERVAL = 0.001
+
+_current_profile = contextvars.ContextVar("turn_profile", default=None)
+slow_turns = deque(maxlen=PROFILE_RING_SIZE)
+
+
+class TurnProfile:
+    """The timeline (and optionally CPU profile) of one profiled turn."""
+
+    def __init__(self, cpu: bool = False, forced: bool = False):
+        self.id = uuid.uuid4().hex
+        self.cpu = cpu
+        self.forced = forced
+        self.start = time.perf_counter()
+        self.events = []
+        self.cpu_profile = None
+        self._profiler = None
+
+    def add(self, kind: str, name: str, start: float, end: float, path: str = "", error: bool = False):
+        self.events.append({
+            "kind": kind,
+            "name": name,
+            "path": path,
+            "start_ms": round((start - self.start) * 1000, 2),
+            "duration_ms": round((end - start) * 1000, 2),
+            "error": error,
+        })
+
+    def callbacks(self) -> list:
+        """LangChain callbacks that add the graph's nodes, tools and LLM calls to the timeline."""
+        return [TimelineRecorder(self.add)]
+
+    def start_cpu(self):
+        if not self.cpu:
+            return
+        if Profiler is None:
+            self.cpu_profile = "pyinstrument is not installed (pip install pyinstrument)"
+            return
+        self._profiler = Profiler(interval=CPU_SAMPLE_INTERVAL, async_mode="enabled")
+        self._profiler.start()
+
+    def stop_cpu(self):
+        if self._profiler is None:
+            return
+        self._profiler.stop()
+        self.cpu_profile = self._profiler.output_text(unicode=False, color=False, show_all=False)
+        self._profiler = None
+
+    def timeline(self) -> list:
+        return sorted(self.events, key=lambda event: event["start_ms"])
+
+
+def current_profile() -> Optional[TurnProfile]:
+    return _current_profile.get()
+
+
+class _Span:
+    def __init__(self, profile: TurnProfile, name: str):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profile.add("service", self.name, self.start, time.perf_counter(), error=exc_type is not None)
+
+
+_NO_SPAN = nullcontext()
+
+
+def span(name: str):
+    """Add a service stage to the current turn's timeline, if it is profiled."""
+    profile = _current_profile.get()
+    return _NO_SPAN if profile is None else _Span(profile, name)
+
+
+def sampled() -> Optional[TurnProfile]:
+    """A profile for a turn picked at `PROFILE_SAMPLE_RATE`, else None."""
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return TurnProfile(cpu=PROFILE_CPU)
+    return None
+
+
+def requested_profile(request: Request, current_user: User = Depends(get_current_user)) -> Optional[TurnProfile]:
+    """Dependency: a profile when an admin asks with the header, otherwise a sampled one."""
+    mode = request.headers.get(PROFILE_HEADER, "").strip().lower()
+    if mode in ("1", "true", "timeline", "cpu") and is_admin(current_user):
+        return TurnProfile(cpu=mode == "cpu", forced=True)
+    return sampled()
+
+
+@contextmanager
+def profiled_turn(profile: Optional[TurnProfile], **info):
+    """Time a turn and keep it in `slow_turns` when it is slow or was asked for.
+
+    Tasks created inside the block (e.g. the turn itself) see `profile` as the
+    current profile. Yields a dict the caller can add details to, e.g. the
+    degradations the turn reported.
+    """
+    token = _current_profile.set(profile)
+    started_at, start = get_utc_now(), time.perf_counter()
+    if profile is not None:
+        profile.start_cpu()
+    error = None
+    try:
+        yield info
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _current_profile.reset(token)
+        if profile is not None:
+            profile.stop_cpu()
+        if duration >= PROFILE_SLOW_TURN_SECONDS or (profile is not None and profile.forced):
+            slow_turns.append({
+                "id": profile.id if profile is not None else uuid.uuid4().hex,
+                "started_at": started_at.isoformat(),
+                "duration_ms": round(duration * 1000, 1),
+                "error": error,
+                **info,
+                "profiled": profile is not None,
+                "timeline": profile.timeline() if profile is not None else None,
+                "cpu_profile": profile.cpu_profile if profile is not None else None,
+            })
+
+
+def recent_slow_turns(limit: int) -> list:
+    """Newest first, without timelines and CPU profiles."""
+    return [
+        {
+            **{key: value for key, value in turn.items() if key not in ("timeline", "cpu_profile")},
+            "events": len(turn["timeline"] or []),
+            "cpu_profile": turn["cpu_profile"] is not None,
+        }
+        for turn in list(reversed(slow_turns))[:limit]
+    ]
+
+
+def get_slow_turn(turn_id: str) -> Optional[dict]:
+    return next((turn for turn in slow_turns if turn["id"] == turn_id), None)
@@ -0,0 +1,91 @@
+import asyncio
+import gzip
+import json
+import os
+from typing import Any, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this many bytes are sent uncompressed
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+# Low levels: higher ones cost several times the CPU for a few percent fewer bytes
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "1"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "1"))
+# Larger bodies are compressed in a worker thread instead of on the event loop
+RESPONSE_COMPRESSION_THREAD_BYTES = 256 * 1024
+
+
+def dumps(content: Any) -> bytes:
+    """JSON-encode plain data (dicts, lists, str, numbers, datetimes)."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return json.dumps(content, default=lambda v: v.isoformat(), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def accepted_encoding(request: Request) -> Optional[str]:
+    """`br` or `gzip` if the client accepts it (brotli only when installed), else None."""
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(coding.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+
+
+def etag_headers(etag: str) -> dict:
+    # Clients may keep the body but must revalidate it on every use
+    return {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+
+
+async def json_response(request: Request, content: Any, etag: Optional[str] = None, status_code: int = 200) -> Response:
+    """Serialize already-validated `content` and compress it when the client allows.
+
+    Skips FastAPI's `response_model` validation and `jsonable_encoder`, so the
+    route must build `content` from trusted data in the response schema's
+    shape.
+    """
+    headers = etag_headers(etag) if etag is not None else {"Vary": "Accept-Encoding"}
+    body = dumps(content)
+    encoding = accepted_encoding(request) if len(body) >= RESPONSE_COMPRESSION_MIN_BYTES else None
+    if encoding is not None:
+        if len(body) >= RESPONSE_COMPRESSION_THREAD_BYTES:
+            body = await asyncio.to_thread(compress, body, encoding)
+        else:
+            body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
@@ -0,0 +1,257 @@
+import asyncio
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from ai.routing import price_for
+from api.models import LLMUsage, UsageRollup, User
+
+# Seconds between writes of the aggregated usage; also written on shutdown
+USAGE_FLUSH_SECONDS = float(os.getenv("USAGE_FLUSH_SECONDS", "10"))
+# Write early once this many (user, day, agent, model) buckets are waiting
+USAGE_FLUSH_MAX_BUCKETS = int(os.getenv("USAGE_FLUSH_MAX_BUCKETS", "1000"))
+# Soft daily quotas per user (UTC day); 0 disables
+USAGE_DAILY_TOKEN_QUOTA = int(os.getenv("USAGE_DAILY_TOKEN_QUOTA", "0"))
+USAGE_DAILY_COST_QUOTA = float(os.getenv("USAGE_DAILY_COST_QUOTA", "0"))
+# How long a user's daily total read from the database is trusted before re-reading
+USAGE_QUOTA_REFRESH_SECONDS = float(os.getenv("USAGE_QUOTA_REFRESH_SECONDS", "60"))
+
+COUNTERS = ("calls", "input_tokens", "output_tokens", "cached_tokens", "cost_usd", "latency_ms")
+
+
+class QuotaExceeded(Exception):
+    """The user has used up today's token or cost quota."""
+
+    def __init__(self, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.retry_after = retry_after
+
+
+def utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def seconds_until_tomorrow() -> int:
+    now = datetime.now(timezone.utc)
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+    return int((tomorrow - now).total_seconds()) + 1
+
+
+class UsageLedger:
+    """Per-user LLM usage, aggregated in memory and written in batches.
+
+    `record` only adds to an in-memory bucket per (user, UTC day, agent,
+    model), so an LLM call never waits on the database. `run` writes the
+    buckets every `USAGE_FLUSH_SECONDS` (sooner when many are waiting) as one
+    upsert per bucket in a single transaction; the counters are added in SQL,
+    so workers sharing the table don't overwrite each other.
+
+    Quotas are soft: they are checked before a turn starts, against the
+    database total plus this worker's unwritten usage, so a turn that starts
+    under the limit may finish over it, and other workers' latest calls show
+    up once they flush.
+    """
+
+    def __init__(self, engine=None):
+        self._engine = engine
+        self._pending = {}
+        self._flushing = {}
+        self._daily = {}  # user_id -> [day, loaded_at, tokens, cost]
+        self._wake = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self.stats = {"calls": 0, "flushes": 0, "rows_written": 0, "errors": 0}
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from api.db import engine
+
+            self._engine = engine
+        return self._engine
+
+    def record(self, user_id: int, agent: str, model: str, usage: dict, latency: float):
+        """Add one LLM call's usage (an `usage_metadata` dict) to its bucket."""
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        price = price_for(model)
+        cost = (
+            (input_tokens * price["input"] + output_tokens * price["output"]) / 1_000_000 if price else 0.0
+        )
+        day = utc_today()
+        bucket = self._pending.get((user_id, day, agent, model))
+        if bucket is None:
+            bucket = self._pending[(user_id, day, agent, model)] = dict.fromkeys(COUNTERS, 0) | {"max_latency_ms": 0.0}
+            if len(self._pending) >= USAGE_FLUSH_MAX_BUCKETS:
+                self._wake.set()
+        latency_ms = latency * 1000
+        bucket["calls"] += 1
+        bucket["input_tokens"] += input_tokens
+        bucket["output_tokens"] += output_tokens
+        bucket["cached_tokens"] += (usage.get("input_token_details") or {}).get("cache_read", 0)
+        bucket["cost_usd"] += cost
+        bucket["latency_ms"] += latency_ms
+        bucket["max_latency_ms"] = max(bucket["max_latency_ms"], latency_ms)
+        self.stats["calls"] += 1
+
+        daily = self._daily.get(user_id)
+        if daily is not None and daily[0] == day:
+            daily[2] += input_tokens + output_tokens
+            daily[3] += cost
+
+    # Writing
+
+    async def flush(self) -> int:
+        """Write the pending buckets; returns the number of rows upserted."""
+        async with self._lock:
+            if not self._pending:
+                return 0
+            self._flushing, self._pending = self._pending, {}
+            try:
+                await asyncio.to_thread(self._write, self._flushing)
+            except Exception as e:
+                # Keep the usage for the next attempt rather than losing it
+                self.stats["errors"] += 1
+                print(f"Error writing LLM usage ({len(self._flushing)} buckets): {e}")
+                for key, bucket in self._flushing.items():
+                    self._merge(key, bucket)
+                return 0
+            finally:
+                written, self._flushing = self._flushing, {}
+            self.stats["flushes"] += 1
+            self.stats["rows_written"] += len(written)
+            return len(written)
+
+    def _merge(self, key: tuple, bucket: dict):
+        current = self._pending.get(key)
+        if current is None:
+            self._pending[key] = bucket
+            return
+        for counter in COUNTERS:
+            current[counter] += bucket[counter]
+        current["max_latency_ms"] = max(current["max_latency_ms"], bucket["max_latency_ms"])
+
+    def _write(self, buckets: dict):
+        rows = [
+            {"user_id": user_id, "day": day, "agent": agent, "model": model, **bucket}
+            for (user_id, day, agent, model), bucket in buckets.items()
+        ]
+        dialect = postgresql if self.engine.dialect.name == "postgresql" else sqlite
+        statement = dialect.insert(LLMUsage)
+        table = LLMUsage.__table__
+        statement = statement.on_conflict_do_update(
+            index_elements=["user_id", "day", "agent", "model"],
+            set_={
+                **{counter: table.c[counter] + statement.excluded[counter] for counter in COUNTERS},
+                "max_latency_ms": func.greatest(table.c.max_latency_ms, statement.excluded.max_latency_ms)
+                if dialect is postgresql else func.max(table.c.max_latency_ms, statement.excluded.max_latency_ms),
+            },
+        )
+        with Session(self.engine) as session:
+            session.execute(statement, rows)
+            session.commit()
+
+    async def run(self, interval: float = USAGE_FLUSH_SECONDS):
+        """Flush every `interval` seconds, or as soon as enough buckets are waiting."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    # Reading
+
+    def _unwritten(self, user_id: int, day: date) -> tuple:
+        tokens, cost = 0, 0.0
+        for buckets in (self._pending, self._flushing):
+            for (bucket_user, bucket_day, _, _), bucket in buckets.items():
+                if bucket_user == user_id and bucket_day == day:
+                    tokens += bucket["input_tokens"] + bucket["output_tokens"]
+                    cost += bucket["cost_usd"]
+        return tokens, cost
+
+    def usage_today(self, session: Session, user_id: int) -> tuple:
+        """(tokens, cost) the user has used today, re-read from the database when stale."""
+        day = utc_today()
+        daily = self._daily.get(user_id)
+        if daily is None or daily[0] != day or time.monotonic() - daily[1] > USAGE_QUOTA_REFRESH_SECONDS:
+            stored_tokens, stored_cost = session.exec(
+                select(
+                    func.coalesce(func.sum(LLMUsage.input_tokens + LLMUsage.output_tokens), 0),
+                    func.coalesce(func.sum(LLMUsage.cost_usd), 0.0),
+                ).where(LLMUsage.user_id == user_id, LLMUsage.day == day)
+            ).one()
+            tokens, cost = self._unwritten(user_id, day)
+            daily = self._daily[user_id] = [day, time.monotonic(), stored_tokens + tokens, stored_cost + cost]
+        return daily[2], daily[3]
+
+    def check_quota(self, session: Session, user_id: int):
+        """Raise `QuotaExceeded` if the user is over today's soft quota."""
+        if not USAGE_DAILY_TOKEN_QUOTA and not USAGE_DAILY_COST_QUOTA:
+            return
+        tokens, cost = self.usage_today(session, user_id)
+        if USAGE_DAILY_TOKEN_QUOTA and tokens >= USAGE_DAILY_TOKEN_QUOTA:
+            raise QuotaExceeded("Daily token quota reached, please try again tomorrow", seconds_until_tomorrow())
+        if USAGE_DAILY_COST_QUOTA and cost >= USAGE_DAILY_COST_QUOTA:
+            raise QuotaExceeded("Daily usage quota reached, please try again tomorrow", seconds_until_tomorrow())
+
+
+def usage_rollups(
+    session: Session,
+    start: date,
+    end: date,
+    user_id: Optional[int] = None,
+    by: Optional[str] = None,
+    limit: int = 500,
+) -> List[UsageRollup]:
+    """Per-user, per-day usage between `start` and `end` (inclusive), optionally split `by` agent or model."""
+    columns = [LLMUsage.user_id, User.username, LLMUsage.day]
+    if by is not None:
+        columns.append(getattr(LLMUsage, by))
+    calls = func.sum(LLMUsage.calls)
+    query = (
+        select(
+            *columns,
+            calls,
+            func.sum(LLMUsage.input_tokens),
+            func.sum(LLMUsage.output_tokens),
+            func.sum(LLMUsage.cached_tokens),
+            func.sum(LLMUsage.cost_usd),
+            func.sum(LLMUsage.latency_ms) / calls,
+            func.max(LLMUsage.max_latency_ms),
+        )
+        .join(User, User.id == LLMUsage.user_id)
+        .where(LLMUsage.day >= start, LLMUsage.day <= end)
+        .group_by(*columns)
+        .order_by(LLMUsage.day.desc(), func.sum(LLMUsage.cost_usd).desc())
+        .limit(limit)
+    )
+    if user_id is not None:
+        query = query.where(LLMUsage.user_id == user_id)
+    rollups = []
+    for row in session.exec(query).all():
+        row = list(row)
+        key = {"user_id": row[0], "username": row[1], "day": row[2]}
+        if by is not None:
+            key[by] = row[3]
+        calls, input_tokens, output_tokens, cached_tokens, cost, avg_latency, max_latency = row[len(columns):]
+        rollups.append(UsageRollup(
+            **key,
+            calls=calls,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cached_tokens=cached_tokens,
+            cost_usd=round(cost, 6),
+            avg_latency_ms=round(avg_latency or 0.0, 1),
+            max_latency_ms=round(max_latency, 1),
+        ))
+    return rollups
+
+
+usage_ledger = UsageLedger()
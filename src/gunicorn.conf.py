@@ -0,0 +1,48 @@
+"""Gunicorn settings for the production server.
+
+Run from the directory that contains `main.py`:
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Every worker is a separate process that imports the app on its own and builds
+its own database engine, checkpointer pool and agents in the FastAPI lifespan,
+so nothing is shared across processes.
+"""
+import multiprocessing
+import os
+import sys
+
+bind = f"0.0.0.0:{os.getenv('PORT') or 8000}"
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# One worker per CPU by default; WEB_CONCURRENCY overrides (e.g. to match a container limit)
+workers = int(os.getenv("WEB_CONCURRENCY") or multiprocessing.cpu_count())
+
+# Agent turns can take tens of seconds; don't let the arbiter kill a busy worker
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+keepalive = 5
+
+# On SIGTERM workers stop accepting connections, finish in-flight requests and
+# drain agent runs (see SHUTDOWN_DRAIN_TIMEOUT in main.py) before exiting
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+
+# Off by default: each worker imports the app after fork. When enabled, the
+# post_fork hook below drops any connections inherited from the master.
+preload_app = os.getenv("PRELOAD_APP", "false").lower() == "true"
+
+accesslog = "-"
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    """Reset per-process singletons a forked worker may have inherited."""
+    db = sys.modules.get("api.db")
+    if db is not None:
+        # Drop pooled connections without closing the parent's sockets
+        db.engine.dispose(close=False)
+
+    checkpointer = sys.modules.get("ai.checkpointer")
+    if checkpointer is not None:
+        checkpointer.reset_checkpointer()
+
+    server.log.info(f"Worker {worker.pid} initialized")
@@ -1,27 +1,65 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 import os
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=".env", override=True)
 from contextlib import asynccontextmanager
 import asyncio
+import time
 from fastapi.middleware.cors import CORSMiddleware
 
-from api.db import init_db
-from api.chat.routing import router as chat_router
+from api.db import init_db, engine
+from api.chat.routing import router as chat_router, chat_service, agent_runner
 from api.auth.routing import router as auth_router
+from api.admin.routing import router as admin_router
+from api.usage import usage_ledger
+from ai.warmup import warmup
+from ai.checkpointer import close_checkpointer
+from ai.graph import drain_deferred_memory_writes
 
+# Seconds to wait for in-flight agent runs (and the memory writes they deferred) on
+# shutdown; keep below gunicorn's graceful_timeout
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "25"))
+
+
+
+async def run_warmup(app: FastAPI):
+    """Warm the checkpointer, agent and provider connections, then flip `/ready`."""
+    app.state.warmup = await warmup(agent=chat_service._ensure_initialized())
+    app.state.ready = app.state.warmup["ready"]
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Before the app starts
+    app.state.ready = False
+    app.state.warmup = None
+    # Tables first: every endpoint needs them, even while the agent warms up
     init_db()
+    # Warm up in the background so `/health` answers while `/ready` stays red
+    warmup_task = asyncio.create_task(run_warmup(app))
+    usage_task = asyncio.create_task(usage_ledger.run())
+    agent_runner.start()
     # After the app starts
     yield
+    # Before the app stops
+    warmup_task.cancel()
+    app.state.ready = False
+    await agent_runner.stop()
+    drain_deadline = time.monotonic() + SHUTDOWN_DRAIN_TIMEOUT
+    await chat_service.drain(SHUTDOWN_DRAIN_TIMEOUT)
+    await agent_runner.close()
+    # Mem0 writes that degraded turns put off until after replying
+    await drain_deferred_memory_writes(drain_deadline - time.monotonic())
+    usage_task.cancel()
+    await usage_ledger.flush()
+    await close_checkpointer()
+    engine.dispose()
 
 app = FastAPI(lifespan=lifespan)
 app.include_router(chat_router)
 app.include_router(auth_router)
+app.include_router(admin_router)
 
 # Add CORS middleware for frontend access
 app.add_middleware(
@@ -46,6 +84,17 @@ def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+def ready_check():
+    """Readiness probe: 200 only once the warmup has completed successfully."""
+    if not app.state.ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "warming_up", "warmup": app.state.warmup},
+        )
+    return {"status": "ready", "warmup": app.state.warmup}
+
+
 
 async def run_agent():
     from ai.graph import get_agent